@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Benchmark publish_schedule_to_square_mcp.py against the offline MCP stand-in.
+
+Generates approved staffing plans of increasing size, then runs each through
+the publisher's main() with --apply --publish while fake_square_mcp.py plays
+Square (configurable latency, injected errors and page size). The directory
+cache, shift ledger and replay store are disabled and every run starts from an
+empty shift store, so each case measures a full first publish. Timings are
+the median of --repeat runs.
+
+Results are written as JSON (--output) and can be compared against an earlier
+run with --compare; the exit code is 2 when any case slows down by more than
+--threshold.
+
+Example:
+    python3 apps/ice-cream-ops/scripts/bench_publish_schedule.py --shifts 50,200,800 \\
+        --concurrency 4,16 --latency-ms 60 --output tmp/bench/publish.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import fake_square_mcp as fake
+import publish_schedule_to_square_mcp as psm
+
+ROLES = ("Scooper", "Scooper", "Key Lead", "Scooper", "Managers")
+PLAN_START = date(2026, 6, 1)
+
+
+def _csv_ints(raw: str) -> list[int]:
+    return [int(part) for part in raw.split(",") if part.strip()]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shifts", type=_csv_ints, default=[50, 200], help="Comma-separated assigned shifts per plan")
+    parser.add_argument("--per-day", type=int, default=12, help="Assigned shifts per plan day (default: 12)")
+    parser.add_argument("--concurrency", type=_csv_ints, default=[4], help="Comma-separated publisher --concurrency values")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Publisher --max-rps (default 0: unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Fake server latency per API call")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with SERVICE_UNAVAILABLE")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls failing with RATE_LIMITED")
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--page-size", type=int, default=100, help="Fake server page size")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write machine-readable results JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed relative slowdown per case (default 0.20)")
+    return parser.parse_args(argv)
+
+
+def gen_plan(shifts: int, per_day: int, names: list[str]) -> dict[str, Any]:
+    """An approved EP plan with `shifts` single-headcount slots, each person working once per day."""
+    days: list[dict[str, Any]] = []
+    for day_idx in range(math.ceil(shifts / per_day)):
+        count = min(per_day, shifts - day_idx * per_day)
+        slots = []
+        for idx in range(count):
+            start_hour = 10 + idx % 8
+            slots.append(
+                {
+                    "role": ROLES[idx % len(ROLES)],
+                    "start": f"{start_hour:02d}:00",
+                    "end": f"{start_hour + 4 + idx % 3:02d}:30",
+                    "headcount": 1,
+                    "assignments": [names[idx]],
+                }
+            )
+        days.append({"date": (PLAN_START + timedelta(days=day_idx)).isoformat(), "slots": slots})
+
+    return {
+        "location": "EP",
+        "square": {"location_id": psm.LOCATION_IDS["EP"]},
+        "approvals": {"nextWeek": {"status": "approved", "reviewer": "Bench Reviewer", "reviewedAt": "2026-05-28"}},
+        "workflow": {"approvalRequiredForExceptions": True, "gmApprovalRequiredForNextWeek": True},
+        "weeks": [{"days": days[start : start + 7]} for start in range(0, len(days), 7)],
+    }
+
+
+def fake_command(args: argparse.Namespace, members: int, state_file: Path, seed: int) -> str:
+    return shlex.join(
+        [
+            sys.executable,
+            str(Path(fake.__file__).resolve()),
+            "--members",
+            str(members),
+            "--latency-ms",
+            str(args.latency_ms),
+            "--jitter-ms",
+            str(args.jitter_ms),
+            "--error-rate",
+            str(args.error_rate),
+            "--rate-limit-rate",
+            str(args.rate_limit_rate),
+            "--retry-after",
+            str(args.retry_after),
+            "--page-size",
+            str(args.page_size),
+            "--state-file",
+            str(state_file),
+            "--seed",
+            str(seed),
+        ]
+    )
+
+
+def _run_once(case: dict[str, Any], args: argparse.Namespace, workdir: Path, seed: int) -> dict[str, Any]:
+    plan_file = workdir / "plan.json"
+    report_file = workdir / "report.json"
+    state_file = workdir / "square-state.json"
+    for path in (report_file, state_file):
+        path.unlink(missing_ok=True)
+
+    members = max(case["per_day"], 1)
+    plan_file.write_text(json.dumps(gen_plan(case["shifts"], case["per_day"], fake.member_names(members))))
+    argv = [
+        "--plan-file",
+        str(plan_file),
+        "--apply",
+        "--publish",
+        "--concurrency",
+        str(case["concurrency"]),
+        "--max-rps",
+        str(args.max_rps),
+        "--cache-ttl-hours",
+        "0",
+        "--ledger-dir",
+        "",
+        "--replay-store",
+        "",
+        "--report-file",
+        str(report_file),
+        "--mcp-command",
+        fake_command(args, members, state_file, seed),
+    ]
+
+    error = None
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            psm.main(argv)
+        except RuntimeError as exc:
+            error = str(exc).splitlines()[0]
+    seconds = time.perf_counter() - started
+
+    report = json.loads(report_file.read_text()) if report_file.exists() else {}
+    api = (report.get("metrics") or {}).get("api") or {}
+    return {
+        "seconds": seconds,
+        "created": report.get("created", 0),
+        "published": report.get("published", 0),
+        "errors": len(report.get("errors") or []),
+        "api_calls": sum(stats["calls"] for stats in api.values()),
+        "api_attempts": sum(stats["attempts"] for stats in api.values()),
+        "api_retries": sum(stats["retries"] for stats in api.values()),
+        "create_p95_sec": ((api.get("labor.createScheduledShift") or {}).get("latency_sec") or {}).get("p95"),
+        "failure": error,
+    }
+
+
+def run_case(case: dict[str, Any], args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    runs = [_run_once(case, args, workdir, args.seed + idx) for idx in range(max(1, args.repeat))]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    last = runs[-1]
+    return {
+        "case": case_id(case),
+        **case,
+        "seconds": seconds,
+        "shifts_per_sec": case["shifts"] / seconds if seconds else None,
+        "runs": [run["seconds"] for run in runs],
+        **{key: value for key, value in last.items() if key != "seconds"},
+    }
+
+
+def case_id(case: dict[str, Any]) -> str:
+    return f"shifts={case['shifts']} per_day={case['per_day']} concurrency={case['concurrency']}"
+
+
+def iter_cases(args: argparse.Namespace) -> list[dict[str, Any]]:
+    try:
+        fake.member_names(args.per_day)
+    except ValueError as exc:
+        raise SystemExit(f"--per-day {args.per_day}: {exc}") from exc
+    return [
+        {"shifts": shifts, "per_day": args.per_day, "concurrency": concurrency}
+        for shifts, concurrency in itertools.product(args.shifts, args.concurrency)
+    ]
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    base_cases = {case["case"]: case for case in baseline.get("cases") or []}
+    regressions: list[str] = []
+    print(f"\nComparison against {baseline.get('git_revision') or 'baseline'} (threshold {threshold:.0%}):")
+    for case in results["cases"]:
+        base = base_cases.get(case["case"])
+        if not base or not base.get("seconds"):
+            print(f"  {case['case']}: no baseline")
+            continue
+        delta = (case["seconds"] - base["seconds"]) / base["seconds"]
+        marker = " REGRESSION" if delta > threshold else ""
+        print(f"  {case['case']}: {base['seconds']:.2f}s -> {case['seconds']:.2f}s ({delta:+.1%}){marker}")
+        if marker:
+            regressions.append(f"{case['case']} {delta:+.1%}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    cases = iter_cases(args)
+
+    results: dict[str, Any] = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "fake_server": {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "page_size": args.page_size,
+        },
+        "cases": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-publish-") as tmp:
+        for case in cases:
+            result = run_case(case, args, Path(tmp))
+            results["cases"].append(result)
+            status = f" FAILED: {result['failure']}" if result["failure"] else ""
+            print(
+                f"{result['case']}: total={result['seconds']:.2f}s {result['shifts_per_sec']:.1f} shifts/s "
+                f"calls={result['api_calls']} retries={result['api_retries']}{status}",
+                flush=True,
+            )
+
+    if args.output:
+        out = Path(args.output).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2))
+        print(f"Wrote results to {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).expanduser().read_text())
+        if compare(results, baseline, args.threshold):
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""Offline stand-in for the Square MCP bridge, for benchmarking the publisher.
+
+Speaks the same newline-delimited JSON-RPC over stdio as `npx mcp-remote`
+and answers the `make_api_request` tool for the team and labor methods
+publish_schedule_to_square_mcp.py uses, against an in-memory directory and
+shift store. Latency, transient and rate-limit errors, and page size are
+configurable so throughput can be measured without touching Square.
+
+Launch it from the publisher with:
+    python3 apps/ice-cream-ops/scripts/publish_schedule_to_square_mcp.py --plan-file plan.json --apply --publish \\
+        --mcp-command "python3 apps/ice-cream-ops/scripts/fake_square_mcp.py --latency-ms 80 --error-rate 0.02"
+
+or serve MCP over streamable HTTP with --http PORT and point --mcp-url at it:
+    python3 apps/ice-cream-ops/scripts/fake_square_mcp.py --http 8765 &
+    python3 apps/ice-cream-ops/scripts/publish_schedule_to_square_mcp.py --plan-file plan.json --apply \\
+        --mcp-transport http --mcp-url http://127.0.0.1:8765/mcp
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+FIRST_NAMES = ("Ana", "Ben", "Cara", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jun", "Kai", "Lia")
+LAST_NAMES = ("Lopez", "Ng", "Diaz", "Park", "Reyes", "Shah", "Tran", "Voss", "Wong", "Young", "Zhou", "Moss")
+JOB_TITLES = ("Scooper", "Key Lead", "Managers")
+LOCATION_IDS = ("LYPJTCTZKM211", "LDBQAYTKVHZAT")
+BULK_PUBLISH_MAX = 100
+
+
+def member_names(count: int) -> list[str]:
+    """Deterministic synthetic team, shared with the benchmark's plan generator."""
+    names = [f"{first} {last}" for last, first in itertools.product(LAST_NAMES, FIRST_NAMES)]
+    if count > len(names):
+        raise ValueError(f"At most {len(names)} synthetic team members are available.")
+    return names[:count]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=24, help="Synthetic team members per location (default: 24)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per API call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with SERVICE_UNAVAILABLE")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls failing with RATE_LIMITED")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry_after seconds sent with RATE_LIMITED")
+    parser.add_argument("--page-size", type=int, default=100, help="Server-side cap on items per page")
+    parser.add_argument("--state-file", help="Persist scheduled shifts here across runs (default: in memory)")
+    parser.add_argument("--log-file", help="Append one JSON line per API call (method, latency, outcome)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--http",
+        type=int,
+        metavar="PORT",
+        help="Serve MCP streamable HTTP on 127.0.0.1:PORT/mcp instead of stdio (0 picks a free port)",
+    )
+    parser.add_argument("--token", help="With --http, require `Authorization: Bearer TOKEN`")
+    return parser.parse_args(argv)
+
+
+class FakeSquare:
+    """In-memory Square team/labor directory and scheduled-shift store."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.team_members = [
+            {
+                "id": f"TM{idx + 1:03d}",
+                "given_name": name.split(" ", 1)[0],
+                "family_name": name.split(" ", 1)[1],
+                "status": "ACTIVE",
+                "assigned_locations": {"assignment_type": "ALL_CURRENT_AND_FUTURE_LOCATIONS"},
+            }
+            for idx, name in enumerate(member_names(args.members))
+        ]
+        self.jobs = [{"id": f"JOB{idx + 1}", "title": title} for idx, title in enumerate(JOB_TITLES)]
+        self.state_path = Path(args.state_file).expanduser() if args.state_file else None
+        self.shifts: dict[str, dict[str, Any]] = {}
+        self.idempotency: dict[str, str] = {}
+        self.bulk_results: dict[str, dict[str, Any]] = {}
+        if self.state_path and self.state_path.exists():
+            state = json.loads(self.state_path.read_text())
+            self.shifts = state.get("shifts") or {}
+            self.idempotency = state.get("idempotency") or {}
+            self.bulk_results = state.get("bulk_results") or {}
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"shifts": self.shifts, "idempotency": self.idempotency, "bulk_results": self.bulk_results}))
+        tmp.replace(self.state_path)
+
+    def injected_error(self) -> dict[str, Any] | None:
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.args.rate_limit_rate:
+            return {
+                "errors": [
+                    {
+                        "category": "RATE_LIMIT_ERROR",
+                        "code": "RATE_LIMITED",
+                        "detail": "Too many requests.",
+                        "retry_after": self.args.retry_after,
+                    }
+                ]
+            }
+        if roll < self.args.rate_limit_rate + self.args.error_rate:
+            return {"errors": [{"category": "API_ERROR", "code": "SERVICE_UNAVAILABLE", "detail": "Injected failure."}]}
+        return None
+
+    def page(self, items: list[dict[str, Any]], key: str, request: dict[str, Any]) -> dict[str, Any]:
+        start = int(request.get("cursor") or 0)
+        size = max(1, min(int(request.get("limit") or self.args.page_size), self.args.page_size))
+        out: dict[str, Any] = {key: items[start : start + size]}
+        if start + size < len(items):
+            out["cursor"] = str(start + size)
+        return out
+
+    def call(self, service: str, method: str, request: dict[str, Any]) -> dict[str, Any]:
+        handler = getattr(self, f"{service}_{method}", None)
+        if handler is None:
+            return {"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND", "detail": f"{service}.{method}"}]}
+        with self.lock:
+            return handler(request)
+
+    def team_searchMembers(self, request: dict[str, Any]) -> dict[str, Any]:
+        return self.page(self.team_members, "team_members", request)
+
+    def team_listJobs(self, request: dict[str, Any]) -> dict[str, Any]:
+        return self.page(self.jobs, "jobs", request)
+
+    def labor_searchScheduledShifts(self, request: dict[str, Any]) -> dict[str, Any]:
+        shift_filter = (request.get("query") or {}).get("filter") or {}
+        location_ids = set(shift_filter.get("location_ids") or LOCATION_IDS)
+        window = shift_filter.get("start") or {}
+        lo, hi = window.get("start_at") or "", window.get("end_at") or "9999"
+        matches = [
+            shift
+            for shift in self.shifts.values()
+            if shift["draft_shift_details"].get("location_id") in location_ids
+            and lo <= shift["draft_shift_details"].get("start_at", "") <= hi
+        ]
+        matches.sort(key=lambda shift: (shift["draft_shift_details"]["start_at"], shift["id"]))
+        return self.page(matches, "scheduled_shifts", request)
+
+    def labor_createScheduledShift(self, request: dict[str, Any]) -> dict[str, Any]:
+        key = request.get("idempotency_key") or ""
+        if key in self.idempotency:
+            return {"scheduled_shift": self.shifts[self.idempotency[key]]}
+        details = ((request.get("scheduled_shift") or {}).get("draft_shift_details")) or {}
+        missing = [field for field in ("team_member_id", "location_id", "start_at", "end_at") if not details.get(field)]
+        if missing:
+            return {
+                "errors": [
+                    {"category": "INVALID_REQUEST_ERROR", "code": "MISSING_REQUIRED_PARAMETER", "detail": ", ".join(missing)}
+                ]
+            }
+        shift_id = "SS" + hashlib.sha256(f"{key}|{len(self.shifts)}".encode()).hexdigest()[:14].upper()
+        self.shifts[shift_id] = {"id": shift_id, "version": 1, "draft_shift_details": dict(details)}
+        if key:
+            self.idempotency[key] = shift_id
+        self.save()
+        return {"scheduled_shift": self.shifts[shift_id]}
+
+    def _versioned(self, request: dict[str, Any], version: Any) -> dict[str, Any] | None:
+        shift = self.shifts.get(request.get("id") or "")
+        if shift is None:
+            return {"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND", "detail": "Shift not found."}]}
+        if version is not None and version != shift["version"]:
+            return {"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "CONFLICT", "detail": "Version mismatch."}]}
+        return None
+
+    def labor_updateScheduledShift(self, request: dict[str, Any]) -> dict[str, Any]:
+        scheduled = request.get("scheduled_shift") or {}
+        error = self._versioned(request, scheduled.get("version"))
+        if error:
+            return error
+        shift = self.shifts[request["id"]]
+        shift["draft_shift_details"] = dict(scheduled.get("draft_shift_details") or {})
+        shift["version"] += 1
+        self.save()
+        return {"scheduled_shift": shift}
+
+    def _publish(self, request: dict[str, Any]) -> dict[str, Any]:
+        error = self._versioned(request, request.get("version"))
+        if error:
+            return error
+        shift = self.shifts[request["id"]]
+        shift["published_shift_details"] = dict(shift["draft_shift_details"])
+        shift["version"] += 1
+        return {"scheduled_shift": shift}
+
+    def labor_publishScheduledShift(self, request: dict[str, Any]) -> dict[str, Any]:
+        result = self._publish(request)
+        self.save()
+        return result
+
+    def labor_bulkPublishScheduledShifts(self, request: dict[str, Any]) -> dict[str, Any]:
+        key = request.get("idempotency_key") or ""
+        if key in self.bulk_results:
+            return self.bulk_results[key]
+        entries = request.get("scheduled_shifts") or {}
+        if not 1 <= len(entries) <= BULK_PUBLISH_MAX:
+            return {
+                "errors": [
+                    {
+                        "category": "INVALID_REQUEST_ERROR",
+                        "code": "INVALID_VALUE",
+                        "detail": f"scheduled_shifts must hold 1 to {BULK_PUBLISH_MAX} entries.",
+                    }
+                ]
+            }
+        responses = {
+            shift_id: self._publish({"id": shift_id, "version": (data or {}).get("version")})
+            for shift_id, data in entries.items()
+        }
+        result = json.loads(json.dumps({"responses": responses}))
+        if key:
+            self.bulk_results[key] = result
+        self.save()
+        return result
+
+
+class StdioServer:
+    """Newline-delimited JSON-RPC loop; each tool call runs on its own thread like the real bridge."""
+
+    def __init__(self, square: FakeSquare, args: argparse.Namespace):
+        self.square = square
+        self.args = args
+        self.out_lock = threading.Lock()
+        self.log_file = open(args.log_file, "a", encoding="utf-8") if args.log_file else None
+
+    def send(self, msg: dict[str, Any]) -> None:
+        line = json.dumps(msg, separators=(",", ":")) + "\n"
+        with self.out_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    def log_call(self, method: str, seconds: float, payload: dict[str, Any]) -> None:
+        if not self.log_file:
+            return
+        error = ((payload.get("errors") or [{}])[0]).get("code") if payload.get("errors") else None
+        with self.out_lock:
+            self.log_file.write(json.dumps({"method": method, "seconds": round(seconds, 4), "error": error}) + "\n")
+            self.log_file.flush()
+
+    def tool_call(self, msg_id: Any, params: dict[str, Any]) -> dict[str, Any]:
+        started = time.perf_counter()
+        name = params.get("name")
+        arguments = params.get("arguments") or {}
+        if name != "make_api_request":
+            return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": -32602, "message": f"Unknown tool: {name}"}}
+
+        delay = self.args.latency_ms + random.uniform(-self.args.jitter_ms, self.args.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        method = f"{arguments.get('service')}.{arguments.get('method')}"
+        payload = self.square.injected_error() or self.square.call(
+            str(arguments.get("service")), str(arguments.get("method")), arguments.get("request") or {}
+        )
+        self.log_call(method, time.perf_counter() - started, payload)
+        return {
+            "jsonrpc": "2.0",
+            "id": msg_id,
+            "result": {
+                "content": [{"type": "text", "text": json.dumps(payload)}],
+            },
+        }
+
+    def reply(self, msg: dict[str, Any]) -> dict[str, Any] | None:
+        """The response to one JSON-RPC message (None for notifications), computed on the calling thread."""
+        method = msg.get("method")
+        if "id" not in msg or method is None:
+            return None
+        if method == "initialize":
+            result = {
+                "protocolVersion": (msg.get("params") or {}).get("protocolVersion", "2024-11-05"),
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "fake-square-mcp", "version": "0.1"},
+            }
+            return {"jsonrpc": "2.0", "id": msg["id"], "result": result}
+        if method == "ping":
+            return {"jsonrpc": "2.0", "id": msg["id"], "result": {}}
+        if method == "tools/call":
+            return self.tool_call(msg["id"], msg.get("params") or {})
+        return {"jsonrpc": "2.0", "id": msg["id"], "error": {"code": -32601, "message": f"Method not found: {method}"}}
+
+    def handle(self, msg: dict[str, Any]) -> None:
+        if msg.get("method") == "tools/call" and "id" in msg:
+            threading.Thread(target=lambda: self.send(self.tool_call(msg["id"], msg.get("params") or {})), daemon=True).start()
+            return
+        response = self.reply(msg)
+        if response is not None:
+            self.send(response)
+
+    def serve(self) -> None:
+        for raw in sys.stdin:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                msg = json.loads(raw)
+            except json.JSONDecodeError:
+                self.send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+                continue
+            if isinstance(msg, dict):
+                self.handle(msg)
+
+
+def http_server(rpc: StdioServer, args: argparse.Namespace) -> ThreadingHTTPServer:
+    """Streamable-HTTP endpoint at /mcp on a keep-alive, thread-per-connection server.
+
+    Tool calls answer as a one-event SSE stream (when the client accepts one) and everything else as plain
+    JSON, so clients exercise both response forms. Sessions are tracked by
+    Mcp-Session-Id; --token requires a matching bearer token.
+    """
+    sessions: set[str] = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Buffer headers and body into one send; split writes stall on Nagle + delayed ACK.
+        wbufsize = 64 * 1024
+
+        def log_message(self, format: str, *log_args: Any) -> None:
+            pass
+
+        def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json", **headers: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name.replace("_", "-"), value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _session_error(self) -> bool:
+            if self.path.split("?", 1)[0] != "/mcp":
+                self._reply(404, b'{"error":"not found"}')
+            elif args.token and self.headers.get("Authorization") != f"Bearer {args.token}":
+                self._reply(401, b'{"error":"unauthorized"}')
+            else:
+                return False
+            return True
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self._session_error():
+                return
+            try:
+                msg = json.loads(body)
+            except json.JSONDecodeError:
+                msg = None
+            if not isinstance(msg, dict):
+                self._reply(400, b'{"jsonrpc":"2.0","id":null,"error":{"code":-32700,"message":"Parse error"}}')
+                return
+            session_id = self.headers.get("Mcp-Session-Id")
+            if msg.get("method") == "initialize":
+                session_id = uuid.uuid4().hex
+                sessions.add(session_id)
+            elif session_id not in sessions:
+                self._reply(404 if session_id else 400, b'{"error":"unknown or missing Mcp-Session-Id"}')
+                return
+
+            response = rpc.reply(msg)
+            if response is None:
+                self._reply(202)
+            elif msg.get("method") == "tools/call" and "text/event-stream" in (self.headers.get("Accept") or ""):
+                event = f"event: message\ndata: {json.dumps(response, separators=(',', ':'))}\n\n".encode()
+                self._reply(200, event, "text/event-stream", Mcp_Session_Id=session_id)
+            else:
+                self._reply(200, json.dumps(response).encode(), Mcp_Session_Id=session_id)
+
+        def do_DELETE(self) -> None:
+            if self._session_error():
+                return
+            sessions.discard(self.headers.get("Mcp-Session-Id") or "")
+            self._reply(200)
+
+    return ThreadingHTTPServer(("127.0.0.1", args.http), Handler)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    rpc = StdioServer(FakeSquare(args), args)
+    if args.http is None:
+        rpc.serve()
+        return 0
+
+    server = http_server(rpc, args)
+    print(f"fake Square MCP listening on http://127.0.0.1:{server.server_address[1]}/mcp", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,6 +5,8 @@ Safe by default:
 - Dry-run unless --apply is provided.
 - Does not publish newly created shifts unless --publish is provided.
 - Skips exact duplicates already in Square.
+- Never deletes shifts dropped from the plan unless --delete-removed is provided;
+  without it they are only listed as pending deletes.
 
 Expected input is the exported planner JSON from staffing-planner.html.
 """
@@ -12,22 +14,68 @@ Expected input is the exported planner JSON from staffing-planner.html.
 from __future__ import annotations
 
 import argparse
+import asyncio
+import gzip
 import hashlib
+import heapq
+import http.client
 import json
-import subprocess
+import os
+import random
+import re
+import shlex
+import socket
 import sys
 import threading
 import time
+import urllib.parse
 import uuid
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
 from zoneinfo import ZoneInfo
 
 ET = ZoneInfo("America/New_York")
 PLACEHOLDER_REVIEWERS = {"", "unassigned", "tbd", "unknown", "n/a", "na", "none", "-"}
 
+MAX_KEPT_MESSAGES = 200
+SQUARE_MCP_URL = "https://mcp.squareup.com/sse"
+SQUARE_MCP_HTTP_URL = "https://mcp.squareup.com/mcp"
+MCP_HTTP_PROTOCOL_VERSION = "2025-03-26"
+MCP_TOKEN_ENV = "SQUARE_ACCESS_TOKEN"
+RETRYABLE_ERROR_CATEGORIES = {"RATE_LIMIT_ERROR", "API_ERROR"}
+RETRYABLE_ERROR_CODES = {
+    "RATE_LIMITED",
+    "INTERNAL_SERVER_ERROR",
+    "SERVICE_UNAVAILABLE",
+    "GATEWAY_TIMEOUT",
+    "BAD_GATEWAY",
+    "REQUEST_TIMEOUT",
+}
+HTTP_RETRYABLE_STATUS = {
+    429: "RATE_LIMITED",
+    500: "INTERNAL_SERVER_ERROR",
+    502: "BAD_GATEWAY",
+    503: "SERVICE_UNAVAILABLE",
+    504: "GATEWAY_TIMEOUT",
+}
+RETRY_BASE_SEC = 0.5
+RETRY_MAX_SEC = 30.0
+RETRY_AFTER_RE = re.compile(r"retry[-_ ]?after\D{0,20}?(\d+(?:\.\d+)?)", re.IGNORECASE)
+DIRECTORY_CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or "~/.cache").expanduser() / "ice-cream-ops" / "square"
+REPLAY_STORE_VERSION = 1
+DEFAULT_REPLAY_STORE = DEFAULT_CACHE_DIR / "mcp-replay.json.gz"
+REPLAY_RETENTION_SEC = 7 * 24 * 3600
+READ_ONLY_METHOD_PREFIXES = ("list", "search", "retrieve", "get")
+BULK_PUBLISH_MAX = 100  # Square caps BulkPublishScheduledShifts at 100 shifts per request
+SHIFT_LEDGER_VERSION = 1
+DEFAULT_LEDGER_DIR = Path(os.environ.get("XDG_STATE_HOME") or "~/.local/state").expanduser() / "ice-cream-ops" / "square-ledger"
+
 LOCATION_IDS = {
     "EP": "LYPJTCTZKM211",
     "NL": "LDBQAYTKVHZAT",
@@ -49,9 +97,20 @@ def normalize_name(raw: str) -> str:
     return " ".join("".join(out).split())
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--plan-file", required=True, help="Path to exported planner JSON")
+    parser.add_argument(
+        "--plan-file",
+        action="append",
+        default=[],
+        help="Path to exported planner JSON (repeat to publish several plans concurrently over one MCP session)",
+    )
+    parser.add_argument(
+        "--plan-dir",
+        action="append",
+        default=[],
+        help="Directory of exported planner JSON files; every *.json inside is added to the batch (repeatable)",
+    )
     parser.add_argument("--location", choices=["EP", "NL"], help="Override location from plan")
     parser.add_argument("--apply", action="store_true", help="Actually create/update shifts (default: dry-run)")
     parser.add_argument("--dry-run", action="store_true", help="Explicitly run in dry-run mode (default behavior)")
@@ -67,83 +126,702 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--job-scooper", help="Square job_id override for scooper roles")
     parser.add_argument("--job-key-lead", help="Square job_id override for lead roles")
     parser.add_argument("--job-manager", help="Square job_id override for manager roles")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum shifts created/published in parallel across all plans (default: 4)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory for cached team member/job lookups (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=24.0,
+        help="Reuse cached team member/job lookups younger than this; 0 disables the cache (default: 24)",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached team member/job lookups and refetch them from Square",
+    )
+    parser.add_argument(
+        "--replay-store",
+        default=str(DEFAULT_REPLAY_STORE),
+        help=f"File recording read-only MCP responses for --replay; empty disables recording (default: {DEFAULT_REPLAY_STORE})",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Dry run served from --replay-store without starting the MCP bridge (implies --dry-run)",
+    )
+    parser.add_argument(
+        "--replay-max-age-hours",
+        type=float,
+        default=12.0,
+        help="Refuse recorded responses older than this in --replay (default: 12)",
+    )
+    parser.add_argument(
+        "--ledger-dir",
+        default=str(DEFAULT_LEDGER_DIR),
+        help=f"Directory for per-location shift ledgers used for incremental publish; empty disables (default: {DEFAULT_LEDGER_DIR})",
+    )
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="Diff every plan day against the ledger, not just days whose fingerprint changed",
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Diff plan days against live Square shifts (not the ledger): update moved shifts and, with --delete-removed, delete unplanned ones",
+    )
+    parser.add_argument(
+        "--delete-removed",
+        action="store_true",
+        help="Delete shifts that the diff finds dropped from the plan; without this they are only reported (pending_deletes)",
+    )
+    parser.add_argument(
+        "--fetch-window-days",
+        type=int,
+        default=1,
+        help="Search existing shifts in windows of at most this many consecutive plan days, fetched in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=10.0,
+        help="Token-bucket cap on Square API requests per second across all in-flight calls; 0 disables (default: 10)",
+    )
+    parser.add_argument(
+        "--mcp-command",
+        help="Launch this stdio MCP server instead of `npx mcp-remote` (e.g. 'python3 scripts/fake_square_mcp.py --latency-ms 80')",
+    )
+    parser.add_argument(
+        "--mcp-transport",
+        choices=["auto", "http", "bridge"],
+        default="auto",
+        help=(
+            "http: talk streamable HTTP to the MCP server directly; bridge: spawn `npx mcp-remote`. "
+            f"auto (default) uses http when ${MCP_TOKEN_ENV} or --mcp-url is set and falls back to the bridge if it fails"
+        ),
+    )
+    parser.add_argument(
+        "--mcp-url",
+        help=f"MCP endpoint (default: {SQUARE_MCP_HTTP_URL} over http, {SQUARE_MCP_URL} via the bridge)",
+    )
     parser.add_argument("--report-file", help="Optional JSON report output path")
+    parser.add_argument("--metrics-file", help="Optional OpenMetrics text output path for call latency/counters")
     parser.add_argument("--verbose", action="store_true")
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.replay and args.apply:
+        parser.error("--replay serves recorded reads only and cannot be combined with --apply")
+    if args.replay and not args.replay_store:
+        parser.error("--replay needs a --replay-store")
+    if not args.plan_file and not args.plan_dir:
+        parser.error("at least one --plan-file or --plan-dir is required")
+    if args.mcp_transport == "http" and args.mcp_command:
+        parser.error("--mcp-command launches a stdio server and cannot be combined with --mcp-transport http")
+    return args
+
+
+def _json_digest(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def mcp_source(args: argparse.Namespace) -> str:
+    """Identity of the MCP server this run talks to; Square itself whichever transport reaches it."""
+    if args.mcp_command:
+        return shlex.join(shlex.split(args.mcp_command))
+    return args.mcp_url or SQUARE_MCP_URL
+
+
+def source_scoped(root: Path, source: str) -> Path:
+    """`root` for Square; a per-source subdirectory for stand-ins so their state never mixes with Square's."""
+    if source == SQUARE_MCP_URL:
+        return root
+    return root / "sources" / hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
 
 
 def log(msg: str) -> None:
     print(msg, flush=True)
 
 
-class MCPClient:
-    def __init__(self, url: str, verbose: bool = False):
-        self.verbose = verbose
-        self.proc = subprocess.Popen(
-            ["npx", "-y", "mcp-remote", url],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-        )
-        self.next_id = 1
-        self._stderr_thread = threading.Thread(target=self._pump_stderr, daemon=True)
-        self._stderr_thread.start()
-        self._initialize()
+class PhaseTimer:
+    """Accumulates wall-clock seconds per named phase."""
 
-    def _pump_stderr(self) -> None:
-        assert self.proc.stderr is not None
-        for raw in self.proc.stderr:
-            if self.verbose:
-                sys.stderr.write(raw)
-
-    def _send(self, msg: dict[str, Any]) -> None:
-        assert self.proc.stdin is not None
-        self.proc.stdin.write(json.dumps(msg) + "\n")
-        self.proc.stdin.flush()
-
-    def _read(self, timeout_sec: int = 180) -> dict[str, Any]:
-        assert self.proc.stdout is not None
-        start = time.time()
-        while time.time() - start < timeout_sec:
-            line = self.proc.stdout.readline()
-            if not line:
-                if self.proc.poll() is not None:
-                    raise RuntimeError("mcp-remote process closed")
-                time.sleep(0.05)
-                continue
-            try:
-                return json.loads(line)
-            except json.JSONDecodeError:
-                continue
-        raise TimeoutError("Timed out waiting for MCP response")
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
 
-    def _request(self, method: str, params: dict[str, Any], timeout_sec: int = 180) -> dict[str, Any]:
-        req_id = self.next_id
-        self.next_id += 1
-        self._send({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params})
-        while True:
-            msg = self._read(timeout_sec=timeout_sec)
-            if msg.get("id") != req_id:
-                continue
-            if "error" in msg:
-                raise RuntimeError(f"MCP error on {method}: {msg['error']}")
-            return msg["result"]
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
 
-    def _initialize(self) -> None:
-        self._request(
-            "initialize",
-            {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {"name": "milkjawn-schedule-publish", "version": "0.1"},
+    def as_dict(self) -> dict[str, float]:
+        return {name: round(seconds, 4) for name, seconds in self.phases.items()}
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    attempts: int = 0
+    errors: int = 0
+    retries: int = 0
+    backoff_sec: float = 0.0
+    throttle_sec: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def quantile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def as_dict(self) -> dict[str, Any]:
+        total = sum(self.latencies)
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "errors": self.errors,
+            "retries": self.retries,
+            "backoff_sec": round(self.backoff_sec, 4),
+            "throttle_sec": round(self.throttle_sec, 4),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "latency_sec": {
+                "total": round(total, 4),
+                "mean": round(total / len(self.latencies), 4) if self.latencies else 0.0,
+                "p50": round(self.quantile(0.5), 4),
+                "p95": round(self.quantile(0.95), 4),
+                "max": round(max(self.latencies, default=0.0), 4),
             },
+        }
+
+
+class PublishMetrics:
+    """
+    Call counters and latencies for one publish run.
+
+    `rpc` is keyed by JSON-RPC method (initialize, tools/call) and times each
+    request/response round trip; `api` is keyed by Square service.method and
+    counts logical calls, attempts, retries, backoff sleep and payload bytes.
+    Recording is lock-protected because the HTTP transport counts wire bytes
+    on its worker threads.
+    """
+
+    def __init__(self) -> None:
+        self.timer = PhaseTimer()
+        self.started = time.perf_counter()
+        self.rpc: dict[str, CallStats] = {}
+        self.api: dict[str, CallStats] = {}
+        self.wire_bytes_sent = 0
+        self.wire_bytes_received = 0
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> Any:
+        return self.timer.phase(name)
+
+    def record_wire(self, sent: int = 0, received: int = 0) -> None:
+        with self._lock:
+            self.wire_bytes_sent += sent
+            self.wire_bytes_received += received
+
+    def record_rpc(self, method: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            stats = self.rpc.setdefault(method, CallStats())
+            stats.calls += 1
+            stats.attempts += 1
+            stats.errors += 0 if ok else 1
+            stats.latencies.append(seconds)
+
+    def record_api_attempt(self, name: str, seconds: float, request_bytes: int, response_bytes: int) -> None:
+        with self._lock:
+            stats = self.api.setdefault(name, CallStats())
+            stats.attempts += 1
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            stats.latencies.append(seconds)
+
+    def record_api_retry(self, name: str, sleep_sec: float) -> None:
+        with self._lock:
+            stats = self.api.setdefault(name, CallStats())
+            stats.retries += 1
+            stats.backoff_sec += sleep_sec
+
+    def record_api_throttle(self, name: str, wait_sec: float) -> None:
+        with self._lock:
+            self.api.setdefault(name, CallStats()).throttle_sec += wait_sec
+
+    def record_api_call(self, name: str, ok: bool) -> None:
+        with self._lock:
+            stats = self.api.setdefault(name, CallStats())
+            stats.calls += 1
+            stats.errors += 0 if ok else 1
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "elapsed_sec": round(time.perf_counter() - self.started, 4),
+                "phases_sec": self.timer.as_dict(),
+                "wire_bytes": {"sent": self.wire_bytes_sent, "received": self.wire_bytes_received},
+                "rpc": {name: stats.as_dict() for name, stats in sorted(self.rpc.items())},
+                "api": {name: stats.as_dict() for name, stats in sorted(self.api.items())},
+            }
+
+    def openmetrics(self) -> str:
+        """Render as OpenMetrics text exposition (one family per measurement)."""
+        snapshot = self.as_dict()
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: list[tuple[str, dict[str, str], float]]) -> None:
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        for table, prefix in (("api", "square_mcp_api"), ("rpc", "square_mcp_rpc")):
+            rows = snapshot[table]
+            family(
+                f"{prefix}_calls",
+                "counter",
+                "Logical calls.",
+                [("_total", {"method": m}, r["calls"]) for m, r in rows.items()],
+            )
+            family(
+                f"{prefix}_errors",
+                "counter",
+                "Calls that finished with an error.",
+                [("_total", {"method": m}, r["errors"]) for m, r in rows.items()],
+            )
+            latency: list[tuple[str, dict[str, str], float]] = []
+            for m, r in rows.items():
+                latency.append(("", {"method": m, "quantile": "0.5"}, r["latency_sec"]["p50"]))
+                latency.append(("", {"method": m, "quantile": "0.95"}, r["latency_sec"]["p95"]))
+                latency.append(("_sum", {"method": m}, r["latency_sec"]["total"]))
+                latency.append(("_count", {"method": m}, r["attempts"]))
+            family(f"{prefix}_latency_seconds", "summary", "Round-trip latency per attempt.", latency)
+
+        api = snapshot["api"]
+        family("square_mcp_api_retries", "counter", "Retried attempts.", [("_total", {"method": m}, r["retries"]) for m, r in api.items()])
+        family(
+            "square_mcp_api_backoff_seconds",
+            "counter",
+            "Time slept between retries.",
+            [("_total", {"method": m}, r["backoff_sec"]) for m, r in api.items()],
+        )
+        family(
+            "square_mcp_api_throttle_seconds",
+            "counter",
+            "Time spent waiting on the request rate limiter.",
+            [("_total", {"method": m}, r["throttle_sec"]) for m, r in api.items()],
+        )
+        family(
+            "square_mcp_api_payload_bytes",
+            "counter",
+            "Request/response payload bytes.",
+            [("_total", {"method": m, "direction": "request"}, r["request_bytes"]) for m, r in api.items()]
+            + [("_total", {"method": m, "direction": "response"}, r["response_bytes"]) for m, r in api.items()],
+        )
+        family(
+            "square_mcp_wire_bytes",
+            "counter",
+            "Bytes exchanged with the MCP server (stdio bridge or HTTP).",
+            [
+                ("_total", {"direction": "sent"}, snapshot["wire_bytes"]["sent"]),
+                ("_total", {"direction": "received"}, snapshot["wire_bytes"]["received"]),
+            ],
         )
-        self._send({"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}})
+        family(
+            "square_publish_phase_seconds",
+            "gauge",
+            "Wall-clock seconds per run phase.",
+            [("", {"phase": name}, seconds) for name, seconds in snapshot["phases_sec"].items()],
+        )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class TokenBucket:
+    """
+    Request rate limiter shared by every call on a session.
+
+    Each acquire reserves a token (the balance may go negative, which queues
+    later callers behind earlier ones) and waits until it is earned. A
+    rate-limit response pauses the whole bucket so in-flight callers back
+    off together instead of each hammering the API. rate <= 0 disables the
+    rate cap but still honors pauses.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate > 0:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    async def acquire(self) -> float:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ResponseStore:
+    """
+    Recorded read-only MCP tool results, keyed by a digest of the tool name
+    and arguments, in one gzipped JSON file.
+
+    Live sessions record every successful list/search/retrieve call;
+    `--replay` dry runs answer those calls from here so preflight needs no
+    bridge. Entries older than the replay limit are refused, and entries
+    past REPLAY_RETENTION_SEC are dropped when the store is saved. A file
+    recorded from another source is never overwritten.
+    """
+
+    def __init__(self, path: Path, source: str, max_age_sec: float = 0.0, verbose: bool = False):
+        self.path = path
+        self.source = source
+        self.max_age_sec = max_age_sec
+        self.verbose = verbose
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.dirty = False
+        self.foreign_source: str | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, source: str, max_age_sec: float = 0.0, verbose: bool = False) -> "ResponseStore":
+        store = cls(path, source, max_age_sec=max_age_sec, verbose=verbose)
+        try:
+            data = json.loads(gzip.decompress(path.read_bytes()))
+        except FileNotFoundError:
+            return store
+        except (OSError, ValueError) as exc:
+            log(f"[replay] ignoring unreadable store {path}: {exc}")
+            return store
+        if not isinstance(data, dict) or data.get("version") != REPLAY_STORE_VERSION:
+            if verbose:
+                log(f"[replay] ignoring store {path}: different format version")
+            return store
+        if data.get("source") != source:
+            store.foreign_source = str(data.get("source"))
+            log(f"[replay] {path} was recorded from {store.foreign_source}; it will not be read or overwritten")
+            return store
+        store.entries = {key: entry for key, entry in (data.get("entries") or {}).items() if isinstance(entry, dict)}
+        return store
+
+    @staticmethod
+    def key(name: str, arguments: dict[str, Any]) -> str:
+        return _json_digest({"tool": name, "arguments": arguments})
+
+    @staticmethod
+    def read_only(name: str, arguments: dict[str, Any]) -> bool:
+        return name == "make_api_request" and str(arguments.get("method") or "").startswith(READ_ONLY_METHOD_PREFIXES)
+
+    def record(self, name: str, arguments: dict[str, Any], result: dict[str, Any]) -> None:
+        if not self.read_only(name, arguments):
+            return
+        try:
+            if parse_tool_text_json(result).get("errors"):
+                return
+        except ValueError:
+            return
+        with self._lock:
+            self.entries[self.key(name, arguments)] = {
+                "at": time.time(),
+                "method": f"{arguments.get('service')}.{arguments.get('method')}",
+                "result": result,
+            }
+            self.dirty = True
+
+    def replay(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        method = f"{arguments.get('service')}.{arguments.get('method')}"
+        if not self.read_only(name, arguments):
+            raise RuntimeError(f"Replay mode cannot send {method}; it only serves recorded reads.")
+        entry = self.entries.get(self.key(name, arguments))
+        if entry is None:
+            raise RuntimeError(
+                f"No recorded response for {method} in {self.path}. Run once without --replay to record it."
+            )
+        age = time.time() - float(entry.get("at") or 0)
+        if self.max_age_sec > 0 and not 0 <= age < self.max_age_sec:
+            raise RuntimeError(
+                f"Recorded {method} response is {age / 3600:.1f}h old (limit {self.max_age_sec / 3600:.1f}h). "
+                "Run once without --replay to refresh it."
+            )
+        if self.verbose:
+            log(f"[replay] {method} ({age / 60:.0f}m old)")
+        return entry["result"]
+
+    def save(self) -> None:
+        with self._lock:
+            if not self.dirty or self.foreign_source is not None:
+                return
+            cutoff = time.time() - REPLAY_RETENTION_SEC
+            entries = {key: entry for key, entry in self.entries.items() if float(entry.get("at") or 0) >= cutoff}
+            self.dirty = False
+        data = {"version": REPLAY_STORE_VERSION, "source": self.source, "entries": entries}
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(gzip.compress(json.dumps(data, separators=(",", ":")).encode(), compresslevel=6))
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            # Recording is best effort; a live run must not fail over it.
+            tmp_path.unlink(missing_ok=True)
+            log(f"[replay] could not write {self.path}: {exc}")
+
+
+class _MCPSession:
+    """Transport-independent JSON-RPC bookkeeping shared by the MCP clients.
+
+    Keeps server notifications and responses nobody is waiting for any more
+    (bounded) and logs them, and answers server-to-client requests.
+    """
+
+    client_info = {"name": "milkjawn-schedule-publish", "version": "0.1"}
+
+    def __init__(
+        self,
+        verbose: bool = False,
+        metrics: PublishMetrics | None = None,
+        rate_limiter: TokenBucket | None = None,
+        recorder: ResponseStore | None = None,
+    ):
+        self.verbose = verbose
+        self.metrics = metrics or PublishMetrics()
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.recorder = recorder
+        self.next_id = 1
+        self.notifications: deque[dict[str, Any]] = deque(maxlen=MAX_KEPT_MESSAGES)
+        self.late_responses: deque[dict[str, Any]] = deque(maxlen=MAX_KEPT_MESSAGES)
+
+    @staticmethod
+    def bridge_command(url: str, command: list[str] | None = None) -> list[str]:
+        """The stdio server to spawn: `npx mcp-remote` unless a stand-in command is given."""
+        return list(command) if command else ["npx", "-y", "mcp-remote", url]
+
+    def _initialize_params(self) -> dict[str, Any]:
+        return {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": self.client_info,
+        }
 
-    def call_tool(self, name: str, arguments: dict[str, Any], timeout_sec: int = 300) -> dict[str, Any]:
-        return self._request(
+    def _parse_line(self, raw: str) -> dict[str, Any] | None:
+        raw = raw.strip()
+        if not raw:
+            return None
+        try:
+            msg = json.loads(raw)
+        except json.JSONDecodeError:
+            if self.verbose:
+                sys.stderr.write(f"[mcp] ignoring non-JSON output: {raw[:200]}\n")
+            return None
+        return msg if isinstance(msg, dict) else None
+
+    def _handle_server_message(self, msg: dict[str, Any]) -> dict[str, Any] | None:
+        """Record a notification/request; returns the reply to send, if any."""
+        self.notifications.append(msg)
+        if self.verbose:
+            sys.stderr.write(f"[mcp] notification {msg.get('method')}: {json.dumps(msg.get('params'))[:200]}\n")
+        if "id" not in msg:
+            return None
+        # Server-to-client request; we expose no client capabilities.
+        reply: dict[str, Any] = {"jsonrpc": "2.0", "id": msg["id"]}
+        if msg["method"] == "ping":
+            reply["result"] = {}
+        else:
+            reply["error"] = {"code": -32601, "message": f"Method not found: {msg['method']}"}
+        return reply
+
+    def _keep_late_response(self, msg: dict[str, Any]) -> None:
+        self.late_responses.append(msg)
+        sys.stderr.write(f"[mcp] response for id {msg.get('id')!r} arrived with no waiting request; kept\n")
+
+    @staticmethod
+    def _unwrap(method: str, msg: dict[str, Any]) -> dict[str, Any]:
+        if "error" in msg:
+            raise RuntimeError(f"MCP error on {method}: {msg['error']}")
+        return msg["result"]
+
+
+class AsyncMCPClient(_MCPSession):
+    """asyncio JSON-RPC client over an `npx mcp-remote` stdio bridge.
+
+    Use `await AsyncMCPClient.connect(url)` (or `async with`). Any number of
+    tasks may share one client; a reader task resolves each request's Future
+    by id. A request that times out or whose task is cancelled is unregistered
+    so its late response is kept rather than delivered.
+
+    Pass `command` to spawn another stdio MCP server in its place, such as
+    the offline stand-in in fake_square_mcp.py.
+    """
+
+    # Square directory pages can exceed asyncio's default 64 KiB line limit.
+    stream_limit = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        url: str,
+        verbose: bool = False,
+        metrics: PublishMetrics | None = None,
+        rate_limiter: TokenBucket | None = None,
+        command: list[str] | None = None,
+        recorder: ResponseStore | None = None,
+    ):
+        super().__init__(verbose=verbose, metrics=metrics, rate_limiter=rate_limiter, recorder=recorder)
+        self.url = url
+        self.command = self.bridge_command(url, command)
+        self.proc: asyncio.subprocess.Process | None = None
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._send_lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._closed_reason: str | None = None
+
+    @classmethod
+    async def connect(
+        cls,
+        url: str,
+        verbose: bool = False,
+        metrics: PublishMetrics | None = None,
+        rate_limiter: TokenBucket | None = None,
+        command: list[str] | None = None,
+        recorder: ResponseStore | None = None,
+    ) -> "AsyncMCPClient":
+        client = cls(url, verbose=verbose, metrics=metrics, rate_limiter=rate_limiter, command=command, recorder=recorder)
+        try:
+            await client._start()
+        except BaseException:
+            await client.close()
+            raise
+        return client
+
+    async def __aenter__(self) -> "AsyncMCPClient":
+        if self.proc is None:
+            await self._start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def _start(self) -> None:
+        with self.metrics.phase("mcp_spawn"):
+            self.proc = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=self.stream_limit,
+            )
+        self._tasks = [
+            asyncio.create_task(self._pump_stdout()),
+            asyncio.create_task(self._pump_stderr()),
+        ]
+        # Includes npx resolving and booting mcp-remote, not just the handshake.
+        with self.metrics.phase("mcp_initialize"):
+            await self._request("initialize", self._initialize_params())
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}})
+
+    async def _pump_stderr(self) -> None:
+        assert self.proc is not None and self.proc.stderr is not None
+        async for raw in self.proc.stderr:
+            if self.verbose:
+                sys.stderr.write(raw.decode("utf-8", "replace"))
+
+    async def _pump_stdout(self) -> None:
+        assert self.proc is not None and self.proc.stdout is not None
+        try:
+            async for raw in self.proc.stdout:
+                self.metrics.record_wire(received=len(raw))
+                msg = self._parse_line(raw.decode("utf-8", "replace"))
+                if msg is not None:
+                    await self._dispatch(msg)
+        finally:
+            self._closed_reason = self._closed_reason or "mcp-remote process closed"
+            pending = list(self._pending.values())
+            self._pending.clear()
+            for future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError(self._closed_reason))
+
+    async def _dispatch(self, msg: dict[str, Any]) -> None:
+        if "method" in msg:
+            reply = self._handle_server_message(msg)
+            if reply is not None:
+                await self._send(reply)
+            return
+
+        future = self._pending.pop(msg.get("id"), None)  # type: ignore[arg-type]
+        if future is not None and not future.done():
+            future.set_result(msg)
+            return
+        self._keep_late_response(msg)
+
+    async def _send(self, msg: dict[str, Any], deadline: float | None = None) -> None:
+        """Write one message; `deadline` (time.monotonic()) is for transports that can bound a single send."""
+        assert self.proc is not None and self.proc.stdin is not None
+        line = (json.dumps(msg) + "\n").encode("utf-8")
+        async with self._send_lock:
+            self.proc.stdin.write(line)
+            await self.proc.stdin.drain()
+        self.metrics.record_wire(sent=len(line))
+
+    async def _request(self, method: str, params: dict[str, Any], timeout_sec: float = 180) -> dict[str, Any]:
+        if self._closed_reason:
+            raise RuntimeError(self._closed_reason)
+        req_id = self.next_id
+        self.next_id += 1
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        started = time.perf_counter()
+        try:
+            await self._send(
+                {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params},
+                deadline=time.monotonic() + timeout_sec,
+            )
+            msg = await asyncio.wait_for(future, timeout=timeout_sec)
+        except asyncio.TimeoutError:
+            self.metrics.record_rpc(method, time.perf_counter() - started, ok=False)
+            raise TimeoutError(
+                f"Timed out after {timeout_sec}s waiting for MCP response to {method} (id {req_id})"
+            ) from None
+        except BaseException:
+            self.metrics.record_rpc(method, time.perf_counter() - started, ok=False)
+            raise
+        finally:
+            self._pending.pop(req_id, None)
+        self.metrics.record_rpc(method, time.perf_counter() - started, ok="error" not in msg)
+        return self._unwrap(method, msg)
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout_sec: float = 300) -> dict[str, Any]:
+        result = await self._request(
             "tools/call",
             {
                 "name": name,
@@ -151,14 +829,386 @@ class MCPClient:
             },
             timeout_sec=timeout_sec,
         )
+        if self.recorder is not None:
+            self.recorder.record(name, arguments, result)
+        return result
+
+    async def close(self) -> None:
+        self._closed_reason = self._closed_reason or "MCP client closed"
+        proc = self.proc
+        if proc is not None and proc.returncode is None:
+            proc.terminate()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def iter_sse_data(lines: Iterable[bytes]) -> Iterator[str]:
+    """The `data` payload of each event in a text/event-stream (multi-line data joined by newlines)."""
+    data: list[str] = []
+    for raw in lines:
+        line = raw.decode("utf-8", "replace").rstrip("\r\n")
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        field_name, _, value = line.partition(":")
+        if field_name == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+class HTTPConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one MCP endpoint, shared by worker threads.
+
+    A connection is checked out for a single request/response and goes back to
+    the idle list only once its response was read to the end and the server
+    did not ask to close it, so a session reuses a few sockets (and TLS
+    handshakes) instead of reconnecting per call.
+    """
+
+    def __init__(self, url: str, timeout_sec: float = 300):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"MCP URL must look like http(s)://host/path, got {url!r}")
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout_sec = timeout_sec
+        self.opened = 0
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        conn_cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return conn_cls(self.host, self.port, timeout=self.timeout_sec), False
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(
+        self,
+        method: str,
+        body: bytes | None,
+        headers: dict[str, str],
+        handle: Callable[[http.client.HTTPResponse], Any],
+        timeout_sec: float | None = None,
+    ) -> Any:
+        """Send one request and return `handle(response)`; `handle` should read the body to the end.
+
+        `timeout_sec` bounds each socket operation of this request (default: the pool's).
+        """
+        timeout = self.timeout_sec if timeout_sec is None else timeout_sec
+        for attempt in (1, 2):
+            conn, reused = self._checkout()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, self.path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 1:
+                    # The server dropped an idle keep-alive socket before reading our request.
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            try:
+                result = handle(response)
+            except BaseException:
+                conn.close()
+                raise
+            if response.isclosed() and not response.will_close:
+                self._checkin(conn)
+            else:
+                conn.close()
+            return result
+        raise AssertionError("unreachable")
 
     def close(self) -> None:
-        if self.proc.poll() is None:
-            self.proc.terminate()
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class MCPSessionExpired(RuntimeError):
+    """The server answered 404 for an Mcp-Session-Id it no longer knows."""
+
+    def __init__(self, session_id: str, message: str):
+        super().__init__(message)
+        self.session_id = session_id
+
+
+class HTTPMCPClient(AsyncMCPClient):
+    """AsyncMCPClient over MCP's streamable HTTP transport, with no bridge process.
+
+    Each JSON-RPC message is POSTed to the endpoint on a pooled keep-alive
+    connection. The server answers with JSON or an SSE stream, and every
+    message in it is routed by id like the stdio client's. Socket work runs on
+    a thread pool as wide as the connection pool. HTTP 429/5xx on a tool call
+    comes back as a retryable tool error, so make_api_request_async backs off
+    as usual.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        verbose: bool = False,
+        metrics: PublishMetrics | None = None,
+        rate_limiter: TokenBucket | None = None,
+        recorder: ResponseStore | None = None,
+        token: str | None = None,
+        pool_size: int = 8,
+    ):
+        super().__init__(url, verbose=verbose, metrics=metrics, rate_limiter=rate_limiter, recorder=recorder)
+        self.token = token
+        self.pool = HTTPConnectionPool(url)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, pool_size), thread_name_prefix="mcp-http")
+        self._session_id: str | None = None
+        self._protocol_version: str | None = None
+        self._started = False
+        self._exchanges: set[asyncio.Task[None]] = set()
+        self._session_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "HTTPMCPClient":
+        if not self._started:
+            await self._start()
+        return self
+
+    def _initialize_params(self) -> dict[str, Any]:
+        return {**super()._initialize_params(), "protocolVersion": MCP_HTTP_PROTOCOL_VERSION}
+
+    async def _start(self) -> None:
+        with self.metrics.phase("mcp_initialize"):
+            result = await self._request("initialize", self._initialize_params())
+        self._protocol_version = result.get("protocolVersion") or MCP_HTTP_PROTOCOL_VERSION
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}})
+        self._started = True
+
+    async def _request(self, method: str, params: dict[str, Any], timeout_sec: float = 180) -> dict[str, Any]:
+        started = time.monotonic()
+        try:
+            return await super()._request(method, params, timeout_sec)
+        except MCPSessionExpired as exc:
+            if method == "initialize":
+                raise
+            await self._renew_session(exc.session_id)
+        remaining = timeout_sec - (time.monotonic() - started)
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out after {timeout_sec}s renewing the MCP session for {method}")
+        return await super()._request(method, params, remaining)
+
+    async def _renew_session(self, expired: str) -> None:
+        """Run initialize again after the server forgot `expired`; concurrent callers renew once."""
+        async with self._session_lock:
+            if self._session_id != expired:
+                return
+            if self.verbose:
+                sys.stderr.write(f"[mcp] session {expired} expired; re-initializing\n")
+            self._session_id = None
+            self._protocol_version = None
+            await self._start()
+
+    def _headers(self) -> dict[str, str]:
+        headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        if self._protocol_version:
+            headers["MCP-Protocol-Version"] = self._protocol_version
+        return headers
+
+    async def _send(self, msg: dict[str, Any], deadline: float | None = None) -> None:
+        if "method" in msg and "id" in msg:
+            # The response resolves the request's Future; run the POST in the
+            # background so _request's timeout covers the whole exchange.
+            task = asyncio.create_task(self._post(msg, deadline))
+            self._exchanges.add(task)
+            task.add_done_callback(self._exchanges.discard)
+        else:
+            await self._post(msg, deadline)
+
+    async def _post(self, msg: dict[str, Any], deadline: float | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        method = msg.get("method")
+        if method not in (None, "initialize", "notifications/initialized") and self._session_lock.locked():
+            # A session renewal is in flight; wait so this goes out with the new session id.
+            async with self._session_lock:
+                pass
+        body = json.dumps(msg).encode("utf-8")
+        self.metrics.record_wire(sent=len(body))
+        session_id = self._session_id
+        try:
+            status, detail, retry_after = await loop.run_in_executor(
+                self._executor, self._exchange, body, self._headers(), loop, deadline
+            )
+        except (TimeoutError, socket.timeout):
+            # The socket ran out of the call's deadline (socket.timeout is only an alias of
+            # TimeoutError from 3.10); report it as _request's own timeout would.
+            self._fail(msg, TimeoutError(f"Timed out waiting for MCP HTTP response to {method}"))
+            return
+        except (OSError, http.client.HTTPException) as exc:
+            self._fail(msg, RuntimeError(f"MCP HTTP request for {method} failed: {exc!r}"))
+            return
+
+        if status in HTTP_RETRYABLE_STATUS and method == "tools/call":
+            self._route({"jsonrpc": "2.0", "id": msg["id"], "result": http_tool_error(status, detail, retry_after)})
+        elif status == 404 and session_id:
+            self._fail(msg, MCPSessionExpired(session_id, f"MCP HTTP 404 on {method}: session expired; {detail}"))
+        elif status >= 300:
+            self._fail(msg, RuntimeError(f"MCP HTTP {status} on {method}: {detail}"))
+        elif "method" in msg and msg.get("id") in self._pending:
+            self._fail(msg, RuntimeError(f"MCP server sent no response to {method} (id {msg['id']})"))
+
+    def _exchange(
+        self,
+        body: bytes,
+        headers: dict[str, str],
+        loop: asyncio.AbstractEventLoop,
+        deadline: float | None,
+    ) -> tuple[int, str, str | None]:
+        """Worker thread: POST one message and hand each message of the reply to the event loop.
+
+        The socket timeout is whatever is left of the caller's deadline once a
+        worker picks the message up, so retries and backoff keep their budget.
+        """
+        timeout_sec = None
+        if deadline is not None:
+            timeout_sec = deadline - time.monotonic()
+            if timeout_sec <= 0:
+                raise TimeoutError("deadline passed before the request was sent")
+
+        def handle(response: http.client.HTTPResponse) -> tuple[int, str, str | None]:
+            session_id = response.getheader("Mcp-Session-Id")
+            if session_id:
+                self._session_id = session_id
+            if response.status >= 300:
+                detail = response.read().decode("utf-8", "replace")[:300]
+                return response.status, detail, response.getheader("Retry-After")
+            if "text/event-stream" in (response.getheader("Content-Type") or ""):
+                for data in iter_sse_data(iter(response.readline, b"")):
+                    self._deliver(data, loop)
+                # readline() stops at the end of a sized body without releasing the connection.
+                response.read()
+            else:
+                self._deliver(response.read().decode("utf-8", "replace"), loop)
+            return response.status, "", None
+
+        return self.pool.request("POST", body, headers, handle, timeout_sec)
+
+    def _deliver(self, text: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.metrics.record_wire(received=len(text))
+        if not text.strip():
+            return
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            if self.verbose:
+                sys.stderr.write(f"[mcp] ignoring non-JSON HTTP body: {text[:200]}\n")
+            return
+        for msg in parsed if isinstance(parsed, list) else [parsed]:
+            if isinstance(msg, dict):
+                loop.call_soon_threadsafe(self._route, msg)
+
+    def _route(self, msg: dict[str, Any]) -> None:
+        if "method" in msg:
+            reply = self._handle_server_message(msg)
+            if reply is not None:
+                task = asyncio.create_task(self._post(reply))
+                self._exchanges.add(task)
+                task.add_done_callback(self._exchanges.discard)
+            return
+
+        future = self._pending.pop(msg.get("id"), None)  # type: ignore[arg-type]
+        if future is not None and not future.done():
+            future.set_result(msg)
+            return
+        self._keep_late_response(msg)
+
+    def _fail(self, msg: dict[str, Any], exc: Exception) -> None:
+        if "method" in msg and "id" in msg:
+            future = self._pending.pop(msg["id"], None)
+            if future is not None and not future.done():
+                future.set_exception(exc)
+        elif "method" in msg:
+            raise exc
+        else:
+            sys.stderr.write(f"[mcp] could not answer server request {msg.get('id')!r}: {exc}\n")
+
+    def _delete_session(self) -> None:
+        self.pool.request("DELETE", None, self._headers(), lambda response: response.read())
+
+    async def close(self) -> None:
+        self._closed_reason = self._closed_reason or "MCP client closed"
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(self._closed_reason))
+        self._pending.clear()
+        if self._session_id:
+            # Let the server drop the session now instead of at its idle timeout.
             try:
-                self.proc.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.proc.kill()
+                await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self._executor, self._delete_session), 5)
+            except (asyncio.TimeoutError, OSError, http.client.HTTPException):
+                pass
+            self._session_id = None
+        for task in list(self._exchanges):
+            task.cancel()
+        await asyncio.gather(*self._exchanges, return_exceptions=True)
+        self.pool.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ReplayMCPClient(AsyncMCPClient):
+    """AsyncMCPClient stand-in that answers reads from a ResponseStore and never spawns a bridge."""
+
+    def __init__(self, store: ResponseStore, verbose: bool = False, metrics: PublishMetrics | None = None):
+        super().__init__(store.source, verbose=verbose, metrics=metrics)
+        self.store = store
+
+    async def _start(self) -> None:
+        log(f"Replaying recorded MCP reads from {self.store.path} ({len(self.store.entries)} entries).")
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout_sec: float = 300) -> dict[str, Any]:
+        return self.store.replay(name, arguments)
+
+    async def close(self) -> None:
+        self._closed_reason = self._closed_reason or "MCP client closed"
+
+
+def http_tool_error(status: int, detail: str, retry_after: str | None) -> dict[str, Any]:
+    """A tools/call result standing in for an HTTP-level failure, shaped so classify_errors retries it."""
+    error: dict[str, Any] = {
+        "category": "RATE_LIMIT_ERROR" if status == 429 else "API_ERROR",
+        "code": HTTP_RETRYABLE_STATUS.get(status, "INTERNAL_SERVER_ERROR"),
+        "detail": f"HTTP {status}: {detail}".strip(),
+    }
+    if retry_after:
+        error["retry_after"] = retry_after
+    return {"isError": True, "content": [{"type": "text", "text": json.dumps({"errors": [error]})}]}
 
 
 def parse_tool_text_json(result: dict[str, Any]) -> dict[str, Any]:
@@ -166,16 +1216,88 @@ def parse_tool_text_json(result: dict[str, Any]) -> dict[str, Any]:
     if not content:
         return {}
     txt = content[0].get("text", "")
-    return json.loads(txt)
+    try:
+        return json.loads(txt)
+    except json.JSONDecodeError:
+        if not result.get("isError"):
+            raise
+        # Tool-level failures (bridge/auth/rate limit) come back as plain text. Leave the
+        # category empty so classify_errors treats them as transient.
+        return {"errors": [{"detail": txt}]}
+
+
+class RetryDecision(NamedTuple):
+    retry: bool
+    delay: float = 0.0
+    rate_limited: bool = False
+
+
+def retry_after_hint(raw: dict[str, Any], payload: dict[str, Any]) -> float | None:
+    """Seconds the server asked us to wait, from payload fields, tool _meta or error text."""
+    meta = raw.get("_meta") or {}
+    candidates: list[Any] = [
+        payload.get("retry_after"),
+        payload.get("retry_after_seconds"),
+        meta.get("retry_after") if isinstance(meta, dict) else None,
+        meta.get("retryAfter") if isinstance(meta, dict) else None,
+    ]
+    for error in payload.get("errors") or []:
+        if isinstance(error, dict):
+            candidates.append(error.get("retry_after"))
+            match = RETRY_AFTER_RE.search(str(error.get("detail") or ""))
+            if match:
+                candidates.append(match.group(1))
+    for value in candidates:
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            continue
+        if seconds >= 0:
+            return min(seconds, RETRY_MAX_SEC * 4)
+    return None
+
+
+def classify_errors(raw: dict[str, Any], payload: dict[str, Any], attempt: int) -> RetryDecision:
+    """
+    Decide whether a failed Square call is worth retrying and how long to wait.
+
+    Rate limits and server-side API errors retry; validation, auth, not-found
+    and version conflicts return at once. Errors with no category (bridge
+    hiccups) are treated as transient. Waits use full-jitter exponential
+    backoff, raised to any retry-after the response carried.
+    """
+    errors = [error for error in payload.get("errors") or [] if isinstance(error, dict)] or [{}]
+    rate_limited = False
+    retryable = True
+    for error in errors:
+        category = str(error.get("category") or "")
+        code = str(error.get("code") or "")
+        detail = str(error.get("detail") or "")
+        if category == "RATE_LIMIT_ERROR" or code == "RATE_LIMITED" or "rate limit" in detail.lower():
+            rate_limited = True
+        elif category in RETRYABLE_ERROR_CATEGORIES or code in RETRYABLE_ERROR_CODES:
+            continue
+        elif category or code:
+            retryable = False
+    if not retryable and not rate_limited:
+        return RetryDecision(retry=False)
+
+    delay = random.uniform(0, min(RETRY_MAX_SEC, RETRY_BASE_SEC * 2 ** (attempt - 1)))
+    hint = retry_after_hint(raw, payload)
+    if hint is not None:
+        delay = max(delay, hint + random.uniform(0, min(1.0, hint * 0.1)))
+    return RetryDecision(retry=True, delay=delay, rate_limited=rate_limited)
+
 
+def _payload_bytes(raw: dict[str, Any]) -> int:
+    return sum(len(item.get("text") or "") for item in raw.get("content") or [] if isinstance(item, dict))
 
-def make_api_request(
-    mcp: MCPClient,
+
+def _api_request_args(
     service: str,
     method: str,
     request: dict[str, Any] | None,
     characterization: str,
-    retries: int = 3,
 ) -> dict[str, Any]:
     args: dict[str, Any] = {
         "service": service,
@@ -184,21 +1306,73 @@ def make_api_request(
     }
     if request is not None:
         args["request"] = request
+    return args
+
+
+async def make_api_request_async(
+    mcp: AsyncMCPClient,
+    service: str,
+    method: str,
+    request: dict[str, Any] | None,
+    characterization: str,
+    retries: int = 3,
+) -> dict[str, Any]:
+    args = _api_request_args(service, method, request, characterization)
+    name = f"{service}.{method}"
+    request_bytes = len(json.dumps(request)) if request is not None else 0
 
-    wait = 1.0
     for attempt in range(1, retries + 1):
-        raw = mcp.call_tool("make_api_request", args)
+        throttled = await mcp.rate_limiter.acquire()
+        if throttled:
+            mcp.metrics.record_api_throttle(name, throttled)
+        started = time.perf_counter()
+        try:
+            raw = await mcp.call_tool("make_api_request", args)
+        except BaseException:
+            mcp.metrics.record_api_attempt(name, time.perf_counter() - started, request_bytes, 0)
+            mcp.metrics.record_api_call(name, ok=False)
+            raise
+        mcp.metrics.record_api_attempt(name, time.perf_counter() - started, request_bytes, _payload_bytes(raw))
         payload = parse_tool_text_json(raw)
         if payload.get("errors"):
-            if attempt == retries:
+            decision = classify_errors(raw, payload, attempt)
+            if not decision.retry or attempt == retries:
+                mcp.metrics.record_api_call(name, ok=False)
                 return payload
-            time.sleep(wait)
-            wait *= 2
+            if decision.rate_limited:
+                mcp.rate_limiter.pause(decision.delay)
+            mcp.metrics.record_api_retry(name, decision.delay)
+            await asyncio.sleep(decision.delay)
             continue
+        mcp.metrics.record_api_call(name, ok=True)
         return payload
     return {"errors": [{"detail": "Unknown error"}]}
 
 
+async def paginate_async(
+    mcp: AsyncMCPClient,
+    service: str,
+    method: str,
+    build_request: Callable[[str], dict[str, Any]],
+    items_key: str,
+    characterization: str,
+) -> list[dict[str, Any]]:
+    out: list[dict[str, Any]] = []
+    cursor = ""
+    while True:
+        payload = await make_api_request_async(
+            mcp,
+            service=service,
+            method=method,
+            request=build_request(cursor),
+            characterization=characterization,
+        )
+        out.extend(payload.get(items_key) or [])
+        cursor = payload.get("cursor") or ""
+        if not cursor:
+            return out
+
+
 @dataclass
 class PlannedShift:
     date: str
@@ -226,9 +1400,150 @@ def load_plan(path: Path) -> dict[str, Any]:
     return json.loads(path.read_text())
 
 
-def validate_plan(plan: dict[str, Any], max_shift_hours: float = 14.0) -> list[str]:
+class CompiledDay(NamedTuple):
+    week_idx: int
+    date: str
+    raw_date: Any
+    pending_request: bool
+    has_exception: bool
+
+
+class CompiledSlot(NamedTuple):
+    week_idx: int
+    slot_idx: int
+    date: str
+    role: str
+    start_dt: datetime
+    end_dt: datetime
+    start_at: str
+    end_at: str
+    assigned: tuple[str, ...]
+    name_keys: tuple[str, ...]
+    unassigned: int
+
+
+class CompiledPlan(NamedTuple):
+    days: list[CompiledDay]
+    slots: list[CompiledSlot]
+    invalid_slots: list[tuple[int, str, int]]  # week_idx, date, slot_idx
+
+
+def compile_plan(plan: dict[str, Any]) -> CompiledPlan:
+    """
+    Walk the planner export once into flat day/slot records.
+
+    Times are parsed, overnight ends rolled forward and assignee names
+    normalized here, so validation and extraction read the same
+    precomputed values instead of each re-parsing every slot.
+    """
+    days: list[CompiledDay] = []
+    slots: list[CompiledSlot] = []
+    invalid_slots: list[tuple[int, str, int]] = []
+
+    for week_idx, week in enumerate(plan.get("weeks") or []):
+        for day in week.get("days") or []:
+            day_date = (day.get("date") or "").strip()
+            days.append(
+                CompiledDay(
+                    week_idx=week_idx,
+                    date=day_date,
+                    raw_date=day.get("date"),
+                    pending_request=bool(day.get("pendingRequestId")),
+                    has_exception=bool(day.get("hasException")),
+                )
+            )
+            if not day_date:
+                continue
+
+            for slot_idx, slot in enumerate(day.get("slots") or []):
+                start_raw = (slot.get("start") or "").strip()
+                end_raw = (slot.get("end") or "").strip()
+                if not start_raw or not end_raw:
+                    continue
+
+                try:
+                    start_dt = parse_local_dt(day_date, start_raw)
+                    end_dt = parse_local_dt(day_date, end_raw)
+                except Exception:
+                    invalid_slots.append((week_idx, day_date, slot_idx))
+                    continue
+
+                if end_dt <= start_dt:
+                    end_dt = end_dt + timedelta(days=1)
+
+                assignments = slot.get("assignments") or []
+                headcount = max(1, int(slot.get("headcount") or len(assignments) or 1))
+                assigned: list[str] = []
+                for idx in range(headcount):
+                    name = ((assignments[idx] if idx < len(assignments) else "") or "").strip()
+                    if name:
+                        assigned.append(name)
+
+                slots.append(
+                    CompiledSlot(
+                        week_idx=week_idx,
+                        slot_idx=slot_idx,
+                        date=day_date,
+                        role=(slot.get("role") or "Scooper").strip(),
+                        start_dt=start_dt,
+                        end_dt=end_dt,
+                        start_at=iso_with_seconds(start_dt),
+                        end_at=iso_with_seconds(end_dt),
+                        assigned=tuple(assigned),
+                        name_keys=tuple(normalize_name(name) for name in assigned),
+                        unassigned=headcount - len(assigned),
+                    )
+                )
+
+    return CompiledPlan(days=days, slots=slots, invalid_slots=invalid_slots)
+
+
+class AssignmentWindow(NamedTuple):
+    start_dt: datetime
+    end_dt: datetime
+    date: str
+    name: str
+    source: str = ""
+
+
+def assignment_windows(compiled: CompiledPlan, source: str = "") -> dict[str, list[AssignmentWindow]]:
+    """Group every assigned position's time window by normalized assignee name."""
+    windows: dict[str, list[AssignmentWindow]] = {}
+    for slot in compiled.slots:
+        for assigned, key in zip(slot.assigned, slot.name_keys):
+            windows.setdefault(key, []).append(AssignmentWindow(slot.start_dt, slot.end_dt, slot.date, assigned, source))
+    return windows
+
+
+def find_overlaps(windows: list[AssignmentWindow]) -> list[tuple[AssignmentWindow, AssignmentWindow]]:
+    """
+    Return every pair of overlapping windows, earlier-starting window first.
+
+    Sweeps windows in start order while a heap holds the ones still open;
+    each new window overlaps exactly the open ones that have not ended by
+    its start. O(n log n) plus one step per reported pair.
+    """
+    pairs: list[tuple[AssignmentWindow, AssignmentWindow]] = []
+    active: list[tuple[datetime, int, AssignmentWindow]] = []
+    for seq, window in enumerate(sorted(windows, key=lambda w: (w.start_dt, w.end_dt))):
+        while active and active[0][0] <= window.start_dt:
+            heapq.heappop(active)
+        pairs.extend((other, window) for _end, _seq, other in active)
+        heapq.heappush(active, (window.end_dt, seq, window))
+    return pairs
+
+
+def _window_label(window: AssignmentWindow) -> str:
+    return f"{window.date} {window.start_dt.strftime('%H:%M')}-{window.end_dt.strftime('%H:%M')}"
+
+
+def validate_plan(
+    plan: dict[str, Any],
+    max_shift_hours: float = 14.0,
+    compiled: CompiledPlan | None = None,
+) -> list[str]:
+    compiled = compiled or compile_plan(plan)
     issues: list[str] = []
-    assignment_windows: dict[str, list[tuple[datetime, datetime, str, str]]] = {}
 
     next_week = (plan.get("approvals") or {}).get("nextWeek") or {}
     status = (next_week.get("status") or "").lower()
@@ -260,120 +1575,66 @@ def validate_plan(plan: dict[str, Any], max_shift_hours: float = 14.0) -> list[s
         if not square_location_id:
             issues.append("Square location_id is missing from plan export payload.")
 
-    weeks = plan.get("weeks") or []
     seen_day_dates: set[str] = set()
-    for week_idx, week in enumerate(weeks):
-        for day in week.get("days") or []:
-            day_date = (day.get("date") or "").strip()
-            if day_date:
-                if day_date in seen_day_dates:
-                    issues.append(f"Duplicate day date in export payload: {day_date}.")
-                seen_day_dates.add(day_date)
-            if day.get("pendingRequestId"):
-                issues.append(f"Week {week_idx + 1} day {day.get('date')}: pending request exists.")
-            if day.get("hasException"):
-                issues.append(f"Week {week_idx + 1} day {day.get('date')}: unsubmitted exceptions exist.")
-
-            for slot_idx, slot in enumerate(day.get("slots") or []):
-                start_raw = (slot.get("start") or "").strip()
-                end_raw = (slot.get("end") or "").strip()
-                if not day_date or not start_raw or not end_raw:
-                    continue
-
-                try:
-                    start_dt = parse_local_dt(day_date, start_raw)
-                    end_dt = parse_local_dt(day_date, end_raw)
-                except Exception:
-                    issues.append(f"Week {week_idx + 1} day {day_date} slot {slot_idx + 1}: invalid start/end time.")
-                    continue
-
-                if end_dt <= start_dt:
-                    end_dt = end_dt + timedelta(days=1)
-
-                duration_hours = (end_dt - start_dt).total_seconds() / 3600
-                if duration_hours > max_shift_hours:
-                    issues.append(
-                        f"Week {week_idx + 1} day {day_date} slot {slot_idx + 1}: shift duration {duration_hours:.2f}h exceeds {max_shift_hours:.2f}h limit."
-                    )
+    for day in compiled.days:
+        if day.date:
+            if day.date in seen_day_dates:
+                issues.append(f"Duplicate day date in export payload: {day.date}.")
+            seen_day_dates.add(day.date)
+        if day.pending_request:
+            issues.append(f"Week {day.week_idx + 1} day {day.raw_date}: pending request exists.")
+        if day.has_exception:
+            issues.append(f"Week {day.week_idx + 1} day {day.raw_date}: unsubmitted exceptions exist.")
+
+    for week_idx, day_date, slot_idx in compiled.invalid_slots:
+        issues.append(f"Week {week_idx + 1} day {day_date} slot {slot_idx + 1}: invalid start/end time.")
+
+    for slot in compiled.slots:
+        duration_hours = (slot.end_dt - slot.start_dt).total_seconds() / 3600
+        if duration_hours > max_shift_hours:
+            issues.append(
+                f"Week {slot.week_idx + 1} day {slot.date} slot {slot.slot_idx + 1}: shift duration {duration_hours:.2f}h exceeds {max_shift_hours:.2f}h limit."
+            )
 
-                assignments = slot.get("assignments") or []
-                headcount = max(1, int(slot.get("headcount") or len(assignments) or 1))
-                for assign_idx in range(headcount):
-                    assigned = (assignments[assign_idx] if assign_idx < len(assignments) else "") or ""
-                    assigned = assigned.strip()
-                    if not assigned:
-                        continue
-                    key = normalize_name(assigned)
-                    assignment_windows.setdefault(key, []).append((start_dt, end_dt, day_date, assigned))
-
-    for _name_key, windows in assignment_windows.items():
-        ordered = sorted(windows, key=lambda row: row[0])
-        for idx in range(1, len(ordered)):
-            prev_start, prev_end, prev_date, prev_name = ordered[idx - 1]
-            curr_start, curr_end, curr_date, _ = ordered[idx]
-            if curr_start < prev_end:
-                issues.append(
-                    f"Overlapping shifts for '{prev_name}' between {prev_date} {prev_start.strftime('%H:%M')}-{prev_end.strftime('%H:%M')} and {curr_date} {curr_start.strftime('%H:%M')}-{curr_end.strftime('%H:%M')}."
-                )
-                break
+    for windows in assignment_windows(compiled).values():
+        for first, second in find_overlaps(windows):
+            issues.append(
+                f"Overlapping shifts for '{first.name}' between {_window_label(first)} and {_window_label(second)}."
+            )
 
     return sorted(set(issues))
 
 
-def extract_planned_shifts(plan: dict[str, Any], location_code: str) -> tuple[list[PlannedShift], int]:
+def extract_planned_shifts(
+    plan: dict[str, Any],
+    location_code: str,
+    compiled: CompiledPlan | None = None,
+) -> tuple[list[PlannedShift], int]:
+    compiled = compiled or compile_plan(plan)
     location_id = LOCATION_IDS[location_code]
     rows: list[PlannedShift] = []
     unassigned_positions = 0
 
-    for week in plan.get("weeks") or []:
-        for day in week.get("days") or []:
-            day_date = day.get("date")
-            if not day_date:
-                continue
-            for slot in day.get("slots") or []:
-                role = (slot.get("role") or "Scooper").strip()
-                start_raw = (slot.get("start") or "").strip()
-                end_raw = (slot.get("end") or "").strip()
-                if not start_raw or not end_raw:
-                    continue
-
-                try:
-                    start_dt = parse_local_dt(day_date, start_raw)
-                    end_dt = parse_local_dt(day_date, end_raw)
-                except Exception:
-                    continue
-
-                if end_dt <= start_dt:
-                    end_dt = end_dt + timedelta(days=1)
-
-                assignments = slot.get("assignments") or []
-                headcount = max(1, int(slot.get("headcount") or len(assignments) or 1))
-                for idx in range(headcount):
-                    assigned = (assignments[idx] if idx < len(assignments) else "") or ""
-                    assigned = assigned.strip()
-                    if not assigned:
-                        unassigned_positions += 1
-                        continue
-
-                    rows.append(
-                        PlannedShift(
-                            date=day_date,
-                            role=role,
-                            assigned_name=assigned,
-                            location_code=location_code,
-                            location_id=location_id,
-                            start_at=iso_with_seconds(start_dt),
-                            end_at=iso_with_seconds(end_dt),
-                        )
-                    )
+    for slot in compiled.slots:
+        unassigned_positions += slot.unassigned
+        for assigned in slot.assigned:
+            rows.append(
+                PlannedShift(
+                    date=slot.date,
+                    role=slot.role,
+                    assigned_name=assigned,
+                    location_code=location_code,
+                    location_id=location_id,
+                    start_at=slot.start_at,
+                    end_at=slot.end_at,
+                )
+            )
 
     return rows, unassigned_positions
 
 
-def fetch_team_members(mcp: MCPClient, location_id: str) -> list[dict[str, Any]]:
-    out: list[dict[str, Any]] = []
-    cursor = ""
-    while True:
+def team_members_request(location_id: str) -> Callable[[str], dict[str, Any]]:
+    def build(cursor: str) -> dict[str, Any]:
         req: dict[str, Any] = {
             "query": {
                 "filter": {
@@ -385,18 +1646,20 @@ def fetch_team_members(mcp: MCPClient, location_id: str) -> list[dict[str, Any]]
         }
         if cursor:
             req["cursor"] = cursor
-        payload = make_api_request(
-            mcp,
-            service="team",
-            method="searchMembers",
-            request=req,
-            characterization="Resolve team members for staffing plan publish",
-        )
-        out.extend(payload.get("team_members") or [])
-        cursor = payload.get("cursor") or ""
-        if not cursor:
-            break
-    return out
+        return req
+
+    return build
+
+
+async def fetch_team_members_async(mcp: AsyncMCPClient, location_id: str) -> list[dict[str, Any]]:
+    return await paginate_async(
+        mcp,
+        service="team",
+        method="searchMembers",
+        build_request=team_members_request(location_id),
+        items_key="team_members",
+        characterization="Resolve team members for staffing plan publish",
+    )
 
 
 def team_member_maps(team_members: list[dict[str, Any]]) -> tuple[dict[str, list[str]], dict[str, str]]:
@@ -416,50 +1679,90 @@ def team_member_maps(team_members: list[dict[str, Any]]) -> tuple[dict[str, list
     return by_norm, id_to_name
 
 
-def resolve_member_id(name: str, by_norm: dict[str, list[str]], id_to_name: dict[str, str]) -> tuple[str | None, str | None]:
-    wanted = normalize_name(name)
-    ids = by_norm.get(wanted) or []
-    if len(ids) == 1:
-        return ids[0], None
-    if len(ids) > 1:
-        return None, f"Ambiguous name '{name}' matched {len(ids)} active team members"
-
-    # Fuzzy fallback: token containment.
-    wanted_tokens = set(wanted.split())
-    candidates: list[str] = []
-    for tm_id, full in id_to_name.items():
-        norm_full = normalize_name(full)
-        full_tokens = set(norm_full.split())
-        if wanted_tokens and (wanted_tokens.issubset(full_tokens) or full_tokens.issubset(wanted_tokens)):
-            candidates.append(tm_id)
-
-    if len(candidates) == 1:
-        return candidates[0], None
-    if len(candidates) > 1:
-        return None, f"Ambiguous fuzzy match for '{name}'"
-
-    return None, f"No active team member match for '{name}'"
-
-
-def fetch_jobs(mcp: MCPClient) -> list[dict[str, Any]]:
-    jobs: list[dict[str, Any]] = []
-    cursor = ""
-    while True:
-        req: dict[str, Any] = {}
-        if cursor:
-            req["cursor"] = cursor
-        payload = make_api_request(
-            mcp,
-            service="team",
-            method="listJobs",
-            request=req,
-            characterization="Resolve job IDs for staffing plan publish",
-        )
-        jobs.extend(payload.get("jobs") or [])
-        cursor = payload.get("cursor") or ""
-        if not cursor:
-            break
-    return jobs
+class MemberResolver:
+    """
+    Resolves planner names against one location's team directory.
+
+    Member names are normalized and tokenized once into an inverted index
+    (token -> member ids), so the fuzzy fallback answers "planner tokens are
+    a subset of the member's" and "member tokens are a subset of the
+    planner's" from posting lists instead of rescanning the directory.
+    Answers are memoized per distinct planner name.
+    """
+
+    def __init__(self, by_norm: dict[str, list[str]], id_to_name: dict[str, str]):
+        self.by_norm = by_norm
+        self.id_to_name = id_to_name
+        self._token_counts: dict[str, int] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._tokenless: list[str] = []
+        self._memo: dict[str, tuple[str | None, str | None]] = {}
+
+        for tm_id, full in id_to_name.items():
+            tokens = set(normalize_name(full).split())
+            self._token_counts[tm_id] = len(tokens)
+            if not tokens:
+                self._tokenless.append(tm_id)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(tm_id)
+
+    def _fuzzy_candidates(self, wanted_tokens: set[str]) -> set[str]:
+        if not wanted_tokens:
+            return set()
+
+        # Members holding every planner token: intersect postings, rarest first.
+        postings = sorted((self._postings.get(token, set()) for token in wanted_tokens), key=len)
+        supersets = set(postings[0]).intersection(*postings[1:])
+
+        # Members whose every token is a planner token: count hits per member.
+        hits: dict[str, int] = {}
+        for token in wanted_tokens:
+            for tm_id in self._postings.get(token, ()):
+                hits[tm_id] = hits.get(tm_id, 0) + 1
+        subsets = {tm_id for tm_id, count in hits.items() if count == self._token_counts[tm_id]}
+
+        return supersets | subsets | set(self._tokenless)
+
+    def _resolve(self, name: str) -> tuple[str | None, str | None]:
+        wanted = normalize_name(name)
+        ids = self.by_norm.get(wanted) or []
+        if len(ids) == 1:
+            return ids[0], None
+        if len(ids) > 1:
+            return None, f"Ambiguous name '{name}' matched {len(ids)} active team members"
+
+        candidates = self._fuzzy_candidates(set(wanted.split()))
+        if len(candidates) == 1:
+            return next(iter(candidates)), None
+        if len(candidates) > 1:
+            return None, f"Ambiguous fuzzy match for '{name}'"
+
+        return None, f"No active team member match for '{name}'"
+
+    def resolve(self, name: str) -> tuple[str | None, str | None]:
+        """Return (team_member_id, None) or (None, reason)."""
+        hit = self._memo.get(name)
+        if hit is None:
+            hit = self._memo[name] = self._resolve(name)
+        return hit
+
+
+def jobs_request(cursor: str) -> dict[str, Any]:
+    req: dict[str, Any] = {}
+    if cursor:
+        req["cursor"] = cursor
+    return req
+
+
+async def fetch_jobs_async(mcp: AsyncMCPClient) -> list[dict[str, Any]]:
+    return await paginate_async(
+        mcp,
+        service="team",
+        method="listJobs",
+        build_request=jobs_request,
+        items_key="jobs",
+        characterization="Resolve job IDs for staffing plan publish",
+    )
 
 
 def build_job_lookup(jobs: list[dict[str, Any]]) -> dict[str, str]:
@@ -503,16 +1806,11 @@ def role_to_job_id(role: str, job_ids: dict[str, str]) -> str:
     return job_ids["scooper"]
 
 
-def fetch_existing_scheduled_shifts(
-    mcp: MCPClient,
-    location_id: str,
-    start_at: str,
-    end_at: str,
-) -> dict[tuple[str, str, str, str, str], dict[str, Any]]:
-    existing: dict[tuple[str, str, str, str, str], dict[str, Any]] = {}
-    cursor = ""
+ExistingShiftKey = tuple[str, str, str, str, str]
 
-    while True:
+
+def scheduled_shifts_request(location_id: str, start_at: str, end_at: str) -> Callable[[str], dict[str, Any]]:
+    def build(cursor: str) -> dict[str, Any]:
         req: dict[str, Any] = {
             "query": {
                 "filter": {
@@ -531,37 +1829,85 @@ def fetch_existing_scheduled_shifts(
         }
         if cursor:
             req["cursor"] = cursor
+        return req
 
-        payload = make_api_request(
-            mcp,
-            service="labor",
-            method="searchScheduledShifts",
-            request=req,
-            characterization="Find existing scheduled shifts to prevent duplicates",
+    return build
+
+
+def normalize_square_time(value: str) -> str:
+    """Render a Square RFC 3339 timestamp in the planner's form (ET offset, seconds)."""
+    if not value:
+        return ""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        return value
+    return iso_with_seconds(parsed.astimezone(ET))
+
+
+def index_existing_shifts(shifts: list[dict[str, Any]]) -> dict[ExistingShiftKey, dict[str, Any]]:
+    existing: dict[ExistingShiftKey, dict[str, Any]] = {}
+    for shift in shifts:
+        details = shift.get("draft_shift_details") or shift.get("published_shift_details") or {}
+        if details.get("is_deleted"):
+            continue
+        key = (
+            details.get("team_member_id") or "",
+            details.get("location_id") or "",
+            details.get("job_id") or "",
+            normalize_square_time(details.get("start_at") or ""),
+            normalize_square_time(details.get("end_at") or ""),
         )
+        if all(key):
+            existing[key] = {
+                "id": shift.get("id"),
+                "version": shift.get("version"),
+            }
+    return existing
 
-        for shift in payload.get("scheduled_shifts") or []:
-            details = shift.get("draft_shift_details") or shift.get("published_shift_details") or {}
-            if details.get("is_deleted"):
-                continue
-            key = (
-                details.get("team_member_id") or "",
-                details.get("location_id") or "",
-                details.get("job_id") or "",
-                details.get("start_at") or "",
-                details.get("end_at") or "",
-            )
-            if all(key):
-                existing[key] = {
-                    "id": shift.get("id"),
-                    "version": shift.get("version"),
-                }
 
-        cursor = payload.get("cursor") or ""
-        if not cursor:
-            break
+def current_shift_from_square(shift: dict[str, Any]) -> CurrentShift | None:
+    draft = shift.get("draft_shift_details") or {}
+    live = shift.get("published_shift_details") or {}
+    details = draft or live
+    if not shift.get("id") or details.get("is_deleted"):
+        return None
+
+    start_at = normalize_square_time(details.get("start_at") or "")
+    end_at = normalize_square_time(details.get("end_at") or "")
+    if not (details.get("team_member_id") and details.get("job_id") and start_at and end_at):
+        return None
+
+    compared = ("team_member_id", "job_id", "start_at", "end_at", "is_deleted")
+    return CurrentShift(
+        shift_id=shift["id"],
+        version=shift.get("version") if isinstance(shift.get("version"), int) else None,
+        team_member_id=details["team_member_id"],
+        location_id=details.get("location_id") or "",
+        job_id=details["job_id"],
+        date=start_at[:10],
+        start_at=start_at,
+        end_at=end_at,
+        published=bool(live) and all(live.get(name) == details.get(name) for name in compared),
+    )
 
-    return existing
+
+async def search_scheduled_shifts_async(
+    mcp: AsyncMCPClient,
+    location_id: str,
+    start_at: str,
+    end_at: str,
+) -> list[dict[str, Any]]:
+    return await paginate_async(
+        mcp,
+        service="labor",
+        method="searchScheduledShifts",
+        build_request=scheduled_shifts_request(location_id, start_at, end_at),
+        items_key="scheduled_shifts",
+        characterization="Find existing scheduled shifts to prevent duplicates",
+    )
 
 
 def deterministic_idempotency(seed: str) -> str:
@@ -569,161 +1915,1281 @@ def deterministic_idempotency(seed: str) -> str:
     return str(uuid.uuid5(uuid.NAMESPACE_URL, digest))
 
 
-def main() -> None:
-    args = parse_args()
-    if args.dry_run:
-        args.apply = False
-    plan_file = Path(args.plan_file).expanduser().resolve()
+def shift_seed(row: PlannedShift, team_member_id: str, job_id: str) -> str:
+    return f"{row.location_id}|{team_member_id}|{job_id}|{row.start_at}|{row.end_at}|{row.role}"
+
+
+class ResolvedShift(NamedTuple):
+    row: PlannedShift
+    team_member_id: str
+    job_id: str
+
+    @property
+    def date(self) -> str:
+        return self.row.date
+
+    @property
+    def key(self) -> ExistingShiftKey:
+        return (self.team_member_id, self.row.location_id, self.job_id, self.row.start_at, self.row.end_at)
+
+    @property
+    def slot_hash(self) -> str:
+        row = self.row
+        return _json_digest([row.date, row.role, row.start_at, row.end_at, normalize_name(row.assigned_name)])
+
+
+class CurrentShift(NamedTuple):
+    """A shift already in Square, as recorded in the ledger or read back from a search."""
+
+    shift_id: str
+    version: int | None
+    team_member_id: str
+    location_id: str
+    job_id: str
+    date: str
+    start_at: str
+    end_at: str
+    role: str = ""
+    slot_hash: str = ""
+    published: bool = False
+
+    @property
+    def key(self) -> ExistingShiftKey:
+        return (self.team_member_id, self.location_id, self.job_id, self.start_at, self.end_at)
+
+
+@dataclass
+class ShiftChanges:
+    creates: list[ResolvedShift] = field(default_factory=list)
+    updates: list[tuple[CurrentShift, ResolvedShift]] = field(default_factory=list)
+    deletes: list[CurrentShift] = field(default_factory=list)
+    unchanged: list[tuple[CurrentShift, ResolvedShift]] = field(default_factory=list)
+
+
+def _shift_distance(shift: CurrentShift, item: ResolvedShift) -> float:
+    def seconds(value: str) -> float:
+        return datetime.fromisoformat(value).timestamp()
+
+    return abs(seconds(shift.start_at) - seconds(item.row.start_at)) + abs(seconds(shift.end_at) - seconds(item.row.end_at))
+
+
+def _least_cost_matching(cost: list[list[float]]) -> list[tuple[int, int]]:
+    """
+    Least-cost matching of min(rows, cols) (row, col) pairs, sorted by row.
+
+    Hungarian method with potentials, O(rows^2 * cols). Shift movement is
+    not monotone once windows nest (a short shift inside a long one), so an
+    order-preserving match can miss the cheapest pairing; groups here are
+    one person's shifts on one day, so exact assignment is cheap.
+    """
+    rows = len(cost)
+    cols = len(cost[0]) if rows else 0
+    if rows > cols:
+        return sorted((i, j) for j, i in _least_cost_matching([list(col) for col in zip(*cost)]))
+
+    inf = float("inf")
+    row_pot = [0.0] * (rows + 1)
+    col_pot = [0.0] * (cols + 1)
+    owner = [0] * (cols + 1)  # owner[j]: 1-based row matched to column j, 0 if free
+    via = [0] * (cols + 1)
+    for i in range(1, rows + 1):
+        owner[0] = i
+        j0 = 0
+        slack = [inf] * (cols + 1)
+        done = [False] * (cols + 1)
+        while owner[j0]:
+            done[j0] = True
+            i0 = owner[j0]
+            delta, j1 = inf, 0
+            for j in range(1, cols + 1):
+                if done[j]:
+                    continue
+                reduced = cost[i0 - 1][j - 1] - row_pot[i0] - col_pot[j]
+                if reduced < slack[j]:
+                    slack[j], via[j] = reduced, j0
+                if slack[j] < delta:
+                    delta, j1 = slack[j], j
+            for j in range(cols + 1):
+                if done[j]:
+                    row_pot[owner[j]] += delta
+                    col_pot[j] -= delta
+                else:
+                    slack[j] -= delta
+            j0 = j1
+        # Flip the augmenting path back to the root.
+        while j0:
+            j1 = via[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    return sorted((owner[j] - 1, j - 1) for j in range(1, cols + 1) if owner[j])
+
+
+def _pair_closest(
+    wanted: list[ResolvedShift], have: list[CurrentShift]
+) -> tuple[list[tuple[CurrentShift, ResolvedShift]], list[ResolvedShift], list[CurrentShift]]:
+    """Pair as many shifts as possible with the least total start/end movement."""
+    wanted = sorted(wanted, key=lambda item: item.row.start_at)
+    have = sorted(have, key=lambda shift: shift.start_at)
+    matched = _least_cost_matching([[_shift_distance(shift, item) for shift in have] for item in wanted])
+
+    pairs = [(have[j], wanted[i]) for i, j in matched]
+    used_wanted = {i for i, _j in matched}
+    used_have = {j for _i, j in matched}
+    rest_wanted = [item for i, item in enumerate(wanted) if i not in used_wanted]
+    rest_have = [shift for j, shift in enumerate(have) if j not in used_have]
+    return pairs, rest_wanted, rest_have
+
+
+def diff_shifts(planned: list[ResolvedShift], current: list[CurrentShift]) -> ShiftChanges:
+    """
+    Smallest create/update/delete set that turns `current` into `planned`.
+
+    Exact key matches are kept (updated only when the source slot changed,
+    e.g. a role rename). Remaining shifts are paired per (team member, day,
+    job) by closest times, then per (team member, day) so a role change is
+    one update too; only what is left unpaired is created or deleted.
+    """
+    changes = ShiftChanges()
+    by_key: dict[ExistingShiftKey, list[CurrentShift]] = {}
+    for shift in current:
+        by_key.setdefault(shift.key, []).append(shift)
+
+    wanted: list[ResolvedShift] = []
+    for item in planned:
+        matches = by_key.get(item.key)
+        if not matches:
+            wanted.append(item)
+            continue
+        shift = matches.pop()
+        if shift.slot_hash and shift.slot_hash != item.slot_hash:
+            changes.updates.append((shift, item))
+        else:
+            changes.unchanged.append((shift, item))
+    have = [shift for shifts in by_key.values() for shift in shifts]
+
+    for match_job in (True, False):
+        groups: dict[tuple[str, str, str], tuple[list[ResolvedShift], list[CurrentShift]]] = {}
+        for item in wanted:
+            groups.setdefault((item.team_member_id, item.date, item.job_id if match_job else ""), ([], []))[0].append(item)
+        for shift in have:
+            groups.setdefault((shift.team_member_id, shift.date, shift.job_id if match_job else ""), ([], []))[1].append(shift)
+
+        wanted, have = [], []
+        for group_wanted, group_have in groups.values():
+            pairs, rest_wanted, rest_have = _pair_closest(group_wanted, group_have)
+            changes.updates.extend(pairs)
+            wanted.extend(rest_wanted)
+            have.extend(rest_have)
+
+    changes.creates.extend(wanted)
+    changes.deletes.extend(have)
+    return changes
+
+
+@dataclass
+class ShiftOutcome:
+    created: bool = False
+    updated: bool = False
+    deleted: bool = False
+    published: bool = False
+    shift_id: str | None = None
+    version: int | None = None
+    errors: list[str] = field(default_factory=list)
+
+
+def shift_details(
+    team_member_id: str,
+    location_id: str,
+    job_id: str,
+    start_at: str,
+    end_at: str,
+    role: str,
+    is_deleted: bool = False,
+) -> dict[str, Any]:
+    return {
+        "team_member_id": team_member_id,
+        "location_id": location_id,
+        "job_id": job_id,
+        "start_at": start_at,
+        "end_at": end_at,
+        "notes": f"Joyus Ice Cream Shop planner · {role}" if role else "Joyus Ice Cream Shop planner",
+        "is_deleted": is_deleted,
+    }
+
+
+def _take_shift(payload: dict[str, Any], outcome: ShiftOutcome) -> None:
+    scheduled_shift = payload.get("scheduled_shift") or {}
+    outcome.shift_id = scheduled_shift.get("id") or outcome.shift_id
+    if isinstance(scheduled_shift.get("version"), int):
+        outcome.version = scheduled_shift["version"]
+
+
+async def publish_shift(mcp: AsyncMCPClient, outcome: ShiftOutcome, seed: str) -> None:
+    publish_req: dict[str, Any] = {
+        "id": outcome.shift_id,
+        "idempotency_key": deterministic_idempotency(seed + "|publish"),
+    }
+    if isinstance(outcome.version, int):
+        publish_req["version"] = outcome.version
+
+    publish_payload = await make_api_request_async(
+        mcp,
+        service="labor",
+        method="publishScheduledShift",
+        request=publish_req,
+        characterization="Publish scheduled shifts from approved staffing plan",
+    )
+    if publish_payload.get("errors"):
+        outcome.errors.append(f"Publish failed for shift {outcome.shift_id}: {publish_payload.get('errors')}")
+    else:
+        outcome.published = True
+        _take_shift(publish_payload, outcome)
+
+
+class PendingPublish(NamedTuple):
+    outcome: ShiftOutcome
+    seed: str
+
+
+async def publish_or_defer(
+    mcp: AsyncMCPClient,
+    outcome: ShiftOutcome,
+    seed: str,
+    deferred: list[PendingPublish] | None,
+) -> None:
+    """Publish now, or queue the shift for the bulk publish phase when `deferred` is given."""
+    if deferred is None:
+        await publish_shift(mcp, outcome, seed)
+    else:
+        deferred.append(PendingPublish(outcome, seed))
+
+
+def _bulk_publish_results(payload: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Per-shift entries of a bulk publish response, keyed by shift id."""
+    responses = payload.get("responses")
+    if isinstance(responses, dict):
+        return {shift_id: entry for shift_id, entry in responses.items() if isinstance(entry, dict)}
+    results: dict[str, dict[str, Any]] = {}
+    for entry in responses if isinstance(responses, list) else []:
+        shift_id = isinstance(entry, dict) and (entry.get("scheduled_shift") or {}).get("id")
+        if shift_id:
+            results[shift_id] = entry
+    return results
+
+
+async def bulk_publish_shifts(mcp: AsyncMCPClient, batch: list[PendingPublish]) -> None:
+    """Publish one batch with a single BulkPublishScheduledShifts call.
+
+    The idempotency key hashes the batch's ids and versions, so a retried batch
+    is recognised while any version change makes a new key. If the whole call
+    fails (not per-shift errors), the batch falls back to one publish per shift.
+    """
+    if len(batch) == 1:
+        await publish_shift(mcp, batch[0].outcome, batch[0].seed)
+        return
+
+    scheduled_shifts: dict[str, dict[str, Any]] = {}
+    for pending in batch:
+        version = pending.outcome.version
+        scheduled_shifts[pending.outcome.shift_id or ""] = {"version": version} if isinstance(version, int) else {}
+    batch_seed = "|".join(f"{shift_id}:{data.get('version')}" for shift_id, data in sorted(scheduled_shifts.items()))
+
+    payload = await make_api_request_async(
+        mcp,
+        service="labor",
+        method="bulkPublishScheduledShifts",
+        request={
+            "idempotency_key": deterministic_idempotency(batch_seed + "|bulk-publish"),
+            "scheduled_shifts": scheduled_shifts,
+        },
+        characterization="Publish scheduled shifts from approved staffing plan",
+    )
+    results = _bulk_publish_results(payload)
+    if payload.get("errors") and not results:
+        log(f"Bulk publish of {len(batch)} shifts failed ({payload.get('errors')}); publishing one at a time.")
+        for pending in batch:
+            await publish_shift(mcp, pending.outcome, pending.seed)
+        return
+
+    for pending in batch:
+        outcome = pending.outcome
+        entry = results.get(outcome.shift_id or "")
+        if entry is None:
+            outcome.errors.append(f"Publish failed for shift {outcome.shift_id}: missing from bulk publish response")
+        elif entry.get("errors"):
+            outcome.errors.append(f"Publish failed for shift {outcome.shift_id}: {entry.get('errors')}")
+        else:
+            outcome.published = True
+            _take_shift(entry, outcome)
+
+
+async def publish_pending(mcp: AsyncMCPClient, pending: list[PendingPublish], limit: asyncio.Semaphore) -> None:
+    """Publish written shifts in the largest batches Square accepts, batches in flight up to `limit`."""
+    ordered = sorted(pending, key=lambda item: item.outcome.shift_id or "")
+    batches = [ordered[start : start + BULK_PUBLISH_MAX] for start in range(0, len(ordered), BULK_PUBLISH_MAX)]
+
+    async def run_batch(batch: list[PendingPublish]) -> None:
+        async with limit:
+            await bulk_publish_shifts(mcp, batch)
+
+    await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+
+async def create_and_publish_shift(
+    mcp: AsyncMCPClient,
+    row: PlannedShift,
+    team_member_id: str,
+    job_id: str,
+    publish: bool,
+    deferred: list[PendingPublish] | None = None,
+) -> ShiftOutcome:
+    outcome = ShiftOutcome()
+    seed = shift_seed(row, team_member_id, job_id)
+
+    create_req = {
+        "idempotency_key": deterministic_idempotency(seed + "|create"),
+        "scheduled_shift": {
+            "draft_shift_details": shift_details(
+                team_member_id, row.location_id, job_id, row.start_at, row.end_at, row.role
+            )
+        },
+    }
+
+    create_payload = await make_api_request_async(
+        mcp,
+        service="labor",
+        method="createScheduledShift",
+        request=create_req,
+        characterization="Create scheduled shifts from approved staffing plan",
+    )
+    if create_payload.get("errors"):
+        outcome.errors.append(f"Create failed for {row.assigned_name} {row.start_at}: {create_payload.get('errors')}")
+        return outcome
+
+    outcome.created = True
+    _take_shift(create_payload, outcome)
+
+    if publish and outcome.shift_id:
+        await publish_or_defer(mcp, outcome, seed, deferred)
+
+    return outcome
+
+
+async def update_and_publish_shift(
+    mcp: AsyncMCPClient,
+    current: CurrentShift,
+    target: ResolvedShift,
+    publish: bool,
+    deferred: list[PendingPublish] | None = None,
+) -> ShiftOutcome:
+    row = target.row
+    outcome = ShiftOutcome(shift_id=current.shift_id, version=current.version)
+    seed = f"{current.shift_id}|{current.version}|" + shift_seed(row, target.team_member_id, target.job_id)
+
+    scheduled_shift: dict[str, Any] = {
+        "draft_shift_details": shift_details(
+            target.team_member_id, row.location_id, target.job_id, row.start_at, row.end_at, row.role
+        )
+    }
+    if isinstance(current.version, int):
+        scheduled_shift["version"] = current.version
+
+    update_payload = await make_api_request_async(
+        mcp,
+        service="labor",
+        method="updateScheduledShift",
+        request={"id": current.shift_id, "scheduled_shift": scheduled_shift},
+        characterization="Update scheduled shifts to match a revised staffing plan",
+    )
+    if update_payload.get("errors"):
+        outcome.errors.append(
+            f"Update failed for shift {current.shift_id} ({row.assigned_name} {row.start_at}): {update_payload.get('errors')}"
+        )
+        return outcome
+
+    outcome.updated = True
+    _take_shift(update_payload, outcome)
+
+    if publish:
+        await publish_or_defer(mcp, outcome, seed, deferred)
+
+    return outcome
+
+
+async def delete_shift(
+    mcp: AsyncMCPClient,
+    current: CurrentShift,
+    publish: bool,
+    deferred: list[PendingPublish] | None = None,
+) -> ShiftOutcome:
+    """Square has no delete call for scheduled shifts; mark the draft deleted and publish that."""
+    outcome = ShiftOutcome(shift_id=current.shift_id, version=current.version)
+    seed = f"{current.shift_id}|{current.version}|delete"
+
+    scheduled_shift: dict[str, Any] = {
+        "draft_shift_details": shift_details(
+            current.team_member_id,
+            current.location_id,
+            current.job_id,
+            current.start_at,
+            current.end_at,
+            current.role,
+            is_deleted=True,
+        )
+    }
+    if isinstance(current.version, int):
+        scheduled_shift["version"] = current.version
+
+    delete_payload = await make_api_request_async(
+        mcp,
+        service="labor",
+        method="updateScheduledShift",
+        request={"id": current.shift_id, "scheduled_shift": scheduled_shift},
+        characterization="Remove scheduled shifts dropped from a revised staffing plan",
+    )
+    if delete_payload.get("errors"):
+        outcome.errors.append(f"Delete failed for shift {current.shift_id}: {delete_payload.get('errors')}")
+        return outcome
+
+    outcome.deleted = True
+    _take_shift(delete_payload, outcome)
+
+    if publish:
+        await publish_or_defer(mcp, outcome, seed, deferred)
+
+    return outcome
+
+
+@dataclass
+class PreparedPlan:
+    plan_file: Path
+    location_code: str
+    validation_issues: list[str]
+    planned_rows: list[PlannedShift]
+    unassigned_positions: int
+    compiled: CompiledPlan
+
+    @property
+    def location_id(self) -> str:
+        return LOCATION_IDS[self.location_code]
+
+
+def prepare_plan(plan_file: Path, args: argparse.Namespace) -> PreparedPlan:
+    """Offline preflight: load, validate and extract rows before any network call."""
     plan = load_plan(plan_file)
 
     location_code = args.location or plan.get("location")
     if location_code not in LOCATION_IDS:
         raise RuntimeError(f"Unknown location code: {location_code}")
 
-    validation_issues = validate_plan(plan, max_shift_hours=max(args.max_shift_hours, 0.5))
+    compiled = compile_plan(plan)
+    validation_issues = validate_plan(plan, max_shift_hours=max(args.max_shift_hours, 0.5), compiled=compiled)
     if validation_issues and not args.force:
         raise RuntimeError("Plan validation failed:\n- " + "\n- ".join(validation_issues))
 
-    planned_rows, unassigned_positions = extract_planned_shifts(plan, location_code)
+    planned_rows, unassigned_positions = extract_planned_shifts(plan, location_code, compiled=compiled)
     if unassigned_positions > 0 and not args.force:
         raise RuntimeError(f"Plan contains {unassigned_positions} unassigned positions. Resolve before publish.")
 
-    if not planned_rows:
-        log("No assigned shifts to publish.")
-        return
-
-    start_at = min(row.start_at for row in planned_rows)
-    end_at = max(row.end_at for row in planned_rows)
+    return PreparedPlan(
+        plan_file=plan_file,
+        location_code=location_code,
+        validation_issues=validation_issues,
+        planned_rows=planned_rows,
+        unassigned_positions=unassigned_positions,
+        compiled=compiled,
+    )
 
-    mcp = MCPClient("https://mcp.squareup.com/sse", verbose=args.verbose)
-    try:
-        team_members = fetch_team_members(mcp, LOCATION_IDS[location_code])
-        by_norm, id_to_name = team_member_maps(team_members)
 
-        jobs = fetch_jobs(mcp)
-        job_lookup = build_job_lookup(jobs)
-        job_ids = choose_job_ids(job_lookup, args)
+def collect_plan_files(plan_files: list[str], plan_dirs: list[str]) -> list[Path]:
+    paths: list[Path] = [Path(raw).expanduser().resolve() for raw in plan_files]
+    for raw_dir in plan_dirs:
+        directory = Path(raw_dir).expanduser().resolve()
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Plan directory not found: {directory}")
+        found = sorted(directory.glob("*.json"))
+        if not found:
+            raise FileNotFoundError(f"No plan JSON files in {directory}")
+        paths.extend(found)
+
+    unique: list[Path] = []
+    seen: set[Path] = set()
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def prepare_plans(plan_files: list[Path], args: argparse.Namespace) -> list[PreparedPlan]:
+    """Preflight every plan and report all failures together, not just the first."""
+    if len(plan_files) == 1:
+        return [prepare_plan(plan_files[0], args)]
+
+    prepared: list[PreparedPlan] = []
+    failures: list[str] = []
+    for plan_file in plan_files:
+        try:
+            prepared.append(prepare_plan(plan_file, args))
+        except (OSError, ValueError, RuntimeError) as exc:
+            failures.append(f"{plan_file}: {exc}")
+
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(plan_files)} plans failed preflight:\n- " + "\n- ".join(failures))
+
+    conflicts = cross_plan_conflicts(prepared)
+    if conflicts and not args.force:
+        raise RuntimeError("Plans double-book staff across files:\n- " + "\n- ".join(sorted(msg for _a, _b, msg in conflicts)))
+    for idx, plan in enumerate(prepared):
+        plan.validation_issues.extend(sorted(msg for a, b, msg in conflicts if idx in (a, b)))
+    return prepared
+
+
+def cross_plan_conflicts(plans: list[PreparedPlan]) -> list[tuple[int, int, str]]:
+    """
+    Overlapping assignments for the same person in different plans, as
+    (plan index, plan index, message). Within-plan overlaps are already
+    reported by validate_plan, so only cross-plan pairs are returned.
+    """
+    by_name: dict[str, list[AssignmentWindow]] = {}
+    for idx, plan in enumerate(plans):
+        for key, windows in assignment_windows(plan.compiled, source=str(idx)).items():
+            by_name.setdefault(key, []).extend(windows)
+
+    conflicts: list[tuple[int, int, str]] = []
+    for windows in by_name.values():
+        for first, second in find_overlaps(windows):
+            if first.source == second.source:
+                continue
+            a, b = int(first.source), int(second.source)
+            plan_a, plan_b = plans[a], plans[b]
+            msg = (
+                f"Overlapping shifts for '{first.name}' across plans: "
+                f"{plan_a.location_code} {_window_label(first)} ({plan_a.plan_file.name}) and "
+                f"{plan_b.location_code} {_window_label(second)} ({plan_b.plan_file.name})."
+            )
+            conflicts.append((a, b, msg))
+    return conflicts
+
+
+class DirectoryCache:
+    """
+    On-disk cache for derived directory lookups (job title map, team member
+    name maps), one JSON file per kind and location.
+
+    Entries carry a format version, the MCP source, a fetch timestamp and a
+    SHA-256 of the payload; anything stale, foreign or corrupt is treated as
+    a miss and overwritten by the next fetch.
+    """
+
+    def __init__(
+        self,
+        root: Path | None,
+        ttl_sec: float,
+        refresh: bool = False,
+        verbose: bool = False,
+        source: str = SQUARE_MCP_URL,
+    ):
+        self.root = source_scoped(root, source) if root and ttl_sec > 0 else None
+        self.source = source
+        self.ttl_sec = ttl_sec
+        self.refresh = refresh
+        self.verbose = verbose
 
-        existing = fetch_existing_scheduled_shifts(mcp, LOCATION_IDS[location_code], start_at, end_at)
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "DirectoryCache":
+        root = Path(args.cache_dir).expanduser().resolve() if args.cache_dir else None
+        return cls(
+            root,
+            args.cache_ttl_hours * 3600,
+            refresh=args.refresh_cache,
+            verbose=args.verbose,
+            source=mcp_source(args),
+        )
 
-        unmatched: list[str] = []
-        prepared: list[tuple[PlannedShift, str, str]] = []  # row, team_member_id, job_id
-        for row in planned_rows:
-            team_member_id, err = resolve_member_id(row.assigned_name, by_norm, id_to_name)
-            if not team_member_id:
-                unmatched.append(err or f"Unresolved name: {row.assigned_name}")
-                continue
-            job_id = role_to_job_id(row.role, job_ids)
-            prepared.append((row, team_member_id, job_id))
-
-        if unmatched and not args.allow_unmatched_names:
-            uniq = sorted(set(unmatched))
-            raise RuntimeError("Unresolved team members:\n- " + "\n- ".join(uniq))
-
-        created = 0
-        published = 0
-        skipped_existing = 0
-        skipped_unmatched = len(unmatched)
-        errors: list[str] = []
-
-        for row, team_member_id, job_id in prepared:
-            key = (team_member_id, row.location_id, job_id, row.start_at, row.end_at)
-            if key in existing:
-                skipped_existing += 1
+    def _path(self, kind: str, key: str) -> Path:
+        assert self.root is not None
+        return self.root / f"{kind}-{key}.json"
+
+    def _miss(self, path: Path, reason: str) -> None:
+        if self.verbose:
+            log(f"[cache] miss {path.name}: {reason}")
+
+    def load(self, kind: str, key: str) -> Any | None:
+        if self.root is None or self.refresh:
+            return None
+        path = self._path(kind, key)
+        try:
+            entry = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            self._miss(path, f"unreadable ({exc})")
+            return None
+
+        if not isinstance(entry, dict) or entry.get("version") != DIRECTORY_CACHE_VERSION:
+            self._miss(path, "format version mismatch")
+            return None
+        if entry.get("source") != self.source or entry.get("kind") != kind or entry.get("key") != key:
+            self._miss(path, "entry belongs to a different lookup")
+            return None
+        age = time.time() - float(entry.get("fetched_at") or 0)
+        if not 0 <= age < self.ttl_sec:
+            self._miss(path, f"expired ({age / 3600:.1f}h old)")
+            return None
+        if entry.get("sha256") != _json_digest(entry.get("data")):
+            self._miss(path, "checksum mismatch")
+            return None
+
+        if self.verbose:
+            log(f"[cache] hit {path.name} ({age / 60:.0f}m old)")
+        return entry["data"]
+
+    def store(self, kind: str, key: str, data: Any) -> None:
+        if self.root is None:
+            return
+        path = self._path(kind, key)
+        entry = {
+            "version": DIRECTORY_CACHE_VERSION,
+            "source": self.source,
+            "kind": kind,
+            "key": key,
+            "fetched_at": time.time(),
+            "sha256": _json_digest(data),
+            "data": data,
+        }
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(entry))
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            # A read-only or full cache dir must never block a publish.
+            tmp_path.unlink(missing_ok=True)
+            log(f"[cache] could not write {path}: {exc}")
+
+
+def day_fingerprints(dates: set[str], resolved: list[ResolvedShift]) -> dict[str, str]:
+    """Content hash per plan day over its resolved shifts (people, job, times, source slot)."""
+    per_day: dict[str, list[list[str]]] = {day: [] for day in dates}
+    for item in resolved:
+        per_day.setdefault(item.row.date, []).append([*item.key, item.slot_hash])
+    return {day: _json_digest(sorted(rows)) for day, rows in per_day.items()}
+
+
+def day_bounds(days: set[str]) -> tuple[str, str]:
+    """Local midnight before the first day to local midnight after the last."""
+    first = parse_local_dt(min(days), "00:00")
+    last = parse_local_dt(max(days), "00:00") + timedelta(days=1)
+    return iso_with_seconds(first), iso_with_seconds(last)
+
+
+def day_windows(days: set[str], max_days: int = 1) -> list[tuple[str, str]]:
+    """
+    Split plan days into search windows: runs of consecutive dates, each at
+    most `max_days` long, so gaps between sparse plan days are never paged.
+    """
+    windows: list[tuple[str, str]] = []
+    run: list[str] = []
+    for day in sorted(days):
+        contiguous = bool(run) and date.fromisoformat(day) - date.fromisoformat(run[-1]) == timedelta(days=1)
+        if run and (not contiguous or len(run) >= max(1, max_days)):
+            windows.append(day_bounds(set(run)))
+            run = []
+        run.append(day)
+    if run:
+        windows.append(day_bounds(set(run)))
+    return windows
+
+
+async def search_scheduled_shifts_windowed(
+    mcp: AsyncMCPClient,
+    location_id: str,
+    days: set[str],
+    max_days: int,
+    limit: asyncio.Semaphore,
+) -> list[dict[str, Any]]:
+    """Search each day window concurrently and merge the pages, deduplicated by shift id."""
+
+    async def search(window: tuple[str, str]) -> list[dict[str, Any]]:
+        async with limit:
+            return await search_scheduled_shifts_async(mcp, location_id, *window)
+
+    merged: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for shifts in await asyncio.gather(*(search(window) for window in day_windows(days, max_days))):
+        for shift in shifts:
+            shift_id = shift.get("id") or ""
+            if shift_id and shift_id in seen:
                 continue
+            seen.add(shift_id)
+            merged.append(shift)
+    return merged
+
+
+class ShiftLedger:
+    """
+    What this script last wrote to Square for one location.
+
+    Holds every shift it created (id, version, key, source slot hash,
+    published flag) and a fingerprint per plan day. On the next run, days
+    whose fingerprint still matches are skipped without fetching or sending
+    anything, and changed days are diffed against the recorded shifts so
+    only the needed creates, updates and deletes go out.
+    """
+
+    def __init__(self, path: Path | None, location_id: str, source: str = SQUARE_MCP_URL):
+        self.path = path
+        self.location_id = location_id
+        self.source = source
+        self.days: dict[str, str] = {}
+        self.shifts: dict[str, dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @classmethod
+    def load(cls, root: Path | None, location_id: str, source: str = SQUARE_MCP_URL) -> "ShiftLedger":
+        path = source_scoped(root, source) / f"ledger-{location_id}.json" if root else None
+        ledger = cls(path, location_id, source)
+        if ledger.path is None or not ledger.path.exists():
+            return ledger
+        try:
+            data = json.loads(ledger.path.read_text())
+        except (OSError, ValueError) as exc:
+            raise RuntimeError(f"Shift ledger {ledger.path} is unreadable ({exc}); move it aside to rebuild it.") from exc
+        if data.get("version") != SHIFT_LEDGER_VERSION or data.get("location_id") != location_id:
+            raise RuntimeError(f"Shift ledger {ledger.path} does not match this script or location; move it aside.")
+        # Ledgers written before sources were recorded only ever held Square shifts.
+        if data.get("source", SQUARE_MCP_URL) != source:
+            raise RuntimeError(f"Shift ledger {ledger.path} was written for another MCP server; move it aside.")
+        ledger.days = dict(data.get("days") or {})
+        ledger.shifts = dict(data.get("shifts") or {})
+        return ledger
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        document = {
+            "version": SHIFT_LEDGER_VERSION,
+            "location_id": self.location_id,
+            "source": self.source,
+            "updated_at": datetime.now(ET).isoformat(timespec="seconds"),
+            "days": dict(sorted(self.days.items())),
+            "shifts": self.shifts,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(document, indent=2))
+        os.replace(tmp_path, self.path)
+
+    def known_dates(self) -> set[str]:
+        return set(self.days) | {entry["date"] for entry in self.shifts.values()}
+
+    def changed_days(self, fingerprints: dict[str, str], publish: bool, full_sync: bool) -> set[str]:
+        """Plan days to diff, plus ledger days inside the plan's span that the plan dropped."""
+        if full_sync or not self.enabled:
+            changed = set(fingerprints)
+        else:
+            unpublished = {entry["date"] for entry in self.shifts.values() if not entry.get("published")}
+            changed = {
+                day
+                for day, fingerprint in fingerprints.items()
+                if self.days.get(day) != fingerprint or (publish and day in unpublished)
+            }
+        if fingerprints:
+            first, last = min(fingerprints), max(fingerprints)
+            changed |= {day for day in self.known_dates() if first <= day <= last and day not in fingerprints}
+        return changed
+
+    def current_shifts(self, dates: set[str]) -> list[CurrentShift]:
+        return [
+            CurrentShift(
+                shift_id=shift_id,
+                version=entry.get("version"),
+                team_member_id=entry["team_member_id"],
+                location_id=self.location_id,
+                job_id=entry["job_id"],
+                date=entry["date"],
+                start_at=entry["start_at"],
+                end_at=entry["end_at"],
+                role=entry.get("role") or "",
+                slot_hash=entry.get("slot_hash") or "",
+                published=bool(entry.get("published")),
+            )
+            for shift_id, entry in self.shifts.items()
+            if entry["date"] in dates
+        ]
+
+    def record(self, outcome: ShiftOutcome, item: ResolvedShift) -> None:
+        if not outcome.shift_id:
+            return
+        self.shifts[outcome.shift_id] = {
+            "date": item.row.date,
+            "team_member_id": item.team_member_id,
+            "job_id": item.job_id,
+            "start_at": item.row.start_at,
+            "end_at": item.row.end_at,
+            "role": item.row.role,
+            "name": item.row.assigned_name,
+            "slot_hash": item.slot_hash,
+            "version": outcome.version,
+            "published": outcome.published,
+        }
 
-            notes = f"Joyus Ice Cream Shop planner · {row.role}"
-            seed = f"{row.location_id}|{team_member_id}|{job_id}|{row.start_at}|{row.end_at}|{row.role}"
-            create_idempotency = deterministic_idempotency(seed + "|create")
+    def mark_published(self, outcome: ShiftOutcome) -> None:
+        entry = self.shifts.get(outcome.shift_id or "")
+        if entry is not None and outcome.published:
+            entry["published"] = True
+            entry["version"] = outcome.version
 
-            if not args.apply:
-                log(
-                    f"DRY RUN create: {row.date} {row.start_at}->{row.end_at} | {row.assigned_name} | {row.role} | job={job_id}"
-                )
-                continue
+    def forget(self, shift_id: str) -> None:
+        self.shifts.pop(shift_id, None)
 
-            create_req = {
-                "idempotency_key": create_idempotency,
-                "scheduled_shift": {
-                    "draft_shift_details": {
-                        "team_member_id": team_member_id,
-                        "location_id": row.location_id,
-                        "job_id": job_id,
-                        "start_at": row.start_at,
-                        "end_at": row.end_at,
-                        "notes": notes,
-                        "is_deleted": False,
-                    }
-                },
-            }
+    def set_day(self, day: str, fingerprint: str | None) -> None:
+        if fingerprint is None:
+            self.days.pop(day, None)
+        else:
+            self.days[day] = fingerprint
+
+
+class SessionLookups:
+    """
+    Directory fetches memoized for one MCP session.
+
+    Jobs are account-wide and team members are per location, so plans in a
+    batch that share a location await the same in-flight fetch instead of
+    each paging the directory again. Results are also read through the
+    on-disk DirectoryCache across runs.
+    """
+
+    def __init__(self, mcp: AsyncMCPClient, args: argparse.Namespace, cache: DirectoryCache):
+        self.mcp = mcp
+        self.args = args
+        self.cache = cache
+        self._job_ids: asyncio.Task[dict[str, str]] | None = None
+        self._members: dict[str, asyncio.Task[MemberResolver]] = {}
+        self._members_from_cache: set[str] = set()
+        self._members_refetched: set[str] = set()
+
+    async def _load_job_ids(self) -> dict[str, str]:
+        job_lookup = self.cache.load("jobs", "all")
+        if job_lookup is None:
+            job_lookup = build_job_lookup(await fetch_jobs_async(self.mcp))
+            self.cache.store("jobs", "all", job_lookup)
+        return choose_job_ids(job_lookup, self.args)
+
+    async def _load_members(
+        self, location_id: str, use_cache: bool = True
+    ) -> MemberResolver:
+        cached = self.cache.load("team_members", location_id) if use_cache else None
+        if cached is not None:
+            self._members_from_cache.add(location_id)
+            return MemberResolver(cached["by_norm"], cached["id_to_name"])
+        by_norm, id_to_name = team_member_maps(await fetch_team_members_async(self.mcp, location_id))
+        self.cache.store("team_members", location_id, {"by_norm": by_norm, "id_to_name": id_to_name})
+        return MemberResolver(by_norm, id_to_name)
+
+    def refetch_members(self, location_id: str) -> asyncio.Task[MemberResolver] | None:
+        """Replace a cached member directory with a live fetch, once per location; None if already live."""
+        if location_id not in self._members_from_cache:
+            return None
+        if location_id not in self._members_refetched:
+            self._members_refetched.add(location_id)
+            self._members[location_id] = asyncio.ensure_future(self._load_members(location_id, use_cache=False))
+        return self._members[location_id]
+
+    def job_ids(self) -> asyncio.Task[dict[str, str]]:
+        if self._job_ids is None:
+            self._job_ids = asyncio.ensure_future(self._load_job_ids())
+        return self._job_ids
+
+    def members(self, location_id: str) -> asyncio.Task[MemberResolver]:
+        task = self._members.get(location_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load_members(location_id))
+            self._members[location_id] = task
+        return task
+
+
+async def publish_plan(
+    mcp: AsyncMCPClient,
+    prepared: PreparedPlan,
+    args: argparse.Namespace,
+    limit: asyncio.Semaphore,
+    lookups: SessionLookups,
+    ledger: ShiftLedger,
+) -> dict[str, Any]:
+    planned_rows = prepared.planned_rows
+    timer = PhaseTimer()
+
+    with timer.phase("lookups"):
+        resolver, job_ids = await asyncio.gather(
+            lookups.members(prepared.location_id),
+            lookups.job_ids(),
+        )
 
-            create_payload = make_api_request(
-                mcp,
-                service="labor",
-                method="createScheduledShift",
-                request=create_req,
-                characterization="Create scheduled shifts from approved staffing plan",
+        if any(resolver.resolve(row.assigned_name)[0] is None for row in planned_rows):
+            # A cached directory may predate a new hire; retry names against a live fetch.
+            refetch = lookups.refetch_members(prepared.location_id)
+            if refetch is not None:
+                resolver = await refetch
+
+    unmatched: list[str] = []
+    unmatched_days: set[str] = set()
+    resolved: list[ResolvedShift] = []
+    for row in planned_rows:
+        team_member_id, err = resolver.resolve(row.assigned_name)
+        if not team_member_id:
+            unmatched.append(err or f"Unresolved name: {row.assigned_name}")
+            unmatched_days.add(row.date)
+            continue
+        job_id = role_to_job_id(row.role, job_ids)
+        resolved.append(ResolvedShift(row, team_member_id, job_id))
+
+    if unmatched and not args.allow_unmatched_names:
+        uniq = sorted(set(unmatched))
+        raise RuntimeError("Unresolved team members:\n- " + "\n- ".join(uniq))
+
+    plan_days = {day.date for day in prepared.compiled.days if day.date}
+    fingerprints = day_fingerprints(plan_days, resolved)
+    dirty_days = ledger.changed_days(fingerprints, args.publish, args.full_sync or args.reconcile)
+    if ledger.enabled and not (args.full_sync or args.reconcile):
+        log(f"{prepared.plan_file.name}: {len(dirty_days)} of {len(plan_days)} plan days changed since the last publish.")
+
+    todo = [item for item in resolved if item.row.date in dirty_days]
+    # Reconcile must see every changed day (including emptied ones); a plain
+    # publish only needs the days it is about to create shifts on.
+    search_days = dirty_days if args.reconcile else {item.date for item in todo}
+    square_shifts: list[dict[str, Any]] = []
+    if search_days:
+        with timer.phase("search_existing"):
+            square_shifts = await search_scheduled_shifts_windowed(
+                mcp, prepared.location_id, search_days, args.fetch_window_days, limit
             )
-            if create_payload.get("errors"):
-                errors.append(f"Create failed for {row.assigned_name} {row.start_at}: {create_payload.get('errors')}")
+    existing = index_existing_shifts(square_shifts)
+
+    if args.reconcile:
+        # Square is the source of truth; the ledger only contributes slot hashes.
+        current: list[CurrentShift] = []
+        for raw_shift in square_shifts:
+            shift = current_shift_from_square(raw_shift)
+            if shift is None or shift.date not in dirty_days or shift.location_id != prepared.location_id:
                 continue
+            entry = ledger.shifts.get(shift.shift_id) or {}
+            current.append(shift._replace(role=entry.get("role") or "", slot_hash=entry.get("slot_hash") or ""))
+        live_ids = {shift.shift_id for shift in current}
+        if args.apply:
+            for stale in ledger.current_shifts(dirty_days):
+                if stale.shift_id not in live_ids:
+                    ledger.forget(stale.shift_id)
+    else:
+        current = ledger.current_shifts(dirty_days)
+
+    changes = diff_shifts(todo, current)
+    # A row whose name did not resolve (a typo, a new hire) drops out of the
+    # plan, so that person's live shift would look unplanned. Never delete on
+    # such a day; keep its old fingerprint so it is diffed again once fixed.
+    held_deletes = [shift for shift in changes.deletes if shift.date in unmatched_days]
+    if held_deletes:
+        changes.deletes = [shift for shift in changes.deletes if shift.date not in unmatched_days]
+        log(
+            f"{prepared.plan_file.name}: kept {len(held_deletes)} shift(s) on days with unresolved names: "
+            + ", ".join(sorted({shift.date for shift in held_deletes}))
+        )
+    # Deleting is opt-in. Without --delete-removed, list what would go and keep
+    # those days dirty so a later run with the flag still finds them.
+    pending_deletes: list[CurrentShift] = []
+    if changes.deletes and not args.delete_removed:
+        pending_deletes, changes.deletes = changes.deletes, []
+        log(
+            f"{prepared.plan_file.name}: left {len(pending_deletes)} shift(s) dropped from the plan in place; "
+            "pass --delete-removed to delete them:"
+        )
+        for shift in pending_deletes:
+            log(f"  pending delete: {shift.shift_id} {shift.start_at}->{shift.end_at} | team_member={shift.team_member_id}")
+    held_days = {shift.date for shift in held_deletes + pending_deletes}
+    if args.reconcile and args.apply:
+        for shift, item in changes.unchanged:
+            if shift.shift_id not in ledger.shifts:
+                ledger.record(ShiftOutcome(shift_id=shift.shift_id, version=shift.version, published=shift.published), item)
+    skipped_existing = 0
+    creates: list[ResolvedShift] = []
+    adopted: list[CurrentShift] = []
+    square_by_id = {raw_shift.get("id"): raw_shift for raw_shift in square_shifts}
+    for item in changes.creates:
+        match = existing.get(item.key)
+        if match is None:
+            creates.append(item)
+            continue
+        skipped_existing += 1
+        shift = current_shift_from_square(square_by_id.get(match["id"]) or {})
+        if shift is None:
+            continue
+        # Adopt it as reconcile does, so a later edit of this day updates it instead of duplicating it.
+        if args.apply:
+            ledger.record(ShiftOutcome(shift_id=shift.shift_id, version=shift.version, published=shift.published), item)
+        adopted.append(shift)
+    republish = [shift for shift, _item in changes.unchanged if args.publish and not shift.published]
+    republish.extend(shift for shift in adopted if args.publish and not shift.published)
+
+    settled: list[tuple[ShiftOutcome, str]] = []
+    # Writes queue their publish here; one bulk call per batch then publishes them all.
+    deferred: list[PendingPublish] = []
+
+    def settle(outcome: ShiftOutcome, day: str) -> ShiftOutcome:
+        settled.append((outcome, day))
+        return outcome
+
+    async def run_create(item: ResolvedShift) -> ShiftOutcome:
+        async with limit:
+            outcome = await create_and_publish_shift(
+                mcp, item.row, item.team_member_id, item.job_id, args.publish, deferred
+            )
+        if outcome.created:
+            ledger.record(outcome, item)
+        return settle(outcome, item.row.date)
+
+    async def run_update(shift: CurrentShift, item: ResolvedShift) -> ShiftOutcome:
+        async with limit:
+            outcome = await update_and_publish_shift(mcp, shift, item, args.publish, deferred)
+        if outcome.updated:
+            ledger.record(outcome, item)
+        return settle(outcome, shift.date)
+
+    async def run_delete(shift: CurrentShift) -> ShiftOutcome:
+        async with limit:
+            outcome = await delete_shift(mcp, shift, args.publish, deferred)
+        if outcome.deleted:
+            ledger.forget(shift.shift_id)
+        return settle(outcome, shift.date)
+
+    def queue_republish(shift: CurrentShift) -> ShiftOutcome:
+        outcome = ShiftOutcome(shift_id=shift.shift_id, version=shift.version)
+        deferred.append(PendingPublish(outcome, f"{shift.shift_id}|{shift.version}"))
+        return settle(outcome, shift.date)
+
+    outcomes: list[ShiftOutcome] = []
+    if not args.apply:
+        for item in creates:
+            row = item.row
+            log(
+                f"DRY RUN create: {row.date} {row.start_at}->{row.end_at} | {row.assigned_name} | {row.role} | job={item.job_id}"
+            )
+        for shift, item in changes.updates:
+            row = item.row
+            log(
+                f"DRY RUN update: {shift.shift_id} {shift.start_at}->{shift.end_at} => {row.start_at}->{row.end_at} | {row.assigned_name} | {row.role} | job={item.job_id}"
+            )
+        for shift in changes.deletes:
+            log(f"DRY RUN delete: {shift.shift_id} {shift.start_at}->{shift.end_at} | team_member={shift.team_member_id}")
+    else:
+        # Writes pipeline across rows; gather keeps outcomes in plan order.
+        with timer.phase("writes"):
+            outcomes = await asyncio.gather(
+                *(run_create(item) for item in creates),
+                *(run_update(shift, item) for shift, item in changes.updates),
+                *(run_delete(shift) for shift in changes.deletes),
+            )
+        outcomes.extend(queue_republish(shift) for shift in republish)
+        if deferred:
+            with timer.phase("publish"):
+                await publish_pending(mcp, deferred, limit)
+            for pending in deferred:
+                ledger.mark_published(pending.outcome)
+        failed_days = {day for outcome, day in settled if outcome.errors}
+        for day in dirty_days - failed_days - held_days:
+            ledger.set_day(day, fingerprints.get(day))
+
+    errors = [error for outcome in outcomes for error in outcome.errors]
+    return {
+        "generated_at": datetime.now(ET).isoformat(timespec="seconds"),
+        "plan_file": str(prepared.plan_file),
+        "location": prepared.location_code,
+        "location_id": prepared.location_id,
+        "mode": "apply" if args.apply else "dry-run",
+        "publish": bool(args.publish),
+        "total_assigned_rows": len(planned_rows),
+        "prepared_rows": len(resolved),
+        "unassigned_positions": prepared.unassigned_positions,
+        "changed_days": len(dirty_days),
+        "unchanged_days": len(plan_days - dirty_days),
+        "skipped_unmatched": len(unmatched),
+        "held_deletes": len(held_deletes),
+        "pending_deletes": len(pending_deletes),
+        "skipped_existing": skipped_existing,
+        "unchanged": len(resolved) - len(todo) + len(changes.unchanged),
+        "created": sum(outcome.created for outcome in outcomes),
+        "updated": sum(outcome.updated for outcome in outcomes),
+        "deleted": sum(outcome.deleted for outcome in outcomes),
+        "published": sum(outcome.published for outcome in outcomes),
+        "timings_sec": timer.as_dict(),
+        "validation_issues": prepared.validation_issues,
+        "errors": errors,
+    }
 
-            created += 1
-            scheduled_shift = create_payload.get("scheduled_shift") or {}
-            shift_id = scheduled_shift.get("id")
-            version = scheduled_shift.get("version")
 
-            if args.publish and shift_id:
-                publish_req: dict[str, Any] = {
-                    "id": shift_id,
-                    "idempotency_key": deterministic_idempotency(seed + "|publish"),
-                }
-                if isinstance(version, int):
-                    publish_req["version"] = version
-
-                publish_payload = make_api_request(
-                    mcp,
-                    service="labor",
-                    method="publishScheduledShift",
-                    request=publish_req,
-                    characterization="Publish scheduled shifts from approved staffing plan",
-                )
-                if publish_payload.get("errors"):
-                    errors.append(f"Publish failed for shift {shift_id}: {publish_payload.get('errors')}")
-                else:
-                    published += 1
-
-        report = {
-            "generated_at": datetime.now(ET).isoformat(timespec="seconds"),
-            "plan_file": str(plan_file),
-            "location": location_code,
-            "location_id": LOCATION_IDS[location_code],
-            "mode": "apply" if args.apply else "dry-run",
-            "publish": bool(args.publish),
-            "total_assigned_rows": len(planned_rows),
-            "prepared_rows": len(prepared),
-            "unassigned_positions": unassigned_positions,
-            "skipped_unmatched": skipped_unmatched,
-            "skipped_existing": skipped_existing,
-            "created": created,
-            "published": published,
-            "validation_issues": validation_issues,
-            "errors": errors,
-        }
+async def connect_mcp(
+    args: argparse.Namespace,
+    metrics: PublishMetrics,
+    command: list[str] | None,
+    recorder: ResponseStore | None,
+) -> AsyncMCPClient:
+    """Open the MCP session over native HTTP when configured, otherwise (or when that fails in auto mode) the bridge."""
+    rate_limiter = TokenBucket(rate=max(0.0, args.max_rps))
+    token = os.environ.get(MCP_TOKEN_ENV) or None
+    transport = args.mcp_transport
+    if transport == "auto":
+        transport = "http" if not command and (token or args.mcp_url) else "bridge"
+
+    if transport == "http":
+        client = HTTPMCPClient(
+            args.mcp_url or SQUARE_MCP_HTTP_URL,
+            verbose=args.verbose,
+            metrics=metrics,
+            rate_limiter=rate_limiter,
+            recorder=recorder,
+            token=token,
+            # Directory lookups run beside the --concurrency writes.
+            pool_size=max(1, args.concurrency) + 2,
+        )
+        try:
+            await client._start()
+            return client
+        except (OSError, RuntimeError, http.client.HTTPException) as exc:
+            await client.close()
+            if args.mcp_transport == "http":
+                raise
+            log(f"Native MCP HTTP session failed ({exc}); falling back to mcp-remote.")
+
+    return await AsyncMCPClient.connect(
+        args.mcp_url or SQUARE_MCP_URL,
+        verbose=args.verbose,
+        metrics=metrics,
+        rate_limiter=rate_limiter,
+        command=command,
+        recorder=recorder,
+    )
 
-        log(json.dumps(report, indent=2))
 
-        if args.report_file:
-            out = Path(args.report_file).expanduser().resolve()
-            out.parent.mkdir(parents=True, exist_ok=True)
-            out.write_text(json.dumps(report, indent=2))
-            log(f"Wrote report to {out}")
+async def run_publish(
+    args: argparse.Namespace,
+    plans: list[PreparedPlan],
+    metrics: PublishMetrics,
+) -> list[dict[str, Any] | BaseException]:
+    limit = asyncio.Semaphore(max(1, args.concurrency))
+    ledger_root = Path(args.ledger_dir).expanduser().resolve() if args.ledger_dir else None
+    source = mcp_source(args)
+    ledgers = {plan.location_id: ShiftLedger.load(ledger_root, plan.location_id, source) for plan in plans}
+    command = shlex.split(args.mcp_command) if args.mcp_command else None
+    store = None
+    if args.replay_store:
+        replay_path = Path(args.replay_store).expanduser().resolve()
+        store = ResponseStore.load(
+            source_scoped(replay_path.parent, source) / replay_path.name,
+            source,
+            max_age_sec=args.replay_max_age_hours * 3600,
+            verbose=args.verbose,
+        )
+    try:
+        if args.replay and store is not None:
+            client: AsyncMCPClient = ReplayMCPClient(store, verbose=args.verbose, metrics=metrics)
+        else:
+            client = await connect_mcp(args, metrics, command, store)
+        async with client as mcp:
+            lookups = SessionLookups(mcp, args, DirectoryCache.from_args(args))
+            # One plan failing (e.g. unresolved names) must not cancel the others mid-create.
+            return await asyncio.gather(
+                *(publish_plan(mcp, plan, args, limit, lookups, ledgers[plan.location_id]) for plan in plans),
+                return_exceptions=True,
+            )
+    finally:
+        # Saved even after a failure so shifts that were written are not created again.
+        if args.apply:
+            for ledger in ledgers.values():
+                ledger.save()
+        if store is not None and not args.replay:
+            store.save()
 
-        if errors:
-            raise RuntimeError(f"Completed with {len(errors)} error(s). See report output above.")
 
-    finally:
-        mcp.close()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.dry_run or args.replay:
+        args.apply = False
+
+    metrics = PublishMetrics()
+    with metrics.phase("preflight"):
+        plan_files = collect_plan_files(args.plan_file, args.plan_dir)
+        plans: list[PreparedPlan] = []
+        for prepared in prepare_plans(plan_files, args):
+            if not prepared.planned_rows:
+                log(f"No assigned shifts to publish in {prepared.plan_file}.")
+                continue
+            plans.append(prepared)
+    if not plans:
+        return
+
+    with metrics.phase("publish"):
+        results = asyncio.run(run_publish(args, plans, metrics))
+
+    if args.metrics_file:
+        metrics_out = Path(args.metrics_file).expanduser().resolve()
+        metrics_out.parent.mkdir(parents=True, exist_ok=True)
+        metrics_out.write_text(metrics.openmetrics())
+        log(f"Wrote metrics to {metrics_out}")
+
+    reports: list[dict[str, Any]] = []
+    failures: list[str] = []
+    for plan, result in zip(plans, results):
+        if isinstance(result, BaseException):
+            if len(plan_files) == 1:
+                raise result
+            failures.append(f"{plan.plan_file}: {result}")
+            continue
+        reports.append(result)
+        log(json.dumps(result, indent=2))
+
+    if len(plan_files) > 1:
+        log(
+            f"Batch: {len(reports)} of {len(plan_files)} plans completed, "
+            f"{sum(r['created'] for r in reports)} created, {sum(r['published'] for r in reports)} published, "
+            f"{sum(r['skipped_existing'] for r in reports)} already present, {len(failures)} failed."
+        )
+
+    if args.report_file:
+        if len(plan_files) == 1:
+            document: dict[str, Any] = {**reports[0], "metrics": metrics.as_dict()}
+        else:
+            document = {
+                "generated_at": datetime.now(ET).isoformat(timespec="seconds"),
+                "plan_files": [str(path) for path in plan_files],
+                "totals": {
+                    key: sum(report[key] for report in reports)
+                    for key in (
+                        "total_assigned_rows",
+                        "skipped_unmatched",
+                        "skipped_existing",
+                        "created",
+                        "updated",
+                        "deleted",
+                        "published",
+                    )
+                },
+                "reports": reports,
+                "failures": failures,
+                "metrics": metrics.as_dict(),
+            }
+        out = Path(args.report_file).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(document, indent=2))
+        log(f"Wrote report to {out}")
+
+    error_count = sum(len(report["errors"]) for report in reports)
+    if failures:
+        raise RuntimeError("Some plans failed:\n- " + "\n- ".join(failures))
+    if error_count:
+        raise RuntimeError(f"Completed with {error_count} error(s). See report output above.")
 
 
 if __name__ == "__main__":
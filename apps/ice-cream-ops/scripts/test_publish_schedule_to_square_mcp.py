@@ -0,0 +1,818 @@
+#!/usr/bin/env python3
+"""Regression tests for publish_schedule_to_square_mcp.py against the offline MCP stand-in.
+
+Run with:
+    python3 -m unittest discover -s apps/ice-cream-ops/scripts -p "test_*.py"
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import http.client
+import io
+import itertools
+import json
+import random
+import shlex
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import fake_square_mcp as fake
+import publish_schedule_to_square_mcp as psm
+
+NAMES = fake.member_names(4)
+
+
+def plan(assignments: list[str]) -> dict[str, Any]:
+    """An approved single-day EP plan with one four-hour slot per assignment."""
+    slots = [
+        {"role": "Scooper", "start": f"{10 + idx:02d}:00", "end": f"{14 + idx:02d}:00", "headcount": 1, "assignments": [name]}
+        for idx, name in enumerate(assignments)
+    ]
+    return {
+        "location": "EP",
+        "square": {"location_id": psm.LOCATION_IDS["EP"]},
+        "approvals": {"nextWeek": {"status": "approved", "reviewer": "Test Reviewer", "reviewedAt": "2026-05-28"}},
+        "workflow": {"approvalRequiredForExceptions": True, "gmApprovalRequiredForNextWeek": True},
+        "weeks": [{"days": [{"date": "2026-06-01", "slots": slots}]}],
+    }
+
+
+class PublishAgainstFakeSquare(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory(prefix="publish-test-")
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.state_file = self.tmp / "square-state.json"
+
+    def publish(self, assignments: list[str], *extra: str) -> dict[str, Any]:
+        plan_file = self.tmp / "plan.json"
+        report_file = self.tmp / "report.json"
+        plan_file.write_text(json.dumps(plan(assignments)))
+        command = [sys.executable, str(Path(fake.__file__).resolve()), "--members", "4", "--state-file", str(self.state_file)]
+        argv = [
+            "--plan-file",
+            str(plan_file),
+            "--apply",
+            "--max-rps",
+            "0",
+            "--cache-ttl-hours",
+            "0",
+            "--ledger-dir",
+            str(self.tmp / "ledger"),
+            "--replay-store",
+            "",
+            "--report-file",
+            str(report_file),
+            "--mcp-command",
+            shlex.join(command),
+            *extra,
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            psm.main(argv)
+        return json.loads(report_file.read_text())
+
+    def square_shifts(self) -> list[dict[str, Any]]:
+        return list(json.loads(self.state_file.read_text())["shifts"].values())
+
+    def test_unmatched_name_does_not_delete_existing_shift(self) -> None:
+        first = self.publish([NAMES[0], NAMES[1]])
+        self.assertEqual(first["created"], 2)
+
+        # NAMES[1] mistyped: their existing shift must survive the re-publish.
+        second = self.publish([NAMES[0], "Nobody Atall"], "--allow-unmatched-names")
+        self.assertEqual(second["skipped_unmatched"], 1)
+        self.assertEqual(second["deleted"], 0)
+        self.assertEqual(second["held_deletes"], 1)
+        self.assertFalse(any(shift["draft_shift_details"].get("is_deleted") for shift in self.square_shifts()))
+
+        # Once the name is fixed the day is diffed again and nothing changes.
+        third = self.publish([NAMES[0], NAMES[1]])
+        self.assertEqual((third["created"], third["updated"], third["deleted"]), (0, 0, 0))
+
+    def test_dropped_shift_is_only_deleted_with_delete_removed(self) -> None:
+        self.publish([NAMES[0], NAMES[1]])
+
+        kept = self.publish([NAMES[0]])
+        self.assertEqual((kept["deleted"], kept["pending_deletes"]), (0, 1))
+        self.assertFalse(any(shift["draft_shift_details"].get("is_deleted") for shift in self.square_shifts()))
+
+        # The day stayed dirty, so opting in later still finds the dropped shift.
+        deleted = self.publish([NAMES[0]], "--delete-removed")
+        self.assertEqual((deleted["deleted"], deleted["pending_deletes"]), (1, 0))
+
+    def test_shifts_already_in_square_are_adopted_into_the_ledger(self) -> None:
+        # Written by an earlier run whose ledger is gone.
+        self.publish([NAMES[0], NAMES[1]], "--ledger-dir", str(self.tmp / "lost-ledger"))
+        adopted = self.publish([NAMES[0], NAMES[1]])
+        self.assertEqual((adopted["created"], adopted["skipped_existing"]), (0, 2))
+
+        # Swapping who works the second slot replaces that shift; it is not left beside a duplicate.
+        edited = self.publish([NAMES[0], NAMES[2]], "--delete-removed")
+        self.assertEqual((edited["created"], edited["deleted"]), (1, 1))
+        live = [shift for shift in self.square_shifts() if not shift["draft_shift_details"].get("is_deleted")]
+        self.assertEqual(sorted(shift["draft_shift_details"]["team_member_id"] for shift in live), ["TM001", "TM003"])
+
+
+class HTTPClientAgainstFakeSquare(unittest.TestCase):
+    def setUp(self) -> None:
+        self.args = fake.parse_args(["--members", "4", "--http", "0"])
+        server = fake.http_server(fake.StdioServer(fake.FakeSquare(self.args), self.args), self.args)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.port = server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/mcp"
+
+    def forget_session(self, session_id: str) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("DELETE", "/mcp", headers={"Mcp-Session-Id": session_id})
+        conn.getresponse().read()
+        conn.close()
+
+    def test_expired_session_is_reinitialized_before_the_retry(self) -> None:
+        async def run() -> tuple[str, str]:
+            async with psm.HTTPMCPClient(self.url) as mcp:
+                expired = mcp._session_id
+                self.forget_session(expired)
+                await mcp.call_tool("make_api_request", {"service": "team", "method": "listJobs", "request": {}})
+                return expired, mcp._session_id
+
+        expired, renewed = asyncio.run(run())
+        self.assertTrue(renewed)
+        self.assertNotEqual(expired, renewed)
+
+    def test_socket_timeout_follows_the_call_deadline(self) -> None:
+        list_jobs = {"service": "team", "method": "listJobs", "request": {}}
+
+        async def run() -> None:
+            # One worker: if the timed-out exchange kept its socket open, the next call would queue behind it.
+            async with psm.HTTPMCPClient(self.url, pool_size=1) as mcp:
+                self.args.latency_ms = 3000
+                with self.assertRaises(TimeoutError):
+                    await mcp.call_tool("make_api_request", list_jobs, timeout_sec=0.3)
+                self.args.latency_ms = 0
+                await asyncio.sleep(0.2)
+                await mcp.call_tool("make_api_request", list_jobs, timeout_sec=1.5)
+
+        started = time.monotonic()
+        asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 2.5)
+
+
+# A stdio MCP server that answers on cue: "batch" calls are answered in reverse
+# once three are waiting (after a notification and a ping), a "hold" call is only
+# answered when the next call arrives, and "exit" quits without replying.
+SCRIPTED_SERVER = r"""
+import json, sys
+
+def send(msg):
+    sys.stdout.write(json.dumps(msg) + "\n")
+    sys.stdout.flush()
+
+def reply(call, text):
+    send({"jsonrpc": "2.0", "id": call["id"], "result": {"content": [{"type": "text", "text": text}]}})
+
+held, batch = [], []
+for line in sys.stdin:
+    msg = json.loads(line)
+    method = msg.get("method")
+    if method == "initialize":
+        send({"jsonrpc": "2.0", "id": msg["id"], "result": {"protocolVersion": "2024-11-05", "capabilities": {}}})
+    elif method is None:
+        send({"jsonrpc": "2.0", "method": "test/client_reply", "params": msg})
+    elif method == "tools/call":
+        name = msg["params"]["name"]
+        if name == "exit":
+            sys.exit(0)
+        while held:
+            reply(held.pop(), "late")
+        if name == "hold":
+            held.append(msg)
+        elif name == "batch":
+            batch.append(msg)
+            if len(batch) == 3:
+                send({"jsonrpc": "2.0", "method": "notifications/message", "params": {"level": "info"}})
+                send({"jsonrpc": "2.0", "id": "srv-1", "method": "ping"})
+                while batch:
+                    call = batch.pop()
+                    reply(call, call["params"]["arguments"]["n"])
+        else:
+            reply(msg, name)
+"""
+
+
+class AsyncClientRouting(unittest.TestCase):
+    def run_client(self, body: Any) -> Any:
+        async def scenario() -> Any:
+            with contextlib.redirect_stderr(io.StringIO()):
+                client = await psm.AsyncMCPClient.connect("unused", command=[sys.executable, "-c", SCRIPTED_SERVER])
+                async with client:
+                    return await body(client)
+
+        return asyncio.run(scenario())
+
+    @staticmethod
+    def text(result: dict[str, Any]) -> str:
+        return result["content"][0]["text"]
+
+    def test_out_of_order_replies_reach_their_callers(self) -> None:
+        async def body(client: psm.AsyncMCPClient) -> tuple[list[str], str, psm.AsyncMCPClient]:
+            results = await asyncio.gather(*(client.call_tool("batch", {"n": str(n)}, timeout_sec=5) for n in range(3)))
+            # The server's ping was answered before the replies behind it were routed.
+            after = await client.call_tool("echo", {}, timeout_sec=5)
+            return [self.text(result) for result in results], self.text(after), client
+
+        texts, after, client = self.run_client(body)
+        self.assertEqual((texts, after), (["0", "1", "2"], "echo"))
+        methods = [msg.get("method") for msg in client.notifications]
+        self.assertEqual(methods, ["notifications/message", "ping", "test/client_reply"])
+        self.assertEqual(client.notifications[-1]["params"], {"jsonrpc": "2.0", "id": "srv-1", "result": {}})
+        self.assertEqual(list(client.late_responses), [])
+
+    def test_timed_out_call_names_its_request_and_its_late_reply_is_kept(self) -> None:
+        async def body(client: psm.AsyncMCPClient) -> tuple[str, str, psm.AsyncMCPClient]:
+            with self.assertRaises(TimeoutError) as raised:
+                await client.call_tool("hold", {}, timeout_sec=0.2)
+            after = await client.call_tool("echo", {}, timeout_sec=5)
+            return str(raised.exception), self.text(after), client
+
+        message, after, client = self.run_client(body)
+        self.assertIn("tools/call (id 2)", message)
+        self.assertEqual(after, "echo")
+        self.assertEqual([msg["id"] for msg in client.late_responses], [2])
+
+    def test_pending_calls_fail_when_the_bridge_exits(self) -> None:
+        async def body(client: psm.AsyncMCPClient) -> list[BaseException]:
+            waiting = asyncio.ensure_future(client.call_tool("hold", {}, timeout_sec=5))
+            await asyncio.sleep(0.05)
+            outcomes = await asyncio.gather(waiting, client.call_tool("exit", {}, timeout_sec=5), return_exceptions=True)
+            with self.assertRaises(RuntimeError):
+                await client.call_tool("echo", {}, timeout_sec=5)
+            return outcomes
+
+        outcomes = self.run_client(body)
+        self.assertTrue(all(isinstance(outcome, RuntimeError) for outcome in outcomes))
+        self.assertTrue(all("process closed" in str(outcome) for outcome in outcomes))
+
+
+def members(*names: str) -> psm.MemberResolver:
+    directory = []
+    for idx, name in enumerate(names, start=1):
+        given, _, family = name.partition(" ")
+        directory.append({"id": f"TM{idx:03d}", "given_name": given, "family_name": family})
+    return psm.MemberResolver(*psm.team_member_maps(directory))
+
+
+def linear_resolve(name: str, by_norm: dict[str, list[str]], id_to_name: dict[str, str]) -> tuple[str | None, str | None]:
+    """The directory scan MemberResolver replaced, kept as the reference for its answers."""
+    wanted = psm.normalize_name(name)
+    ids = by_norm.get(wanted) or []
+    if len(ids) == 1:
+        return ids[0], None
+    if len(ids) > 1:
+        return None, f"Ambiguous name '{name}' matched {len(ids)} active team members"
+    wanted_tokens = set(wanted.split())
+    candidates = [
+        tm_id
+        for tm_id, full in id_to_name.items()
+        if wanted_tokens
+        and (wanted_tokens <= set(psm.normalize_name(full).split()) or set(psm.normalize_name(full).split()) <= wanted_tokens)
+    ]
+    if len(candidates) == 1:
+        return candidates[0], None
+    if len(candidates) > 1:
+        return None, f"Ambiguous fuzzy match for '{name}'"
+    return None, f"No active team member match for '{name}'"
+
+
+class MemberResolverTests(unittest.TestCase):
+    def test_exact_and_fuzzy_matches(self) -> None:
+        resolver = members("Ana Maria Lopez", "Ben Ng", "Cara O'Neil", "Dev Patel")
+        self.assertEqual(resolver.resolve("  ana   maria LOPEZ "), ("TM001", None))
+        self.assertEqual(resolver.resolve("Cara O Neil"), ("TM003", None))
+        # Planner tokens inside a member's name, and a member's name inside the planner's.
+        self.assertEqual(resolver.resolve("Ana Lopez"), ("TM001", None))
+        self.assertEqual(resolver.resolve("Ben Ng (closer)"), ("TM002", None))
+
+    def test_ambiguous_and_missing_names(self) -> None:
+        resolver = members("Sam Lee", "Sam Lee", "Sam Rivera")
+        self.assertEqual(resolver.resolve("Sam Lee"), (None, "Ambiguous name 'Sam Lee' matched 2 active team members"))
+        self.assertEqual(resolver.resolve("Sam"), (None, "Ambiguous fuzzy match for 'Sam'"))
+        self.assertEqual(resolver.resolve("Pat Kim"), (None, "No active team member match for 'Pat Kim'"))
+        self.assertEqual(resolver.resolve(""), (None, "No active team member match for ''"))
+
+    def test_matches_the_linear_scan_on_random_directories(self) -> None:
+        rng = random.Random(11)
+        tokens = ["ana", "ben", "cruz", "dee", "eli", "fox", "gil", "hu", "ivy", "jo"]
+        for _ in range(200):
+            names = [" ".join(rng.sample(tokens, rng.randint(1, 3))) for _ in range(rng.randint(1, 12))]
+            resolver = members(*names)
+            by_norm, id_to_name = psm.team_member_maps(
+                [{"id": f"TM{idx:03d}", "given_name": name} for idx, name in enumerate(names, start=1)]
+            )
+            for _ in range(10):
+                wanted = " ".join(rng.sample(tokens, rng.randint(0, 4)))
+                self.assertEqual(resolver.resolve(wanted), linear_resolve(wanted, by_norm, id_to_name), (names, wanted))
+
+
+def walk_extract(plan_doc: dict[str, Any], location_code: str) -> tuple[list[psm.PlannedShift], int]:
+    """The per-call plan walk compile_plan replaced, kept as the reference for extraction."""
+    rows: list[psm.PlannedShift] = []
+    unassigned = 0
+    for week in plan_doc.get("weeks") or []:
+        for day in week.get("days") or []:
+            day_date = day.get("date")
+            if not day_date:
+                continue
+            for slot in day.get("slots") or []:
+                start_raw = (slot.get("start") or "").strip()
+                end_raw = (slot.get("end") or "").strip()
+                if not start_raw or not end_raw:
+                    continue
+                try:
+                    start_dt = psm.parse_local_dt(day_date, start_raw)
+                    end_dt = psm.parse_local_dt(day_date, end_raw)
+                except Exception:
+                    continue
+                if end_dt <= start_dt:
+                    end_dt += timedelta(days=1)
+                assignments = slot.get("assignments") or []
+                for idx in range(max(1, int(slot.get("headcount") or len(assignments) or 1))):
+                    name = ((assignments[idx] if idx < len(assignments) else "") or "").strip()
+                    if not name:
+                        unassigned += 1
+                        continue
+                    rows.append(
+                        psm.PlannedShift(
+                            date=day_date,
+                            role=(slot.get("role") or "Scooper").strip(),
+                            assigned_name=name,
+                            location_code=location_code,
+                            location_id=psm.LOCATION_IDS[location_code],
+                            start_at=psm.iso_with_seconds(start_dt),
+                            end_at=psm.iso_with_seconds(end_dt),
+                        )
+                    )
+    return rows, unassigned
+
+
+def random_plan(rng: random.Random) -> dict[str, Any]:
+    times = ["06:00", "09:30", "12:00", "16:45", "22:00", "23:30", "", "25:99", "noon"]
+    weeks = []
+    for week_idx in range(rng.randint(1, 2)):
+        days = []
+        for day_idx in range(rng.randint(1, 4)):
+            slots = [
+                {
+                    "role": rng.choice(["Scooper", " Key Lead ", None]),
+                    "start": rng.choice(times),
+                    "end": rng.choice(times),
+                    "headcount": rng.choice([None, 0, 1, 2, 3]),
+                    "assignments": [rng.choice(["Ana Lopez", " Ben Ng ", "", None]) for _ in range(rng.randint(0, 3))],
+                }
+                for _ in range(rng.randint(0, 4))
+            ]
+            date_iso = rng.choice(["", f"2026-06-{week_idx * 7 + day_idx + 1:02d}"])
+            days.append({"date": date_iso, "slots": slots})
+        weeks.append({"days": days})
+    return {**plan([]), "weeks": weeks}
+
+
+class CompilePlanTests(unittest.TestCase):
+    def test_slot_records(self) -> None:
+        doc = plan([])
+        doc["weeks"][0]["days"][0]["slots"] = [
+            {"role": " Key Lead ", "start": "22:00", "end": "02:00", "headcount": 3, "assignments": [" Ana Lopez ", "", None]},
+            {"start": "25:00", "end": "26:00", "assignments": ["Ben Ng"]},
+            {"start": "10:00", "end": "", "assignments": ["Ben Ng"]},
+        ]
+        compiled = psm.compile_plan(doc)
+        [slot] = compiled.slots
+        self.assertEqual((slot.role, slot.assigned, slot.name_keys, slot.unassigned), ("Key Lead", ("Ana Lopez",), ("ana lopez",), 2))
+        # Overnight: the end rolls to the next day.
+        self.assertEqual((slot.start_at, slot.end_at), ("2026-06-01T22:00:00-04:00", "2026-06-02T02:00:00-04:00"))
+        self.assertEqual(compiled.invalid_slots, [(0, "2026-06-01", 1)])
+
+    def test_validation_issues_come_from_the_compiled_plan(self) -> None:
+        doc = plan(["Ana Lopez"])
+        day = doc["weeks"][0]["days"][0]
+        day["slots"].append({"start": "07:00", "end": "23:00", "assignments": ["Ben Ng"]})
+        day["slots"].append({"start": "x", "end": "12:00", "assignments": []})
+        doc["weeks"].append({"days": [{"date": "2026-06-01", "pendingRequestId": "r1", "hasException": True}]})
+        self.assertEqual(
+            psm.validate_plan(doc),
+            [
+                "Duplicate day date in export payload: 2026-06-01.",
+                "Week 1 day 2026-06-01 slot 2: shift duration 16.00h exceeds 14.00h limit.",
+                "Week 1 day 2026-06-01 slot 3: invalid start/end time.",
+                "Week 2 day 2026-06-01: pending request exists.",
+                "Week 2 day 2026-06-01: unsubmitted exceptions exist.",
+            ],
+        )
+
+    def test_extraction_matches_the_plan_walk_on_random_plans(self) -> None:
+        rng = random.Random(12)
+        for _ in range(300):
+            doc = random_plan(rng)
+            compiled = psm.compile_plan(doc)
+            self.assertEqual(psm.extract_planned_shifts(doc, "EP", compiled), walk_extract(doc, "EP"), doc)
+
+
+def window(date_iso: str, start: str, end: str, name: str = "Ana Lopez") -> psm.AssignmentWindow:
+    start_dt = psm.parse_local_dt(date_iso, start)
+    end_dt = psm.parse_local_dt(date_iso, end)
+    if end_dt <= start_dt:
+        end_dt += timedelta(days=1)
+    return psm.AssignmentWindow(start_dt, end_dt, date_iso, name)
+
+
+class FindOverlapsTests(unittest.TestCase):
+    def test_touching_windows_do_not_overlap(self) -> None:
+        self.assertEqual(psm.find_overlaps([window("2026-06-01", "12:00", "16:00"), window("2026-06-01", "08:00", "12:00")]), [])
+
+    def test_overnight_window_overlaps_the_next_morning(self) -> None:
+        late = window("2026-06-01", "22:00", "06:00")
+        early = window("2026-06-02", "05:00", "09:00")
+        self.assertEqual(psm.find_overlaps([early, late]), [(late, early)])
+
+    def test_every_pair_is_reported_earlier_start_first(self) -> None:
+        long_day = window("2026-06-01", "08:00", "20:00")
+        lunch = window("2026-06-01", "11:00", "13:00")
+        afternoon = window("2026-06-01", "12:00", "17:00")
+        evening = window("2026-06-01", "19:00", "21:00")
+        self.assertEqual(
+            sorted(psm.find_overlaps([evening, afternoon, lunch, long_day])),
+            sorted([(long_day, lunch), (long_day, afternoon), (lunch, afternoon), (long_day, evening)]),
+        )
+
+    def test_matches_all_pairs_on_random_windows(self) -> None:
+        rng = random.Random(13)
+        for _ in range(300):
+            windows = [
+                window(f"2026-06-0{rng.randint(1, 3)}", f"{rng.randint(0, 23):02d}:{rng.choice(['00', '30'])}", f"{rng.randint(0, 23):02d}:00")
+                for _ in range(rng.randint(0, 12))
+            ]
+            found = {frozenset((id(a), id(b))) for a, b in psm.find_overlaps(windows)}
+            expected = {
+                frozenset((id(a), id(b)))
+                for i, a in enumerate(windows)
+                for b in windows[i + 1 :]
+                if a.start_dt < b.end_dt and b.start_dt < a.end_dt
+            }
+            self.assertEqual(found, expected)
+            for first, second in psm.find_overlaps(windows):
+                self.assertLessEqual(first.start_dt, second.start_dt)
+
+    def test_validate_plan_reports_each_overlapping_pair(self) -> None:
+        doc = plan([])
+        doc["weeks"][0]["days"][0]["slots"] = [
+            {"start": start, "end": end, "assignments": ["Ana Lopez"]}
+            for start, end in [("08:00", "20:00"), ("11:00", "13:00"), ("12:00", "17:00")]
+        ]
+        overlaps = [issue for issue in psm.validate_plan(doc) if issue.startswith("Overlapping")]
+        self.assertEqual(len(overlaps), 3)
+        self.assertIn("Overlapping shifts for 'Ana Lopez' between 2026-06-01 11:00-13:00 and 2026-06-01 12:00-17:00.", overlaps)
+
+
+DAY = "2026-06-01"
+
+
+def at(hhmm: str) -> str:
+    return psm.iso_with_seconds(psm.parse_local_dt(DAY, hhmm))
+
+
+def planned(team_member_id: str, start: str, end: str, job_id: str = "JOB_SCOOP", role: str = "Scooper") -> psm.ResolvedShift:
+    row = psm.PlannedShift(DAY, role, team_member_id, "EP", psm.LOCATION_IDS["EP"], at(start), at(end))
+    return psm.ResolvedShift(row, team_member_id, job_id)
+
+
+def current(shift_id: str, item: psm.ResolvedShift, slot_hash: str | None = None) -> psm.CurrentShift:
+    row = item.row
+    return psm.CurrentShift(
+        shift_id, 1, item.team_member_id, row.location_id, item.job_id, row.date, row.start_at, row.end_at,
+        row.role, item.slot_hash if slot_hash is None else slot_hash,
+    )
+
+
+class DiffShiftsTests(unittest.TestCase):
+    def test_exact_matches_are_unchanged_and_leftovers_created_or_deleted(self) -> None:
+        keep = planned("TM1", "10:00", "14:00")
+        changes = psm.diff_shifts([keep, planned("TM2", "10:00", "14:00")], [current("S1", keep), current("S9", planned("TM3", "12:00", "16:00"))])
+        self.assertEqual([shift.shift_id for shift, _item in changes.unchanged], ["S1"])
+        self.assertEqual([item.team_member_id for item in changes.creates], ["TM2"])
+        self.assertEqual([shift.shift_id for shift in changes.deletes], ["S9"])
+        self.assertEqual(changes.updates, [])
+
+    def test_role_rename_on_the_same_key_is_an_update(self) -> None:
+        item = planned("TM1", "10:00", "14:00", role="Key Lead")
+        changes = psm.diff_shifts([item], [current("S1", planned("TM1", "10:00", "14:00"))])
+        self.assertEqual(changes.updates, [(changes.updates[0][0], item)])
+        self.assertEqual(changes.updates[0][0].shift_id, "S1")
+
+    def test_moved_shifts_pair_with_least_movement(self) -> None:
+        morning, evening = planned("TM1", "08:00", "12:00"), planned("TM1", "16:00", "20:00")
+        # Both shifts moved by 30 minutes; crossing the pairs would move each by hours.
+        wanted = [planned("TM1", "16:30", "20:30"), planned("TM1", "08:30", "12:30")]
+        changes = psm.diff_shifts(wanted, [current("AM", morning), current("PM", evening)])
+        self.assertEqual(
+            sorted((shift.shift_id, item.row.start_at) for shift, item in changes.updates),
+            [("AM", at("08:30")), ("PM", at("16:30"))],
+        )
+        self.assertEqual((changes.creates, changes.deletes), ([], []))
+
+    def test_job_change_is_one_update_not_a_delete_and_create(self) -> None:
+        old = planned("TM1", "10:00", "14:00", job_id="JOB_SCOOP")
+        new = planned("TM1", "10:00", "15:00", job_id="JOB_LEAD", role="Key Lead")
+        changes = psm.diff_shifts([new], [current("S1", old)])
+        self.assertEqual([(shift.shift_id, item.job_id) for shift, item in changes.updates], [("S1", "JOB_LEAD")])
+        self.assertEqual((changes.creates, changes.deletes), ([], []))
+
+    def test_same_job_is_preferred_over_closer_times(self) -> None:
+        scoop = planned("TM1", "10:00", "14:00", job_id="JOB_SCOOP")
+        lead = planned("TM1", "15:00", "19:00", job_id="JOB_LEAD")
+        wanted = planned("TM1", "14:00", "18:00", job_id="JOB_SCOOP")
+        changes = psm.diff_shifts([wanted], [current("S", scoop), current("L", lead)])
+        self.assertEqual([shift.shift_id for shift, _item in changes.updates], ["S"])
+        self.assertEqual([shift.shift_id for shift in changes.deletes], ["L"])
+
+    def test_matching_is_least_cost_on_random_windows(self) -> None:
+        rng = random.Random(15)
+        for _ in range(300):
+            starts_a = sorted(rng.sample(range(0, 48), rng.randint(0, 5)))
+            starts_b = sorted(rng.sample(range(0, 48), rng.randint(0, 5)))
+            lengths_a = [rng.randint(1, 8) for _ in starts_a]
+            lengths_b = [rng.randint(1, 8) for _ in starts_b]
+            cost = [
+                [abs(sa - sb) + abs(sa + la - sb - lb) for sb, lb in zip(starts_b, lengths_b)]
+                for sa, la in zip(starts_a, lengths_a)
+            ]
+            matched = psm._least_cost_matching(cost)
+            size = min(len(starts_a), len(starts_b))
+            self.assertEqual(len(matched), size)
+            self.assertEqual(len({i for i, _ in matched}), size)
+            self.assertEqual(len({j for _, j in matched}), size)
+            if len(starts_a) <= len(starts_b):
+                best = min((sum(cost[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(len(starts_b)), size)), default=0)
+            else:
+                best = min((sum(cost[i][j] for j, i in enumerate(rows)) for rows in itertools.permutations(range(len(starts_a)), size)), default=0)
+            self.assertEqual(sum(cost[i][j] for i, j in matched), best, cost)
+
+
+def square_errors(*errors: dict[str, Any]) -> dict[str, Any]:
+    return {"errors": list(errors)}
+
+
+class ClassifyErrors(unittest.TestCase):
+    def test_plain_text_tool_failure_is_retried(self) -> None:
+        raw = {"isError": True, "content": [{"type": "text", "text": "mcp-remote: connection reset by peer"}]}
+        payload = psm.parse_tool_text_json(raw)
+        decision = psm.classify_errors(raw, payload, attempt=1)
+        self.assertTrue(decision.retry)
+        self.assertFalse(decision.rate_limited)
+
+    def test_retryable_categories_and_codes(self) -> None:
+        for error in (
+            {"category": "API_ERROR", "code": "INTERNAL_SERVER_ERROR"},
+            *({"category": "SOME_NEW_CATEGORY", "code": code} for code in sorted(psm.RETRYABLE_ERROR_CODES - {"RATE_LIMITED"})),
+            {},
+        ):
+            decision = psm.classify_errors({}, square_errors(error), attempt=1)
+            self.assertEqual((decision.retry, decision.rate_limited), (True, False), error)
+
+    def test_rate_limits_are_flagged(self) -> None:
+        for error in (
+            {"category": "RATE_LIMIT_ERROR"},
+            {"code": "RATE_LIMITED"},
+            {"category": "INVALID_REQUEST_ERROR", "detail": "Rate limit exceeded for this seller"},
+        ):
+            decision = psm.classify_errors({}, square_errors(error), attempt=1)
+            self.assertEqual((decision.retry, decision.rate_limited), (True, True), error)
+
+    def test_permanent_errors_return_at_once(self) -> None:
+        for error in (
+            {"category": "INVALID_REQUEST_ERROR", "code": "INVALID_VALUE"},
+            {"category": "AUTHENTICATION_ERROR", "code": "UNAUTHORIZED"},
+            {"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND"},
+            {"category": "INVALID_REQUEST_ERROR", "code": "VERSION_MISMATCH"},
+        ):
+            self.assertEqual(psm.classify_errors({}, square_errors(error), attempt=1), psm.RetryDecision(retry=False), error)
+        # One permanent error sinks the call even beside a transient one.
+        mixed = square_errors({"category": "API_ERROR"}, {"category": "INVALID_REQUEST_ERROR", "code": "INVALID_VALUE"})
+        self.assertFalse(psm.classify_errors({}, mixed, attempt=1).retry)
+
+    def test_backoff_grows_with_attempts_and_is_capped(self) -> None:
+        payload = square_errors({"category": "API_ERROR"})
+        for attempt, ceiling in ((1, 0.5), (3, 2.0), (20, psm.RETRY_MAX_SEC)):
+            delays = [psm.classify_errors({}, payload, attempt).delay for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays), (attempt, max(delays)))
+
+    def test_retry_after_hints(self) -> None:
+        limited = {"category": "RATE_LIMIT_ERROR"}
+        cases = [
+            ({}, {**square_errors(limited), "retry_after": 7}),
+            ({"_meta": {"retryAfter": "7"}}, square_errors(limited)),
+            ({}, square_errors({**limited, "retry_after": 7.0})),
+            ({}, square_errors({**limited, "detail": "Too many requests; Retry-After: 7 seconds"})),
+        ]
+        for raw, payload in cases:
+            self.assertEqual(psm.retry_after_hint(raw, payload), 7.0, payload)
+            delay = psm.classify_errors(raw, payload, attempt=1).delay
+            self.assertTrue(7.0 <= delay <= 7.7, delay)
+        self.assertEqual(psm.retry_after_hint({}, {"retry_after": 10_000}), psm.RETRY_MAX_SEC * 4)
+        self.assertIsNone(psm.retry_after_hint({}, {"retry_after": "soon"}))
+
+    def test_http_failures_are_retried(self) -> None:
+        raw = psm.http_tool_error(429, "slow down", "3")
+        payload = psm.parse_tool_text_json(raw)
+        decision = psm.classify_errors(raw, payload, attempt=1)
+        self.assertEqual((decision.retry, decision.rate_limited), (True, True))
+        self.assertGreaterEqual(decision.delay, 3.0)
+        raw = psm.http_tool_error(503, "", None)
+        self.assertEqual(psm.classify_errors(raw, psm.parse_tool_text_json(raw), attempt=1).rate_limited, False)
+        self.assertTrue(psm.classify_errors(raw, psm.parse_tool_text_json(raw), attempt=1).retry)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_calls_are_spaced_at_the_rate_after_the_burst(self) -> None:
+        with mock.patch.object(psm.time, "monotonic", return_value=100.0):
+            bucket = psm.TokenBucket(rate=10, burst=2)
+            waits = [bucket._reserve() for _ in range(5)]
+        self.assertEqual([round(wait, 3) for wait in waits], [0.0, 0.0, 0.1, 0.2, 0.3])
+
+    def test_tokens_refill_over_time_up_to_the_burst(self) -> None:
+        clock = [100.0]
+        with mock.patch.object(psm.time, "monotonic", side_effect=lambda: clock[0]):
+            bucket = psm.TokenBucket(rate=10, burst=2)
+            for _ in range(2):
+                bucket._reserve()
+            clock[0] += 60
+            self.assertEqual([bucket._reserve() for _ in range(2)], [0.0, 0.0])
+            self.assertAlmostEqual(bucket._reserve(), 0.1)
+
+    def test_pause_holds_every_caller_even_without_a_rate(self) -> None:
+        clock = [100.0]
+        with mock.patch.object(psm.time, "monotonic", side_effect=lambda: clock[0]):
+            bucket = psm.TokenBucket(rate=0)
+            self.assertEqual(bucket._reserve(), 0.0)
+            bucket.pause(2.5)
+            bucket.pause(1.0)  # a shorter pause does not cut an earlier one short
+            self.assertEqual([bucket._reserve(), bucket._reserve()], [2.5, 2.5])
+            clock[0] += 3
+            self.assertEqual(bucket._reserve(), 0.0)
+
+
+class InProcessSquare:
+    """Just enough of an MCP client for make_api_request_async, answered by a FakeSquare."""
+
+    def __init__(self, reject_bulk: bool = False):
+        self.square = fake.FakeSquare(fake.parse_args(["--members", "4"]))
+        self.reject_bulk = reject_bulk
+        self.rate_limiter = psm.TokenBucket(0)
+        self.metrics = psm.PublishMetrics()
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout_sec: float = 300) -> dict[str, Any]:
+        method, request = arguments["method"], arguments.get("request") or {}
+        self.calls.append((method, request))
+        if method == "bulkPublishScheduledShifts" and self.reject_bulk:
+            error = {"category": "INVALID_REQUEST_ERROR", "code": "BAD_REQUEST", "detail": "Bulk publish is not enabled."}
+            payload: dict[str, Any] = {"errors": [error]}
+        else:
+            payload = self.square.call(arguments["service"], method, request)
+        return {"content": [{"type": "text", "text": json.dumps(payload)}]}
+
+    def pending(self, count: int) -> list[psm.PendingPublish]:
+        out = []
+        for idx in range(count):
+            details = {"team_member_id": "TM001", "location_id": "L", "start_at": f"s{idx}", "end_at": f"e{idx}"}
+            request = {"idempotency_key": f"k{idx}", "scheduled_shift": {"draft_shift_details": details}}
+            created = self.square.call("labor", "createScheduledShift", request)["scheduled_shift"]
+            out.append(psm.PendingPublish(psm.ShiftOutcome(created=True, shift_id=created["id"], version=created["version"]), f"seed{idx}"))
+        return out
+
+    def methods(self) -> list[str]:
+        return [method for method, _request in self.calls]
+
+
+class BulkPublishTests(unittest.TestCase):
+    def publish(self, mcp: InProcessSquare, pending: list[psm.PendingPublish]) -> None:
+        async def run() -> None:
+            await psm.publish_pending(mcp, pending, asyncio.Semaphore(4))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run())
+
+    def test_batches_hold_at_most_one_hundred_shifts(self) -> None:
+        mcp = InProcessSquare()
+        pending = mcp.pending(250)
+        self.publish(mcp, pending)
+        self.assertEqual(mcp.methods(), ["bulkPublishScheduledShifts"] * 3)
+        self.assertEqual(sorted(len(request["scheduled_shifts"]) for _method, request in mcp.calls), [50, 100, 100])
+        self.assertTrue(all(item.outcome.published and item.outcome.version == 2 and not item.outcome.errors for item in pending))
+
+    def test_rejected_batch_falls_back_to_one_publish_per_shift(self) -> None:
+        mcp = InProcessSquare(reject_bulk=True)
+        pending = mcp.pending(3)
+        self.publish(mcp, pending)
+        self.assertEqual(mcp.methods(), ["bulkPublishScheduledShifts"] + ["publishScheduledShift"] * 3)
+        self.assertTrue(all(item.outcome.published and not item.outcome.errors for item in pending))
+
+    def test_per_shift_errors_stay_with_their_shift(self) -> None:
+        mcp = InProcessSquare()
+        pending = mcp.pending(3)
+        stale = pending[1].outcome
+        stale.version = 99
+        self.publish(mcp, pending)
+        self.assertEqual(mcp.methods(), ["bulkPublishScheduledShifts"])
+        self.assertEqual([item.outcome.published for item in pending], [True, False, True])
+        self.assertIn("Version mismatch", stale.errors[0])
+
+    def test_single_shift_uses_the_plain_publish_call(self) -> None:
+        mcp = InProcessSquare()
+        pending = mcp.pending(1)
+        self.publish(mcp, pending)
+        self.assertEqual(mcp.methods(), ["publishScheduledShift"])
+        self.assertTrue(pending[0].outcome.published)
+
+
+
+class SlowSquare(InProcessSquare):
+    """An InProcessSquare whose calls take a moment, counting how many overlap; creates for `fail_member` are refused."""
+
+    def __init__(self, fail_member: str | None = None):
+        super().__init__()
+        self.fail_member = fail_member
+        self.in_flight = self.peak = 0
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout_sec: float = 300) -> dict[str, Any]:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            request = arguments.get("request") or {}
+            details = (request.get("scheduled_shift") or {}).get("draft_shift_details") or {}
+            if arguments["method"] == "createScheduledShift" and details.get("team_member_id") == self.fail_member:
+                self.calls.append((arguments["method"], request))
+                error = {"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND", "detail": "Unknown team member."}
+                return {"content": [{"type": "text", "text": json.dumps({"errors": [error]})}]}
+            return await super().call_tool(name, arguments, timeout_sec)
+        finally:
+            self.in_flight -= 1
+
+
+class PipelinedWriteTests(unittest.TestCase):
+    ROWS = [planned(f"TM00{idx}", f"{10 + idx:02d}:00", f"{12 + idx:02d}:00") for idx in range(1, 5)]
+
+    def write(self, mcp: SlowSquare, concurrency: int) -> list[psm.ShiftOutcome]:
+        """Creates and publishes the rows as publish_plan does: one task per row, at most `concurrency` in flight."""
+
+        async def run_all() -> list[psm.ShiftOutcome]:
+            limit = asyncio.Semaphore(concurrency)
+
+            async def run_create(item: psm.ResolvedShift) -> psm.ShiftOutcome:
+                async with limit:
+                    return await psm.create_and_publish_shift(mcp, item.row, item.team_member_id, item.job_id, True)
+
+            return await asyncio.gather(*(run_create(item) for item in self.ROWS))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(run_all())
+
+    def test_writes_overlap_up_to_the_concurrency_limit(self) -> None:
+        serial = SlowSquare()
+        self.write(serial, 1)
+        self.assertEqual(serial.peak, 1)
+
+        mcp = SlowSquare()
+        outcomes = self.write(mcp, 3)
+        self.assertEqual(mcp.peak, 3)
+        self.assertTrue(all(outcome.created and outcome.published for outcome in outcomes))
+        self.assertEqual(sorted(mcp.methods()), ["createScheduledShift"] * 4 + ["publishScheduledShift"] * 4)
+
+    def test_idempotency_keys_do_not_depend_on_scheduling(self) -> None:
+        serial, pipelined = SlowSquare(), SlowSquare()
+        self.write(serial, 1)
+        self.write(pipelined, 4)
+        keys = [sorted(request["idempotency_key"] for _method, request in mcp.calls) for mcp in (serial, pipelined)]
+        self.assertEqual(keys[0], keys[1])
+        expected = {psm.deterministic_idempotency(psm.shift_seed(item.row, item.team_member_id, item.job_id) + "|create") for item in self.ROWS}
+        self.assertLessEqual(expected, set(keys[1]))
+
+    def test_errors_are_reported_in_plan_order(self) -> None:
+        mcp = SlowSquare(fail_member="TM002")
+        outcomes = self.write(mcp, 4)
+        self.assertEqual([outcome.created for outcome in outcomes], [True, False, True, True])
+        self.assertEqual([bool(outcome.errors) for outcome in outcomes], [False, True, False, False])
+        self.assertIn("Create failed for TM002", outcomes[1].errors[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""Benchmark export_workbook.py against synthetic operator workbooks.
+
+Generates sheets payloads shaped like the ones the MCP export tools send
+(hour-by-hour gross profit grids, historical trend series, or an arbitrary
+wide grid), serializes them as the record stream the Node exporter writes
+(header, sheet records, 500-row batches, end) and times
+export_workbook.run_stream_job on it, so parsing, building and saving run
+exactly as in production. --delivery picks writing to output_path or
+streaming framed bytes back. Timings are the median of --repeat runs; peak
+memory comes from one extra tracemalloc run so tracing overhead does not
+skew the timings.
+
+Results are written as JSON (--output) and can be compared against an earlier
+run with --compare; the exit code is 2 when any case regresses by more than
+--threshold.
+
+Example:
+    python3 scripts/bench_export_workbook.py --shape hourly_gp --rows 1000,20000 \\
+        --engine standard,streaming --delivery path,stream --output tmp/bench/export.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import openpyxl
+
+import export_workbook as ew
+
+PHASES = ("export",)
+DELIVERIES = ("path", "stream")
+RECORD_ROW_BATCH = 500  # mirrors STREAM_ROW_BATCH_SIZE in src/exports/excel-builder.ts
+CURRENCY = '"$"#,##0.00'
+PERCENT = "0.00%"
+LOCATIONS = ("EP", "NL")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _csv_ints(raw: str) -> list[int]:
+    return [int(part) for part in raw.split(",") if part.strip()]
+
+
+def _csv_strs(raw: str) -> list[str]:
+    return [part.strip() for part in raw.split(",") if part.strip()]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shape", type=_csv_strs, default=["hourly_gp", "historical_trend"], help="Comma-separated shapes")
+    parser.add_argument("--rows", type=_csv_ints, default=[1000, 10000], help="Comma-separated rows per sheet")
+    parser.add_argument("--cols", type=_csv_ints, default=[12], help="Comma-separated column counts (wide shape only)")
+    parser.add_argument("--sheets", type=_csv_ints, default=[1], help="Comma-separated sheet counts")
+    parser.add_argument(
+        "--formatted-cols",
+        type=_csv_ints,
+        default=[-1],
+        help="Comma-separated number of formatted columns (-1 keeps the shape's natural formats)",
+    )
+    parser.add_argument("--engine", type=_csv_strs, default=["standard"], help=f"Comma-separated: {', '.join(ew.ENGINES)}")
+    parser.add_argument(
+        "--output-format", type=_csv_strs, default=["xlsx"], help=f"Comma-separated: {', '.join(ew.OUTPUT_FORMATS)}"
+    )
+    parser.add_argument(
+        "--delivery", type=_csv_strs, default=["path"], help=f"Comma-separated: {', '.join(DELIVERIES)} (stream = framed bytes)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write machine-readable results JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed relative slowdown per phase (default 0.20)")
+    return parser.parse_args(argv)
+
+
+def gen_hourly_gp(rows: int, cols: int, formatted_cols: int, rng: random.Random) -> dict[str, Any]:
+    """Daypart_Hourly-style grid: one row per location, day and open hour."""
+    headers = [
+        "location",
+        "period",
+        "date",
+        "weekday",
+        "hour_24",
+        "avg_revenue",
+        "avg_labor",
+        "avg_doordash_net",
+        "avg_gp_72",
+        "labor_pct",
+    ]
+    formats = {
+        "avg_revenue": CURRENCY,
+        "avg_labor": CURRENCY,
+        "avg_doordash_net": CURRENCY,
+        "avg_gp_72": CURRENCY,
+        "labor_pct": PERCENT,
+    }
+    start = date(2025, 4, 1)
+    out: list[list[Any]] = []
+    for idx in range(rows):
+        location = LOCATIONS[idx % len(LOCATIONS)]
+        hour = 12 + (idx // len(LOCATIONS)) % 11
+        day = start + timedelta(days=idx // (len(LOCATIONS) * 11))
+        revenue = round(rng.uniform(40, 650), 2)
+        labor = round(rng.uniform(18, 90), 2)
+        doordash = round(revenue * rng.uniform(0, 0.18), 2)
+        out.append(
+            [
+                location,
+                day.strftime("%Y-%m"),
+                day.isoformat(),
+                WEEKDAYS[day.weekday()],
+                hour,
+                revenue,
+                labor,
+                doordash,
+                round(revenue * 0.72 - labor, 2),
+                round(labor / revenue, 4),
+            ]
+        )
+    return {
+        "name": "Daypart_Hourly",
+        "headers": headers,
+        "col_widths": [12, 10, 12, 10, 9, 14, 14, 16, 14, 12],
+        "formats": formats,
+        "rows": out,
+    }
+
+
+def gen_historical_trend(rows: int, cols: int, formatted_cols: int, rng: random.Random) -> dict[str, Any]:
+    """Multi-month daily trend series with a rolling average column."""
+    headers = [
+        "location",
+        "month_key",
+        "date",
+        "weekday",
+        "revenue",
+        "labor",
+        "gp_72",
+        "labor_pct",
+        "rolling_3m_gp_72",
+        "baseline_gp_72",
+        "plan",
+    ]
+    formats = {
+        "revenue": CURRENCY,
+        "labor": CURRENCY,
+        "gp_72": CURRENCY,
+        "labor_pct": PERCENT,
+        "rolling_3m_gp_72": CURRENCY,
+        "baseline_gp_72": CURRENCY,
+    }
+    start = date(2022, 7, 1)
+    out: list[list[Any]] = []
+    rolling = 0.0
+    for idx in range(rows):
+        location = LOCATIONS[idx % len(LOCATIONS)]
+        day = start + timedelta(days=idx // len(LOCATIONS))
+        revenue = round(rng.uniform(800, 6500), 2)
+        labor = round(revenue * rng.uniform(0.18, 0.34), 2)
+        gp = round(revenue * 0.72 - labor, 2)
+        rolling = gp if idx == 0 else round(rolling * 0.97 + gp * 0.03, 2)
+        out.append(
+            [
+                location,
+                day.strftime("%Y-%m"),
+                day.isoformat(),
+                WEEKDAYS[day.weekday()],
+                revenue,
+                labor,
+                gp,
+                round(labor / revenue, 4),
+                rolling,
+                # Baseline overlay is only present for open_7_day plans.
+                round(gp * 0.93, 2) if idx % 3 else None,
+                "open_7_day" if idx % 3 else "current_6_day",
+            ]
+        )
+    return {
+        "name": "Historical_Trend",
+        "headers": headers,
+        "col_widths": [12, 10, 12, 10, 14, 14, 14, 12, 18, 16, 16],
+        "formats": formats,
+        "rows": out,
+    }
+
+
+def gen_wide(rows: int, cols: int, formatted_cols: int, rng: random.Random) -> dict[str, Any]:
+    """Arbitrary-width numeric grid for column-count scaling."""
+    cols = max(2, cols)
+    headers = ["location"] + [f"metric_{idx:02d}" for idx in range(1, cols)]
+    natural = max(0, (cols - 1) // 2)
+    formats = {header: CURRENCY for header in headers[1 : 1 + natural]}
+    out = [[LOCATIONS[idx % len(LOCATIONS)]] + [round(rng.uniform(0, 1000), 2) for _ in range(cols - 1)] for idx in range(rows)]
+    return {"name": "Wide_Grid", "headers": headers, "col_widths": [14] * cols, "formats": formats, "rows": out}
+
+
+SHAPES: dict[str, Callable[[int, int, int, random.Random], dict[str, Any]]] = {
+    "hourly_gp": gen_hourly_gp,
+    "historical_trend": gen_historical_trend,
+    "wide": gen_wide,
+}
+
+
+def _with_formatted_cols(sheet: dict[str, Any], formatted_cols: int) -> dict[str, Any]:
+    """Override how many numeric columns carry a number format (-1 = natural)."""
+    if formatted_cols < 0:
+        return sheet
+    first = sheet["rows"][0] if sheet["rows"] else []
+    numeric = [h for idx, h in enumerate(sheet["headers"]) if idx < len(first) and ew._is_number(first[idx])]
+    sheet["formats"] = {header: CURRENCY for header in numeric[:formatted_cols]}
+    return sheet
+
+
+def build_payload(case: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    generator = SHAPES[case["shape"]]
+    sheets = []
+    for idx in range(case["sheets"]):
+        sheet = generator(case["rows"], case["cols"], case["formatted_cols"], rng)
+        sheet = _with_formatted_cols(sheet, case["formatted_cols"])
+        if case["sheets"] > 1:
+            sheet["name"] = f"{sheet['name'][:27]}_{idx + 1}"
+        sheets.append(sheet)
+    return {
+        "engine": case["engine"],
+        "output_format": case["output_format"],
+        "sheets": sheets,
+    }
+
+
+def stream_records(payload: dict[str, Any], out_path: Path | None) -> tuple[dict[str, Any], list[str]]:
+    """The workbook header and following record lines, as workbookRecords() in excel-builder.ts sends them."""
+    header: dict[str, Any] = {"type": "workbook", **({"output_path": str(out_path)} if out_path else {"stream": True})}
+    header.update({key: payload[key] for key in ("engine", "output_format") if payload.get(key)})
+    lines: list[str] = []
+    for sheet in payload["sheets"]:
+        rows = sheet["rows"]
+        lines.append(json.dumps({"type": "sheet", **{k: v for k, v in sheet.items() if k != "rows"}}) + "\n")
+        for start in range(0, len(rows), RECORD_ROW_BATCH):
+            lines.append(json.dumps({"type": "rows", "rows": rows[start : start + RECORD_ROW_BATCH]}) + "\n")
+    lines.append(json.dumps({"type": "end"}) + "\n")
+    return header, lines
+
+
+class _NullSink(io.RawIOBase):
+    """Discards framed output, standing in for the Node side's pipe."""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        return memoryview(data).nbytes
+
+
+def _run_export(header: dict[str, Any], lines: list[str], trace: bool) -> tuple[dict[str, float | int | None], dict[str, Any]]:
+    """One export through export_workbook.run_stream_job, timed end to end."""
+    frames = ew.FrameWriter(_NullSink()) if header.get("stream") else None
+    if trace:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = ew.run_stream_job(dict(header), iter(lines), frames)
+    entry: dict[str, float | int | None] = {"seconds": time.perf_counter() - started}
+    if trace:
+        entry["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - base)
+    if not result.get("ok"):
+        raise SystemExit(f"Export failed: {result.get('error')}")
+    return entry, result
+
+
+def run_case(case: dict[str, Any], repeat: int, seed: int, workdir: Path) -> dict[str, Any]:
+    payload = build_payload(case, random.Random(seed))
+    suffix = {"xlsx": ".xlsx", "csv_zip": ".zip", "columnar_json": ".json"}[case["output_format"]]
+    out_path = workdir / f"bench{suffix}" if case["delivery"] == "path" else None
+    header, lines = stream_records(payload, out_path)
+
+    def output_bytes(result: dict[str, Any]) -> int:
+        return int(result["bytes"]) if out_path is None else out_path.stat().st_size
+
+    samples: list[float] = []
+    size = 0
+    for _ in range(max(1, repeat)):
+        entry, result = _run_export(header, lines, trace=False)
+        samples.append(float(entry["seconds"] or 0.0))
+        size = output_bytes(result)
+
+    tracemalloc.start()
+    try:
+        traced, _ = _run_export(header, lines, trace=True)
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(samples)
+    return {
+        "case": case_id(case),
+        "params": case,
+        "payload_bytes": sum(len(line.encode("utf-8")) for line in lines),
+        "output_bytes": size,
+        "total_seconds": seconds,
+        "phases": {"export": {"seconds": seconds, "peak_bytes": traced.get("peak_bytes")}},
+    }
+
+
+def case_id(case: dict[str, Any]) -> str:
+    return (
+        f"{case['shape']}/rows={case['rows']}/cols={case['cols']}/sheets={case['sheets']}"
+        f"/fmt_cols={case['formatted_cols']}/engine={case['engine']}/out={case['output_format']}"
+        f"/delivery={case['delivery']}"
+    )
+
+
+def iter_cases(args: argparse.Namespace) -> list[dict[str, Any]]:
+    cases = []
+    for shape, rows, cols, sheets, formatted_cols, engine, output_format, delivery in itertools.product(
+        args.shape, args.rows, args.cols, args.sheets, args.formatted_cols, args.engine, args.output_format, args.delivery
+    ):
+        if shape not in SHAPES:
+            raise SystemExit(f"Unknown shape {shape!r}; expected one of: {', '.join(SHAPES)}")
+        if engine not in ew.ENGINES or output_format not in ew.OUTPUT_FORMATS:
+            raise SystemExit(f"Unsupported engine/output format: {engine}/{output_format}")
+        if delivery not in DELIVERIES:
+            raise SystemExit(f"Unknown delivery {delivery!r}; expected one of: {', '.join(DELIVERIES)}")
+        if output_format != "xlsx" and engine != "standard":
+            continue  # engine only applies to xlsx
+        cases.append(
+            {
+                "shape": shape,
+                "rows": rows,
+                "cols": cols if shape == "wide" else 0,
+                "sheets": sheets,
+                "formatted_cols": formatted_cols,
+                "engine": engine,
+                "output_format": output_format,
+                "delivery": delivery,
+            }
+        )
+    # Fixed shapes ignore --cols, so drop the duplicates that produces.
+    unique = {case_id(case): case for case in cases}
+    return list(unique.values())
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    base_cases = {case["case"]: case for case in baseline.get("cases") or []}
+    regressions: list[str] = []
+    print(f"\nComparison against {baseline.get('git_revision') or 'baseline'} (threshold {threshold:.0%}):")
+    for case in results["cases"]:
+        base = base_cases.get(case["case"])
+        if not base:
+            print(f"  {case['case']}: no baseline")
+            continue
+        for phase in PHASES:
+            now = case["phases"][phase]["seconds"]
+            before = (base["phases"].get(phase) or {}).get("seconds")
+            if now is None or not before:
+                continue
+            delta = (now - before) / before
+            marker = " REGRESSION" if delta > threshold else ""
+            print(f"  {case['case']} {phase}: {before * 1000:.1f}ms -> {now * 1000:.1f}ms ({delta:+.1%}){marker}")
+            if marker:
+                regressions.append(f"{case['case']} {phase} {delta:+.1%}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    cases = iter_cases(args)
+
+    results: dict[str, Any] = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "openpyxl": openpyxl.__version__,
+        "repeat": args.repeat,
+        "cases": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-export-") as tmp:
+        for case in cases:
+            result = run_case(case, args.repeat, args.seed, Path(tmp))
+            results["cases"].append(result)
+            phases = " ".join(
+                f"{phase}={result['phases'][phase]['seconds'] * 1000:.1f}ms"
+                for phase in PHASES
+                if result["phases"][phase]["seconds"] is not None
+            )
+            print(f"{result['case']}: total={result['total_seconds'] * 1000:.1f}ms {phases}", flush=True)
+
+    if args.output:
+        out = Path(args.output).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2))
+        print(f"Wrote results to {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).expanduser().read_text())
+        if compare(results, baseline, args.threshold):
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,34 +2,127 @@
 """Build operator-oriented XLSX exports for joyus fast casual.
 
 Reads JSON payload from stdin and writes workbook to output_path.
+
+"output_format" selects what is written from the same sheets contract:
+"xlsx" (default), "csv_zip" (one CSV per sheet plus manifest.json carrying
+headers/formats/col_widths) or "columnar_json" (compact column arrays). The
+non-XLSX formats skip openpyxl entirely and suit machine consumers.
+
+Set "engine": "streaming" in the payload to build with write-only worksheets:
+formats, freeze panes, auto-filter and column widths are applied as each row
+is written, so memory stays flat for very large sheets.
+
+The payload may also arrive as a record stream (one JSON object per line):
+a {"type": "workbook", ...} header carrying output_path/engine, then for each
+sheet a {"type": "sheet", ...} record with name/headers/col_widths/formats
+followed by any number of {"type": "rows", "rows": [...]} batches, and a
+closing {"type": "end"}. Rows are written as batches arrive instead of
+parsing the whole payload up front.
+
+Set "stream": true to skip output_path and send the file bytes back as a
+framed binary stream instead: data frames (b"D" + 4-byte big-endian length +
+bytes) followed by one trailer frame (b"T" + length + the JSON result). The
+frames go to stdout, or to the inherited descriptor given by --stream-fd.
+
+With --cache-dir (or EXPORT_CACHE_DIR), finished files are kept in a
+content-addressed cache keyed by a canonical hash of the sheets, engine and
+output format, and a repeat export is a copy (a reflink where the filesystem
+supports it) of the cached file instead of a rebuild. The hash ignores key
+order, whitespace and row batching, so a whole document and a record stream
+of the same sheets share an entry; a record stream is spooled to a temp file
+while it is hashed. The cache is bounded by --cache-max-mb and evicts least
+recently used files.
+
+A payload of the form {"jobs": [{"output_path", "sheets", ...}, ...]} is a
+batch: the jobs are built in parallel on a process pool (one process per CPU
+unless "max_workers" or --batch-workers says otherwise), top-level "engine"
+and "output_format" act as defaults for every job, and one result document
+reports each job's status in order. Batch jobs always write to output_path.
+
+With --serve, stays resident and reads newline-delimited JSON jobs from stdin,
+writing one JSON result line per job (echoing the job "id") so callers can
+reuse a warm interpreter across exports. Streamed jobs need --stream-fd in
+this mode; their result travels only as the trailer frame on that descriptor.
 """
 
 from __future__ import annotations
 
+import argparse
+import csv
+import hashlib
+import io
 import json
+import os
+import re
+import shutil
+import struct
 import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Iterable, Iterator, TextIO
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+ENGINES = ("standard", "streaming")
+OUTPUT_FORMATS = ("xlsx", "csv_zip", "columnar_json")
+RECORD_TYPES = ("workbook", "sheet", "rows", "end")
+FRAME_DATA = b"D"
+FRAME_TRAILER = b"T"
+FRAME_HEADER = struct.Struct(">cI")
+FRAME_CHUNK_SIZE = 64 * 1024
+CACHE_FORMAT_VERSION = 2
+DIGEST_ROW_CHUNK = 1000
+FICLONE = 0x40049409 if sys.platform.startswith("linux") else None
+DEFAULT_CACHE_MAX_MB = 512
+STALE_CACHE_TMP_SEC = 3600
+# A first line is only parsed on its own when it could be a record-stream
+# header; a large single-line document is left for the one full parse.
+HEADER_SNIFF_MAX = 64 * 1024
+STREAM_HEADER_RE = re.compile(r'\s*\{\s*"type"\s*:\s*"workbook"')
+
+
+class PayloadError(ValueError):
+    """Raised when a record stream is malformed."""
+
 
 def _is_number(value: Any) -> bool:
     return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 
-def _apply_column_formats(ws, headers: list[str], rows: list[list[Any]], formats: dict[str, str]) -> None:
+def _apply_column_formats(ws, headers: list[str], row_count: int, formats: dict[str, str]) -> None:
     for col_idx, header in enumerate(headers, start=1):
         number_format = formats.get(header)
         if not number_format:
             continue
-        for row_idx in range(2, len(rows) + 2):
+        for row_idx in range(2, row_count + 2):
             cell = ws.cell(row=row_idx, column=col_idx)
             if _is_number(cell.value):
                 cell.number_format = number_format
 
 
+def _apply_column_widths(ws, col_widths: list[Any]) -> None:
+    for idx, width in enumerate(col_widths, start=1):
+        if isinstance(width, (int, float)):
+            ws.column_dimensions[get_column_letter(idx)].width = max(7.0, float(width))
+
+
+def _format_map(formats: Any) -> dict[str, str]:
+    if not isinstance(formats, dict):
+        return {}
+    return {str(k): str(v) for k, v in formats.items()}
+
+
 def _build_sheet(wb: Workbook, sheet: dict[str, Any]) -> None:
     name = str(sheet.get("name") or "Sheet")
     headers = [str(h) for h in (sheet.get("headers") or [])]
@@ -40,58 +133,788 @@ def _build_sheet(wb: Workbook, sheet: dict[str, Any]) -> None:
     ws = wb.create_sheet(title=name[:31])
     if headers:
         ws.append(headers)
+    row_count = 0
     for row in rows:
         ws.append(row if isinstance(row, list) else [str(row)])
+        row_count += 1
 
     ws.freeze_panes = "A2"
-    if headers and rows:
+    if headers and row_count:
         ws.auto_filter.ref = ws.dimensions
 
-    for idx, width in enumerate(col_widths, start=1):
-        if isinstance(width, (int, float)):
-            ws.column_dimensions[get_column_letter(idx)].width = max(7.0, float(width))
+    _apply_column_widths(ws, col_widths)
+
+    if isinstance(formats, dict) and headers and row_count:
+        _apply_column_formats(ws, headers, row_count, _format_map(formats))
+
+
+def _build_sheet_streaming(wb: Workbook, sheet: dict[str, Any]) -> None:
+    """Write-only counterpart of _build_sheet producing the same cells and layout."""
+    name = str(sheet.get("name") or "Sheet")
+    headers = [str(h) for h in (sheet.get("headers") or [])]
+    rows = sheet.get("rows") or []
+    col_widths = sheet.get("col_widths") or []
+    fmt_map = _format_map(sheet.get("formats")) if headers else {}
+    col_formats = {idx: fmt_map[h] for idx, h in enumerate(headers) if fmt_map.get(h)}
+
+    ws = wb.create_sheet(title=name[:31])
+    # Write-only sheets emit panes and <cols> before the first row.
+    ws.freeze_panes = "A2"
+    _apply_column_widths(ws, col_widths)
+
+    row_idx = 0
+    max_row = 0
+    max_col = 0
+    if headers:
+        ws.append(headers)
+        row_idx = max_row = 1
+        max_col = len(headers)
+
+    wrote_rows = False
+    for row in rows:
+        wrote_rows = True
+        values = row if isinstance(row, list) else [str(row)]
+        row_idx += 1
+        if values:
+            max_row = row_idx
+            max_col = max(max_col, len(values))
+        if col_formats:
+            values = list(values)
+            for idx, number_format in col_formats.items():
+                if idx < len(values) and _is_number(values[idx]):
+                    cell = WriteOnlyCell(ws, value=values[idx])
+                    cell.number_format = number_format
+                    values[idx] = cell
+        ws.append(values)
+
+    # The auto-filter is written after sheetData, so the final extent is known here.
+    if headers and wrote_rows:
+        ws.auto_filter.ref = f"A1:{get_column_letter(max_col)}{max_row}"
+
+
+class _RecordStream:
+    """Pull-based reader over a record-stream payload.
 
-    if isinstance(formats, dict) and headers and rows:
-        fmt_map = {str(k): str(v) for k, v in formats.items()}
-        _apply_column_formats(ws, headers, rows, fmt_map)
+    sheets() yields one sheet dict per "sheet" record; its "rows" value is a
+    generator that reads "rows" batches from the underlying lines on demand,
+    so only one batch is held in memory at a time.
+    """
 
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._peeked: dict[str, Any] | None = None
+        self.finished = False
 
-def main() -> int:
-    raw = sys.stdin.read()
-    if not raw:
-        print(json.dumps({"ok": False, "error": "Missing stdin payload"}))
-        return 1
+    def _next(self) -> dict[str, Any] | None:
+        if self._peeked is not None:
+            record, self._peeked = self._peeked, None
+            return record
+        for line in self._lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise PayloadError(f"Invalid JSON record: {exc}") from exc
+            if not isinstance(record, dict) or record.get("type") not in RECORD_TYPES:
+                raise PayloadError(f"records must be objects with type in: {', '.join(RECORD_TYPES)}")
+            return record
+        return None
 
+    def _rows(self) -> Iterator[Any]:
+        while True:
+            record = self._next()
+            if record is None:
+                return
+            if record["type"] != "rows":
+                self._peeked = record
+                return
+            batch = record.get("rows") or []
+            if not isinstance(batch, list):
+                raise PayloadError("rows record must carry a rows array")
+            yield from batch
+
+    def sheets(self) -> Iterator[dict[str, Any]]:
+        while True:
+            record = self._next()
+            if record is None:
+                raise PayloadError("record stream ended without an end record")
+            if record["type"] == "end":
+                self.finished = True
+                return
+            if record["type"] != "sheet":
+                raise PayloadError(f"expected a sheet record, got {record['type']}")
+            sheet = {k: v for k, v in record.items() if k != "type"}
+            rows = self._rows()
+            sheet["rows"] = rows
+            yield sheet
+            for _ in rows:  # skip rows the builder did not consume
+                pass
+
+    def drain(self) -> None:
+        """Discard the rest of a failed job so the next job starts cleanly."""
+        while not self.finished:
+            try:
+                record = self._next()
+            except PayloadError:
+                continue
+            if record is None or record["type"] == "end":
+                self.finished = True
+
+
+class FrameWriter(io.RawIOBase):
+    """Write-only, unseekable file object that emits everything written as data frames.
+
+    zipfile (and so openpyxl) falls back to data descriptors on unseekable
+    targets, so workbooks can be saved straight into it.
+    """
+
+    def __init__(self, out: BinaryIO, chunk_size: int = FRAME_CHUNK_SIZE):
+        super().__init__()
+        self.out = out
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        view = memoryview(data).cast("B")
+        self.buffer += view
+        self.bytes_written += len(view)
+        if len(self.buffer) >= self.chunk_size:
+            self._emit()
+        return len(view)
+
+    def _emit(self) -> None:
+        if self.buffer:
+            self.out.write(FRAME_HEADER.pack(FRAME_DATA, len(self.buffer)))
+            self.out.write(self.buffer)
+            self.buffer = bytearray()
+
+    def flush(self) -> None:
+        if not self.closed:
+            self._emit()
+        self.out.flush()
+
+    def trailer(self, result: dict[str, Any]) -> None:
+        self._emit()
+        body = json.dumps(result).encode("utf-8")
+        self.out.write(FRAME_HEADER.pack(FRAME_TRAILER, len(body)))
+        self.out.write(body)
+        self.out.flush()
+
+
+class _Tee(io.RawIOBase):
+    """Unseekable writer duplicating every write to several binary targets."""
+
+    def __init__(self, *targets: BinaryIO):
+        super().__init__()
+        self.targets = targets
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        for target in self.targets:
+            target.write(data)
+        return memoryview(data).nbytes
+
+
+class WorkbookCache:
+    """Content-addressed store of finished export files with LRU eviction.
+
+    Entries live at <root>/<key[:2]>/<key> and are only ever created by
+    renaming a complete temp file into place, so readers never see a partial
+    entry. Outputs are copies, never links, of an entry. A hit refreshes the
+    entry's mtime, and eviction removes the oldest entries once the total
+    size exceeds max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "WorkbookCache | None":
+        if not args.cache_dir or args.cache_max_mb <= 0:
+            return None
+        return cls(Path(args.cache_dir).expanduser().resolve(), int(args.cache_max_mb * 1024 * 1024))
+
+    @staticmethod
+    def key_for(digest: str, engine: str, output_format: str) -> str:
+        scope = f"{CACHE_FORMAT_VERSION}|{engine}|{output_format}|{digest}"
+        return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def temp_path(self, key: str) -> Path:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{key}.{os.getpid()}.tmp")
+
+    def open_spool(self, key: str) -> tuple[Path, BinaryIO] | None:
+        """Temp file to tee a streamed build into, or None if the cache is not writable."""
+        try:
+            path = self.temp_path(key)
+            return path, path.open("wb")
+        except OSError:
+            return None
+
+    def get(self, key: str) -> Path | None:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, src: Path, keep_src: bool = True) -> None:
+        """Add a finished file; with keep_src it is copied rather than moved."""
+        tmp = self.temp_path(key)
+        try:
+            if keep_src:
+                _copy_file(src, tmp)
+            else:
+                os.replace(src, tmp)
+            os.replace(tmp, self.path(key))
+        except OSError:
+            # The cache is an optimization; a failed insert must not fail the export.
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, Path]] = []
+        now = time.time()
+        for bucket in self.root.glob("??"):
+            for path in bucket.iterdir():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.name.startswith("."):
+                    if now - stat.st_mtime > STALE_CACHE_TMP_SEC:
+                        path.unlink(missing_ok=True)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    """Copy src to dst as its own inode: a reflink where the filesystem allows, else a byte copy.
+
+    A hard link would let a cache hit's utime, or an in-place edit of one
+    output, change the entry and every other output sharing it.
+    """
+    if fcntl is not None and FICLONE is not None:
+        try:
+            with open(src, "rb") as source, open(dst, "wb") as target:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def _open_cached(path: Path | None) -> BinaryIO | None:
+    if path is None:
+        return None
     try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        print(json.dumps({"ok": False, "error": f"Invalid JSON payload: {exc}"}))
-        return 1
+        return path.open("rb")
+    except OSError:
+        return None
+
+
+def _canonical_json(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+class _ContentDigest:
+    """Canonical hash of export sheets, fed one sheet at a time.
+
+    Key order, whitespace and how rows are split into batches do not matter,
+    so a whole document and the record stream of the same sheets hash alike.
+    """
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+
+    def add_sheet(self, sheet: Any) -> None:
+        if not isinstance(sheet, dict):
+            self._hash.update(b"\x1e" + _canonical_json(sheet) + b"\n")
+            return
+        meta = {k: v for k, v in sheet.items() if k not in ("rows", "type")}
+        # 0x1e cannot occur unescaped in JSON text, so it cleanly separates sheets.
+        self._hash.update(b"\x1e" + _canonical_json(meta) + b"\n")
+        rows = iter(sheet.get("rows") or [])
+        separator = b""
+        while True:
+            chunk = list(islice(rows, DIGEST_ROW_CHUNK))
+            if not chunk:
+                return
+            # "[a,b]" minus its brackets, so chunks join exactly like one array.
+            self._hash.update(separator + _canonical_json(chunk)[1:-1])
+            separator = b","
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def payload_digest(sheets: Iterable[Any]) -> str:
+    """Canonical hash of a whole-document sheets array."""
+    digest = _ContentDigest()
+    for sheet in sheets:
+        digest.add_sheet(sheet)
+    return digest.hexdigest()
+
+
+def _spool_record_stream(lines: Iterator[str], spool: TextIO) -> str:
+    """Copy one job's records (through its end record) to spool and return their digest."""
+
+    def tee() -> Iterator[str]:
+        for line in lines:
+            spool.write(line if line.endswith("\n") else f"{line}\n")
+            yield line
+
+    records = _RecordStream(tee())
+    digest = _ContentDigest()
+    try:
+        for sheet in records.sheets():
+            digest.add_sheet(sheet)
+    finally:
+        records.drain()
+    return digest.hexdigest()
+
+
+def _sheet_values(row: Any) -> list[Any]:
+    return row if isinstance(row, list) else [str(row)]
+
+
+def _write_xlsx(path: Path | BinaryIO, engine: str, sheets: Iterable[Any]) -> int:
+    if engine == "streaming":
+        wb = Workbook(write_only=True)
+        build = _build_sheet_streaming
+    else:
+        wb = Workbook()
+        wb.remove(wb.active)
+        build = _build_sheet
+
+    built = 0
+    for sheet in sheets:
+        if isinstance(sheet, dict):
+            build(wb, sheet)
+            built += 1
+    if built:
+        wb.save(path)
+    return built
+
+
+def _csv_member_name(name: str, used: set[str]) -> str:
+    base = name[:31].replace("/", "_").replace("\\", "_") or "Sheet"
+    candidate = f"{base}.csv"
+    suffix = 1
+    while candidate in used:
+        candidate = f"{base}{suffix}.csv"
+        suffix += 1
+    used.add(candidate)
+    return candidate
+
+
+def _write_csv_zip(path: Path | BinaryIO, sheets: Iterable[Any]) -> int:
+    manifest: list[dict[str, Any]] = []
+    used: set[str] = set()
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for sheet in sheets:
+            if not isinstance(sheet, dict):
+                continue
+            name = str(sheet.get("name") or "Sheet")
+            headers = [str(h) for h in (sheet.get("headers") or [])]
+            member = _csv_member_name(name, used)
+            row_count = 0
+            with archive.open(member, "w") as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                writer = csv.writer(text)
+                if headers:
+                    writer.writerow(headers)
+                for row in sheet.get("rows") or []:
+                    writer.writerow(_sheet_values(row))
+                    row_count += 1
+                text.flush()
+                text.detach()
+            manifest.append(
+                {
+                    "name": name,
+                    "file": member,
+                    "headers": headers,
+                    "formats": _format_map(sheet.get("formats")),
+                    "col_widths": sheet.get("col_widths") or [],
+                    "row_count": row_count,
+                }
+            )
+        if manifest:
+            archive.writestr("manifest.json", json.dumps({"sheets": manifest}, indent=2))
+    return len(manifest)
+
+
+def _write_columnar_json(path: Path | BinaryIO, sheets: Iterable[Any]) -> int:
+    out_sheets: list[dict[str, Any]] = []
+    for sheet in sheets:
+        if not isinstance(sheet, dict):
+            continue
+        headers = [str(h) for h in (sheet.get("headers") or [])]
+        columns: list[list[Any]] = [[] for _ in headers]
+        row_count = 0
+        for row in sheet.get("rows") or []:
+            values = _sheet_values(row)
+            while len(columns) < len(values):
+                columns.append([None] * row_count)
+            for idx, column in enumerate(columns):
+                column.append(values[idx] if idx < len(values) else None)
+            row_count += 1
+        out_sheets.append(
+            {
+                "name": str(sheet.get("name") or "Sheet"),
+                "headers": headers,
+                "formats": _format_map(sheet.get("formats")),
+                "row_count": row_count,
+                "columns": columns,
+            }
+        )
+    if out_sheets:
+        document = json.dumps({"sheets": out_sheets}, separators=(",", ":")).encode("utf-8")
+        if isinstance(path, Path):
+            path.write_bytes(document)
+        else:
+            path.write(document)
+    return len(out_sheets)
+
+
+def _write_to(target: Path | BinaryIO, engine: str, output_format: str, sheets: Iterable[Any]) -> int:
+    if output_format == "csv_zip":
+        return _write_csv_zip(target, sheets)
+    if output_format == "columnar_json":
+        return _write_columnar_json(target, sheets)
+    return _write_xlsx(target, engine, sheets)
+
+
+def _write_workbook(
+    output_path: Any,
+    options: dict[str, Any],
+    sheets: Iterable[Any],
+    stream: FrameWriter | None = None,
+    cache: WorkbookCache | None = None,
+    digest: str | None = None,
+) -> dict[str, Any]:
+    streamed = bool(options.get("stream"))
+    if streamed and stream is None:
+        return {"ok": False, "error": "stream output needs --stream-fd in serve mode"}
+    if not output_path and not streamed:
+        return {"ok": False, "error": "output_path is required"}
+    engine = options.get("engine") or "standard"
+    if engine not in ENGINES:
+        return {"ok": False, "error": f"engine must be one of: {', '.join(ENGINES)}"}
+    output_format = options.get("output_format") or "xlsx"
+    if output_format not in OUTPUT_FORMATS:
+        return {"ok": False, "error": f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}"}
+
+    key = WorkbookCache.key_for(digest, engine, output_format) if cache and digest else None
+    cached = cache.get(key) if cache and key else None
+
+    if streamed:
+        assert stream is not None
+        start = stream.bytes_written
+        source = _open_cached(cached)
+        if source is not None:
+            with source:
+                shutil.copyfileobj(source, stream, FRAME_CHUNK_SIZE)
+        else:
+            cached = None
+            spool = cache.open_spool(key) if cache and key else None
+            try:
+                if spool:
+                    with spool[1]:
+                        built = _write_to(_Tee(stream, spool[1]), engine, output_format, sheets)
+                    if built and cache and key:
+                        cache.put(key, spool[0], keep_src=False)
+                else:
+                    built = _write_to(stream, engine, output_format, sheets)
+            finally:
+                if spool:
+                    spool[0].unlink(missing_ok=True)
+            if not built:
+                return {"ok": False, "error": "sheets must be a non-empty array"}
+        stream.flush()
+        result = {"ok": True, "output_format": output_format, "bytes": stream.bytes_written - start}
+        return {**result, "cached": True} if cached else result
+
+    out = Path(output_path).expanduser().resolve()
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    # Build beside the target and rename, so readers never see a partial file.
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    try:
+        if cached:
+            try:
+                _copy_file(cached, tmp)
+            except OSError:
+                # Evicted between lookup and link; build it instead.
+                cached = None
+        if not cached:
+            built = _write_to(tmp, engine, output_format, sheets)
+            if not built:
+                return {"ok": False, "error": "sheets must be a non-empty array"}
+            if cache and key:
+                cache.put(key, tmp)
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    result = {"ok": True, "path": str(out), "output_format": output_format}
+    return {**result, "cached": True} if cached else result
+
+
+def _is_batch(payload: dict[str, Any]) -> bool:
+    return "jobs" in payload and "sheets" not in payload
+
+
+def _run_batch_job(job: Any, cache: WorkbookCache | None) -> dict[str, Any]:
+    if isinstance(job, dict) and (job.get("stream") or "jobs" in job):
+        return {"ok": False, "error": "batch jobs must write to output_path and cannot nest"}
+    try:
+        return run_job(job, None, cache)
+    except Exception as exc:  # one bad workbook must not sink the rest of the batch
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def run_batch(payload: dict[str, Any], cache: WorkbookCache | None = None, max_workers: int | None = None) -> dict[str, Any]:
+    jobs = payload.get("jobs")
+    if not isinstance(jobs, list) or not jobs:
+        return {"ok": False, "error": "jobs must be a non-empty array"}
+    if payload.get("stream"):
+        return {"ok": False, "error": "batch payloads cannot be streamed"}
+
+    defaults = {key: payload[key] for key in ("engine", "output_format") if key in payload}
+    jobs = [{**defaults, **job} if isinstance(job, dict) else job for job in jobs]
+    try:
+        requested = int(payload.get("max_workers") or max_workers or os.cpu_count() or 1)
+    except (TypeError, ValueError):
+        return {"ok": False, "error": "max_workers must be an integer"}
+    workers = max(1, min(len(jobs), requested))
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_run_batch_job(job, cache) for job in jobs]
+    else:
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_batch_job, job, cache) for job in jobs]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as exc:  # e.g. a worker killed by the OOM killer
+                    results.append({"ok": False, "error": f"{type(exc).__name__}: {exc}"})
+
+    reports = [
+        {"id": job["id"], **result} if isinstance(job, dict) and "id" in job else result
+        for job, result in zip(jobs, results)
+    ]
+    failed = sum(1 for result in results if not result.get("ok"))
+    document: dict[str, Any] = {
+        "ok": failed == 0,
+        "jobs": reports,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if failed:
+        document["error"] = f"{failed} of {len(jobs)} batch jobs failed"
+    return document
+
+
+def run_job(
+    payload: Any,
+    stream: FrameWriter | None = None,
+    cache: WorkbookCache | None = None,
+    batch_workers: int | None = None,
+) -> dict[str, Any]:
+    if not isinstance(payload, dict):
+        return {"ok": False, "error": "payload must be a JSON object"}
+    if _is_batch(payload):
+        return run_batch(payload, cache, batch_workers)
 
     output_path = payload.get("output_path")
     sheets = payload.get("sheets") or []
 
-    if not output_path:
-        print(json.dumps({"ok": False, "error": "output_path is required"}))
-        return 1
+    if not output_path and not payload.get("stream"):
+        return {"ok": False, "error": "output_path is required"}
     if not isinstance(sheets, list) or not sheets:
-        print(json.dumps({"ok": False, "error": "sheets must be a non-empty array"}))
-        return 1
+        return {"ok": False, "error": "sheets must be a non-empty array"}
 
-    out = Path(output_path).expanduser().resolve()
-    out.parent.mkdir(parents=True, exist_ok=True)
+    digest = payload_digest(sheets) if cache else None
+    return _write_workbook(output_path, payload, sheets, stream, cache, digest)
 
-    wb = Workbook()
-    wb.remove(wb.active)
 
-    for sheet in sheets:
-        if isinstance(sheet, dict):
-            _build_sheet(wb, sheet)
+def run_stream_job(
+    header: dict[str, Any],
+    lines: Iterator[str],
+    stream: FrameWriter | None = None,
+    cache: WorkbookCache | None = None,
+) -> dict[str, Any]:
+    if cache is None:
+        records = _RecordStream(lines)
+        try:
+            return _write_workbook(header.get("output_path"), header, records.sheets(), stream)
+        finally:
+            records.drain()
+
+    # The key hashes the rows, which only arrive with the stream: spool the
+    # records while hashing them, then build from the spool on a miss.
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        digest = _spool_record_stream(lines, spool)
+        spool.seek(0)
+        return _write_workbook(header.get("output_path"), header, _RecordStream(spool).sheets(), stream, cache, digest)
 
-    wb.save(out)
-    print(json.dumps({"ok": True, "path": str(out)}))
+
+def _is_stream_header(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("type") == "workbook"
+
+
+def _frame_sink(stream_fd: int | None) -> BinaryIO:
+    if stream_fd is None:
+        return sys.stdout.buffer
+    return os.fdopen(stream_fd, "wb", buffering=0)
+
+
+def serve(stream_fd: int | None = None, cache: WorkbookCache | None = None, batch_workers: int | None = None) -> int:
+    frames = FrameWriter(_frame_sink(stream_fd)) if stream_fd is not None else None
+    lines = iter(sys.stdin)
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        job_id: Any = None
+        streamed = False
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as exc:
+            result: dict[str, Any] = {"ok": False, "error": f"Invalid JSON job: {exc}"}
+        else:
+            if isinstance(job, dict):
+                job_id = job.get("id")
+                streamed = bool(job.get("stream")) and frames is not None
+            try:
+                if _is_stream_header(job):
+                    result = run_stream_job(job, lines, frames, cache)
+                else:
+                    result = run_job(job, frames, cache, batch_workers)
+            except Exception as exc:  # keep the worker alive for the next job
+                result = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+        if streamed:
+            assert frames is not None
+            frames.trailer({"id": job_id, **result})
+            continue
+        sys.stdout.write(json.dumps({"id": job_id, **result}) + "\n")
+        sys.stdout.flush()
     return 0
 
 
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Stay resident and process newline-delimited JSON jobs from stdin",
+    )
+    parser.add_argument(
+        "--stream-fd",
+        type=int,
+        help="Inherited file descriptor for framed output of streamed jobs (default: stdout outside --serve)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("EXPORT_CACHE_DIR") or None,
+        help="Directory for the content-addressed export cache (default: $EXPORT_CACHE_DIR; unset disables)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.environ.get("EXPORT_CACHE_MAX_MB") or DEFAULT_CACHE_MAX_MB),
+        help=f"Evict least recently used cache entries beyond this size (default: $EXPORT_CACHE_MAX_MB or {DEFAULT_CACHE_MAX_MB})",
+    )
+    parser.add_argument(
+        "--batch-workers",
+        type=int,
+        default=int(os.environ.get("EXPORT_BATCH_WORKERS") or 0) or None,
+        help="Process pool size for batch payloads (default: $EXPORT_BATCH_WORKERS or one per CPU)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    cache = WorkbookCache.from_args(args)
+    if args.serve:
+        return serve(args.stream_fd, cache, args.batch_workers)
+
+    # Sniff the first line: a workbook header means a record stream, anything
+    # else is (the start of) a single JSON document.
+    first = sys.stdin.readline()
+    header = None
+    parsed_first = False
+    if first.strip() and (len(first) <= HEADER_SNIFF_MAX or STREAM_HEADER_RE.match(first)):
+        try:
+            header = json.loads(first)
+            parsed_first = True
+        except json.JSONDecodeError:
+            pass
+
+    if _is_stream_header(header):
+        assert header is not None
+        frames = FrameWriter(_frame_sink(args.stream_fd)) if header.get("stream") else None
+        try:
+            result = run_stream_job(header, iter(sys.stdin), frames, cache)
+        except PayloadError as exc:
+            result = {"ok": False, "error": f"Invalid record stream: {exc}"}
+        return _finish(result, frames, args.stream_fd)
+
+    rest = sys.stdin.read()
+    if parsed_first and not rest.strip():
+        # The usual single-line document: the sniff already parsed all of it.
+        payload = header
+    else:
+        raw = first + rest
+        if not raw:
+            print(json.dumps({"ok": False, "error": "Missing stdin payload"}))
+            return 1
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            print(json.dumps({"ok": False, "error": f"Invalid JSON payload: {exc}"}))
+            return 1
+
+    frames = FrameWriter(_frame_sink(args.stream_fd)) if isinstance(payload, dict) and payload.get("stream") else None
+    return _finish(run_job(payload, frames, cache, args.batch_workers), frames, args.stream_fd)
+
+
+def _finish(result: dict[str, Any], frames: FrameWriter | None, stream_fd: int | None) -> int:
+    if frames is not None:
+        frames.trailer(result)
+    # With frames on stdout the trailer is the result; a JSON line would corrupt the stream.
+    if frames is None or stream_fd is not None:
+        print(json.dumps(result))
+    return 0 if result["ok"] else 1
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,5 +1,7 @@
-import { spawn } from 'child_process';
+import { ChildProcessWithoutNullStreams, spawn } from 'child_process';
 import path from 'path';
+import { createInterface } from 'readline';
+import { Readable, Writable } from 'stream';
 
 import { WorkbookPayload } from './types.js';
 
@@ -8,10 +10,36 @@ interface BuildWorkbookInput {
   workbook: WorkbookPayload;
 }
 
+interface StreamWorkbookInput {
+  workbook: WorkbookPayload;
+}
+
+/** A job writes to `outputPath`, or streams its bytes back when it has none. */
+type WorkbookJobInput = BuildWorkbookInput | StreamWorkbookInput;
+
 interface BuilderResult {
   ok: boolean;
   path?: string;
   error?: string;
+  output_format?: string;
+  bytes?: number;
+}
+
+interface WorkerResult extends BuilderResult {
+  id?: string | number | null;
+}
+
+export interface StreamedWorkbook {
+  bytes: number;
+  outputFormat?: string;
+}
+
+interface PendingJob {
+  id: string;
+  input: WorkbookJobInput;
+  sink?: Writable;
+  resolve: (result: WorkerResult) => void;
+  reject: (error: Error) => void;
 }
 
 function pythonScriptPath(): string {
@@ -22,13 +50,326 @@ function pythonBinary(): string {
   return process.env.EXPORT_PYTHON_BIN || 'python3';
 }
 
-export async function buildWorkbookFile(input: BuildWorkbookInput): Promise<void> {
-  const scriptPath = pythonScriptPath();
-  const payload = JSON.stringify({
-    output_path: input.outputPath,
-    sheets: input.workbook.sheets,
+function workerPoolSize(): number {
+  const parsed = Number(process.env.EXPORT_WORKER_POOL_SIZE ?? '2');
+  return Number.isFinite(parsed) && parsed >= 0 ? Math.floor(parsed) : 2;
+}
+
+function workerJobTimeoutMs(): number {
+  const parsed = Number(process.env.EXPORT_WORKER_TIMEOUT_MS || '120000');
+  return Number.isFinite(parsed) && parsed > 0 ? parsed : 120000;
+}
+
+const STREAM_ROW_BATCH_SIZE = 500;
+const FRAME_HEADER_BYTES = 5;
+const FRAME_DATA = 0x44; // 'D'
+const FRAME_TRAILER = 0x54; // 'T'
+
+function outputPathOf(input: WorkbookJobInput): string | undefined {
+  return 'outputPath' in input ? input.outputPath : undefined;
+}
+
+/**
+ * Serializes a job as the exporter's record stream: a workbook header, then
+ * per sheet a metadata record and row batches, then an end marker. Rows are
+ * stringified one batch at a time so the full payload is never built as a
+ * single string.
+ */
+export function* workbookRecords(id: string | undefined, input: WorkbookJobInput): Generator<string> {
+  const outputPath = outputPathOf(input);
+  yield JSON.stringify({
+    type: 'workbook',
+    ...(id === undefined ? {} : { id }),
+    ...(outputPath === undefined ? { stream: true } : { output_path: outputPath }),
+    ...(input.workbook.engine ? { engine: input.workbook.engine } : {}),
+    ...(input.workbook.output_format ? { output_format: input.workbook.output_format } : {}),
   });
 
+  for (const sheet of input.workbook.sheets) {
+    const { rows, ...meta } = sheet;
+    yield JSON.stringify({ type: 'sheet', ...meta });
+    for (let start = 0; start < rows.length; start += STREAM_ROW_BATCH_SIZE) {
+      yield JSON.stringify({ type: 'rows', rows: rows.slice(start, start + STREAM_ROW_BATCH_SIZE) });
+    }
+  }
+
+  yield JSON.stringify({ type: 'end' });
+}
+
+async function writeLines(stream: Writable, lines: Iterable<string>): Promise<void> {
+  for (const line of lines) {
+    if (stream.destroyed) return;
+    if (!stream.write(`${line}\n`)) {
+      await new Promise<void>((resolve) => {
+        const done = (): void => {
+          stream.off('drain', done);
+          stream.off('close', done);
+          resolve();
+        };
+        stream.once('drain', done);
+        stream.once('close', done);
+      });
+    }
+  }
+}
+
+/**
+ * Incremental parser for the exporter's framed output: each frame is a type
+ * byte ('D' data or 'T' trailer), a 4-byte big-endian length and the body.
+ * Data bodies are handed over as they complete; the trailer is parsed JSON.
+ */
+export class FrameDecoder {
+  private pending: Buffer = Buffer.alloc(0);
+
+  constructor(
+    private readonly onData: (chunk: Buffer) => void,
+    private readonly onTrailer: (result: WorkerResult) => void
+  ) {}
+
+  push(chunk: Buffer): void {
+    let buffer = this.pending.length ? Buffer.concat([this.pending, chunk]) : chunk;
+    while (buffer.length >= FRAME_HEADER_BYTES) {
+      const type = buffer[0];
+      const length = buffer.readUInt32BE(1);
+      if (buffer.length < FRAME_HEADER_BYTES + length) break;
+      const body = buffer.subarray(FRAME_HEADER_BYTES, FRAME_HEADER_BYTES + length);
+      buffer = buffer.subarray(FRAME_HEADER_BYTES + length);
+      if (type === FRAME_DATA) {
+        this.onData(body);
+      } else if (type === FRAME_TRAILER) {
+        this.onTrailer(JSON.parse(body.toString('utf8')) as WorkerResult);
+      } else {
+        throw new Error(`Workbook exporter sent an unknown frame type ${type}.`);
+      }
+    }
+    this.pending = Buffer.from(buffer);
+  }
+}
+
+/**
+ * Copies decoded frames from `source` into `sink`, pausing the source while
+ * the sink is backed up. Data arriving after the sink is gone is dropped so
+ * the exporter can still finish and report its trailer.
+ */
+function pipeFrames(
+  source: Readable,
+  decoder: FrameDecoder,
+  sink: () => Writable | undefined,
+  onError: (error: Error) => void
+): void {
+  source.on('data', (chunk: Buffer) => {
+    try {
+      decoder.push(chunk);
+    } catch (error) {
+      onError(error instanceof Error ? error : new Error(String(error)));
+      return;
+    }
+    const target = sink();
+    if (target && !target.destroyed && target.writableNeedDrain) {
+      source.pause();
+      const resume = (): void => {
+        target.off('drain', resume);
+        target.off('close', resume);
+        source.resume();
+      };
+      target.once('drain', resume);
+      target.once('close', resume);
+    }
+  });
+}
+
+function writeToSink(sink: Writable | undefined, chunk: Buffer): void {
+  if (sink && !sink.destroyed) sink.write(chunk);
+}
+
+/**
+ * One resident `export_workbook.py --serve` process. Jobs are written as
+ * newline-delimited JSON and answered in order, one at a time. Streamed jobs
+ * come back as frames on an extra pipe (fd 3); the trailer frame settles them.
+ */
+class WorkbookWorker {
+  private readonly child: ChildProcessWithoutNullStreams;
+  private current: PendingJob | null = null;
+  private timer: NodeJS.Timeout | null = null;
+  private stderr = '';
+  alive = true;
+
+  constructor(private readonly onSettled: (worker: WorkbookWorker) => void) {
+    this.child = spawn(pythonBinary(), [pythonScriptPath(), '--serve', '--stream-fd', '3'], {
+      stdio: ['pipe', 'pipe', 'pipe', 'pipe'],
+    }) as ChildProcessWithoutNullStreams;
+
+    createInterface({ input: this.child.stdout }).on('line', (line) => this.handleLine(line));
+
+    const frames = new FrameDecoder(
+      (chunk) => writeToSink(this.current?.sink, chunk),
+      (result) => this.settleWith(result)
+    );
+    pipeFrames(
+      this.child.stdio[3] as Readable,
+      frames,
+      () => this.current?.sink,
+      (error) => this.fail(error)
+    );
+
+    // EPIPE after the worker dies surfaces through the close handler below.
+    this.child.stdin.on('error', () => undefined);
+
+    this.child.stderr.on('data', (chunk: Buffer) => {
+      // Keep only the tail; a long-lived worker would otherwise grow this forever.
+      this.stderr = (this.stderr + chunk.toString()).slice(-4000);
+    });
+
+    this.child.on('error', (error) => {
+      this.fail(new Error(`Failed to spawn workbook exporter: ${error.message}`));
+    });
+
+    this.child.on('close', (code) => {
+      this.fail(
+        new Error(`Workbook exporter worker exited with code ${code}. ${this.stderr || 'No error output returned.'}`)
+      );
+    });
+  }
+
+  get busy(): boolean {
+    return this.current !== null;
+  }
+
+  run(job: PendingJob): void {
+    this.current = job;
+    this.timer = setTimeout(() => {
+      this.fail(new Error(`Workbook exporter timed out after ${workerJobTimeoutMs()}ms.`));
+    }, workerJobTimeoutMs());
+    void writeLines(this.child.stdin, workbookRecords(job.id, job.input));
+  }
+
+  stop(): void {
+    if (!this.alive) return;
+    this.alive = false;
+    this.child.stdin.end();
+    this.child.kill();
+  }
+
+  private settle(): PendingJob | null {
+    const job = this.current;
+    this.current = null;
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    return job;
+  }
+
+  private handleLine(line: string): void {
+    const trimmed = line.trim();
+    if (!trimmed) return;
+
+    let parsed: WorkerResult;
+    try {
+      parsed = JSON.parse(trimmed) as WorkerResult;
+    } catch (error) {
+      const job = this.settle();
+      if (!job) return;
+      job.reject(
+        new Error(`Workbook exporter returned invalid JSON: ${error instanceof Error ? error.message : String(error)}`)
+      );
+      this.onSettled(this);
+      return;
+    }
+    this.settleWith(parsed);
+  }
+
+  private settleWith(parsed: WorkerResult): void {
+    const job = this.settle();
+    if (!job) return;
+
+    if (parsed.id !== job.id) {
+      job.reject(new Error(`Workbook exporter answered job ${String(parsed.id)} while ${job.id} was pending.`));
+    } else if (!parsed.ok) {
+      job.reject(new Error(parsed.error || 'Workbook exporter reported failure.'));
+    } else {
+      job.resolve(parsed);
+    }
+    this.onSettled(this);
+  }
+
+  private fail(error: Error): void {
+    const wasAlive = this.alive;
+    this.stop();
+    const job = this.settle();
+    if (job) job.reject(error);
+    if (wasAlive || job) this.onSettled(this);
+  }
+}
+
+/**
+ * Keeps up to `EXPORT_WORKER_POOL_SIZE` warm exporter processes so back-to-back
+ * exports skip interpreter startup and the openpyxl import.
+ */
+class WorkbookWorkerPool {
+  private readonly workers: WorkbookWorker[] = [];
+  private readonly queue: PendingJob[] = [];
+  private nextJobId = 1;
+
+  constructor(private readonly size: number) {}
+
+  submit(input: WorkbookJobInput, sink?: Writable): Promise<WorkerResult> {
+    return new Promise<WorkerResult>((resolve, reject) => {
+      const id = `job-${this.nextJobId++}`;
+      this.queue.push({ id, input, sink, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  shutdown(): void {
+    for (const worker of this.workers.splice(0)) {
+      worker.stop();
+    }
+  }
+
+  private dispatch(): void {
+    while (this.queue.length > 0) {
+      let worker = this.workers.find((candidate) => candidate.alive && !candidate.busy);
+      if (!worker && this.workers.length < this.size) {
+        worker = new WorkbookWorker((settled) => this.release(settled));
+        this.workers.push(worker);
+      }
+      if (!worker) return;
+
+      const job = this.queue.shift();
+      if (job) worker.run(job);
+    }
+  }
+
+  private release(worker: WorkbookWorker): void {
+    if (!worker.alive) {
+      const idx = this.workers.indexOf(worker);
+      if (idx >= 0) this.workers.splice(idx, 1);
+    }
+    this.dispatch();
+  }
+}
+
+let pool: WorkbookWorkerPool | null = null;
+
+function workerPool(): WorkbookWorkerPool | null {
+  const size = workerPoolSize();
+  if (size === 0) return null;
+  if (!pool) {
+    pool = new WorkbookWorkerPool(size);
+    process.once('exit', () => pool?.shutdown());
+  }
+  return pool;
+}
+
+export function shutdownWorkbookWorkers(): void {
+  pool?.shutdown();
+  pool = null;
+}
+
+async function buildWorkbookFileOnce(input: BuildWorkbookInput): Promise<void> {
+  const scriptPath = pythonScriptPath();
+
   await new Promise<void>((resolve, reject) => {
     const child = spawn(pythonBinary(), [scriptPath], { stdio: ['pipe', 'pipe', 'pipe'] });
     let stdout = '';
@@ -78,8 +419,76 @@ export async function buildWorkbookFile(input: BuildWorkbookInput): Promise<void
       resolve();
     });
 
-    child.stdin.write(payload);
-    child.stdin.end();
+    child.stdin.on('error', () => undefined);
+    void writeLines(child.stdin, workbookRecords(undefined, input)).then(() => child.stdin.end());
+  });
+}
+
+/** One-shot exporter with frames on stdout; the trailer frame carries the result. */
+async function streamWorkbookOnce(input: StreamWorkbookInput, sink: Writable): Promise<WorkerResult> {
+  return new Promise<WorkerResult>((resolve, reject) => {
+    const child = spawn(pythonBinary(), [pythonScriptPath()], { stdio: ['pipe', 'pipe', 'pipe'] });
+    let trailer: WorkerResult | null = null;
+    let stderr = '';
+
+    const frames = new FrameDecoder(
+      (chunk) => writeToSink(sink, chunk),
+      (result) => {
+        trailer = result;
+      }
+    );
+    pipeFrames(
+      child.stdout,
+      frames,
+      () => sink,
+      (error) => {
+        reject(error);
+        child.kill();
+      }
+    );
+
+    child.stderr.on('data', (chunk: Buffer) => {
+      stderr = (stderr + chunk.toString()).slice(-4000);
+    });
+
+    child.on('error', (error) => {
+      reject(new Error(`Failed to spawn workbook exporter: ${error.message}`));
+    });
+
+    child.on('close', (code) => {
+      if (!trailer) {
+        reject(
+          new Error(`Workbook exporter exited with code ${code} before finishing. ${stderr || 'No error output returned.'}`)
+        );
+      } else if (!trailer.ok) {
+        reject(new Error(trailer.error || 'Workbook exporter reported failure.'));
+      } else {
+        resolve(trailer);
+      }
+    });
+
+    child.stdin.on('error', () => undefined);
+    void writeLines(child.stdin, workbookRecords(undefined, input)).then(() => child.stdin.end());
   });
 }
 
+export async function buildWorkbookFile(input: BuildWorkbookInput): Promise<void> {
+  const activePool = workerPool();
+  if (!activePool) {
+    await buildWorkbookFileOnce(input);
+    return;
+  }
+  await activePool.submit(input);
+}
+
+/**
+ * Builds the workbook and writes its bytes straight into `sink` (e.g. an
+ * HTTP response) as the exporter produces them, with no file on disk. The
+ * sink is not ended; callers finish it once this resolves. On rejection some
+ * bytes may already have been written.
+ */
+export async function streamWorkbook(input: StreamWorkbookInput, sink: Writable): Promise<StreamedWorkbook> {
+  const activePool = workerPool();
+  const result = activePool ? await activePool.submit(input, sink) : await streamWorkbookOnce(input, sink);
+  return { bytes: result.bytes ?? 0, outputFormat: result.output_format };
+}
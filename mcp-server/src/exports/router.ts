@@ -13,7 +13,13 @@ import {
   recomputeScheduleRecommendationsForUser,
   runComplianceCheckForUser,
 } from './ops-service.js';
-import { createExcelExportJob, getExcelExportJobForUser, resolveDownloadToken } from './service.js';
+import {
+  createExcelExportJob,
+  exportContentType,
+  getExcelExportJobForUser,
+  resolveDownloadToken,
+  streamExcelExport,
+} from './service.js';
 import { ExcelExportRequest } from './types.js';
 
 interface AuthenticatedRequest extends Request {
@@ -113,6 +119,7 @@ exportRouter.post('/tenants/:tenantId/exports/excel', requireTokenAuth, async (r
         scope: body.scope || 'current_view',
         locations: body.locations || 'current',
         scenario_id: body.scenario_id || null,
+        output_format: body.output_format || 'xlsx',
       },
       true,
       Date.now() - startedAt
@@ -124,6 +131,7 @@ exportRouter.post('/tenants/:tenantId/exports/excel', requireTokenAuth, async (r
       status: job.status,
       scope: job.scope,
       locations: job.locations,
+      output_format: job.outputFormat,
       created_at: job.createdAt,
       updated_at: job.updatedAt,
       download_url: downloadUrl,
@@ -142,6 +150,7 @@ exportRouter.post('/tenants/:tenantId/exports/excel', requireTokenAuth, async (r
         scope: body.scope || 'current_view',
         locations: body.locations || 'current',
         scenario_id: body.scenario_id || null,
+        output_format: body.output_format || 'xlsx',
       },
       false,
       Date.now() - startedAt,
@@ -156,6 +165,54 @@ exportRouter.post('/tenants/:tenantId/exports/excel', requireTokenAuth, async (r
   }
 });
 
+exportRouter.post(
+  '/tenants/:tenantId/exports/excel/stream',
+  requireTokenAuth,
+  async (req: AuthenticatedRequest, res: Response) => {
+    const startedAt = Date.now();
+    const user = req.authUser;
+    const tenantId = req.params.tenantId;
+
+    if (!user) {
+      res.status(401).json({ error: 'Unauthorized' });
+      return;
+    }
+
+    const body = (req.body && typeof req.body === 'object' ? req.body : {}) as ExcelExportRequest;
+    const auditInput = {
+      tenant_id: tenantId,
+      scope: body.scope || 'current_view',
+      locations: body.locations || 'current',
+      scenario_id: body.scenario_id || null,
+      output_format: body.output_format || 'xlsx',
+    };
+
+    try {
+      await streamExcelExport({ userId: user.id, tenantId, request: body }, res, (job) => {
+        res.status(200);
+        res.setHeader('Content-Type', exportContentType(job.outputFormat));
+        res.attachment(job.fileName || `${job.id}.xlsx`);
+        res.setHeader('X-Export-Id', job.id);
+      });
+      res.end();
+      await writeAudit(user.id, 'ops_export_excel_api_stream', auditInput, true, Date.now() - startedAt);
+    } catch (error) {
+      const message = error instanceof Error ? error.message : 'Export generation failed';
+      await writeAudit(user.id, 'ops_export_excel_api_stream', auditInput, false, Date.now() - startedAt, message);
+
+      if (res.headersSent) {
+        // Bytes are already on the wire; cut the connection so the client sees a truncated download.
+        res.destroy(error instanceof Error ? error : new Error(message));
+        return;
+      }
+      res.removeHeader('Content-Type');
+      res.removeHeader('Content-Disposition');
+      res.removeHeader('X-Export-Id');
+      res.status(message.includes('not authorized') ? 403 : 500).json({ error: message });
+    }
+  }
+);
+
 exportRouter.get('/tenants/:tenantId/exports/:exportId', requireTokenAuth, async (req: AuthenticatedRequest, res: Response) => {
   const user = req.authUser;
   const { tenantId, exportId } = req.params;
@@ -178,6 +235,7 @@ exportRouter.get('/tenants/:tenantId/exports/:exportId', requireTokenAuth, async
       status: job.status,
       scope: job.scope,
       locations: job.locations,
+      output_format: job.outputFormat,
       created_at: job.createdAt,
       updated_at: job.updatedAt,
       expires_at: job.downloadExpiresAt,
@@ -462,6 +520,6 @@ exportRouter.get('/exports/download/:token', async (req: Request, res: Response)
 
   const { job, filePath } = resolved;
   const fileName = job.fileName || `${job.id}.xlsx`;
-  res.setHeader('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet');
+  res.setHeader('Content-Type', exportContentType(job.outputFormat));
   res.download(filePath, fileName);
 });
@@ -1,12 +1,14 @@
 import { randomBytes } from 'crypto';
 import { mkdir, stat } from 'fs/promises';
 import path from 'path';
+import { Writable } from 'stream';
 
 import { createId } from '@paralleldrive/cuid2';
 
-import { buildWorkbookFile } from './excel-builder.js';
+import { buildWorkbookFile, streamWorkbook } from './excel-builder.js';
 import {
   CreateExportJobParams,
+  ExcelExportFormat,
   ExcelExportJob,
   ExcelExportLocations,
   ExcelExportRequest,
@@ -15,6 +17,12 @@ import {
   WorkbookSheetDefinition,
 } from './types.js';
 
+const EXPORT_FORMAT_FILES: Record<ExcelExportFormat, { extension: string; contentType: string }> = {
+  xlsx: { extension: 'xlsx', contentType: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' },
+  csv_zip: { extension: 'zip', contentType: 'application/zip' },
+  columnar_json: { extension: 'json', contentType: 'application/json' },
+};
+
 const exportJobs = new Map<string, ExcelExportJob>();
 const downloadTokenToJob = new Map<string, { jobId: string; expiresAtMs: number }>();
 
@@ -49,6 +57,14 @@ export function normalizeExportLocations(value: string | undefined): ExcelExport
   return value === 'all_accessible' ? 'all_accessible' : 'current';
 }
 
+export function normalizeExportFormat(value: string | undefined): ExcelExportFormat {
+  return value === 'csv_zip' || value === 'columnar_json' ? value : 'xlsx';
+}
+
+export function exportContentType(format: ExcelExportFormat): string {
+  return EXPORT_FORMAT_FILES[format].contentType;
+}
+
 function parseTenantAllowlist(raw: string): Map<string, Set<string>> {
   const result = new Map<string, Set<string>>();
   raw
@@ -247,9 +263,10 @@ export async function createExcelExportJob(params: CreateExportJobParams): Promi
 
   const scope = normalizeExportScope(params.request.scope);
   const locations = normalizeExportLocations(params.request.locations);
+  const outputFormat = normalizeExportFormat(params.request.output_format);
   const now = nowIso();
   const jobId = createId();
-  const fileName = `joyus-fast-casual-export-${params.tenantId}-${jobId}.xlsx`;
+  const fileName = `joyus-fast-casual-export-${params.tenantId}-${jobId}.${EXPORT_FORMAT_FILES[outputFormat].extension}`;
   const outputDir = path.join(exportRootDir(), params.tenantId);
   const outputPath = path.join(outputDir, fileName);
 
@@ -260,6 +277,7 @@ export async function createExcelExportJob(params: CreateExportJobParams): Promi
     status: 'pending',
     scope,
     locations,
+    outputFormat,
     dateStart: params.request.date_start,
     dateEnd: params.request.date_end,
     scenarioId: params.request.scenario_id,
@@ -278,7 +296,7 @@ export async function createExcelExportJob(params: CreateExportJobParams): Promi
 
     await buildWorkbookFile({
       outputPath,
-      workbook,
+      workbook: { ...workbook, output_format: outputFormat },
     });
 
     const fileStats = await stat(outputPath);
@@ -315,6 +333,71 @@ export async function createExcelExportJob(params: CreateExportJobParams): Promi
   }
 }
 
+/**
+ * Builds an export straight into `sink` (typically the HTTP response) without
+ * a file on disk. `onStart` runs once the job is accepted, before any bytes
+ * are written, so callers can set download headers. Streamed jobs have no
+ * download link; their status stays queryable like any other export.
+ */
+export async function streamExcelExport(
+  params: Omit<CreateExportJobParams, 'baseUrl'>,
+  sink: Writable,
+  onStart?: (job: ExcelExportJob) => void
+): Promise<ExcelExportJob> {
+  assertTenantAccess(params.userId, params.tenantId);
+
+  const scope = normalizeExportScope(params.request.scope);
+  const locations = normalizeExportLocations(params.request.locations);
+  const outputFormat = normalizeExportFormat(params.request.output_format);
+  const now = nowIso();
+  const jobId = createId();
+  const fileName = `joyus-fast-casual-export-${params.tenantId}-${jobId}.${EXPORT_FORMAT_FILES[outputFormat].extension}`;
+
+  const initialJob: ExcelExportJob = {
+    id: jobId,
+    userId: params.userId,
+    tenantId: params.tenantId,
+    status: 'pending',
+    scope,
+    locations,
+    outputFormat,
+    dateStart: params.request.date_start,
+    dateEnd: params.request.date_end,
+    scenarioId: params.request.scenario_id,
+    fileName,
+    createdAt: now,
+    updatedAt: now,
+  };
+  exportJobs.set(jobId, initialJob);
+  onStart?.(initialJob);
+
+  try {
+    const workbook = isWorkbookPayload(params.request.workbook_data)
+      ? params.request.workbook_data
+      : defaultWorkbookPayload(params.tenantId, params.userId, scope, locations, params.request);
+
+    const streamed = await streamWorkbook({ workbook: { ...workbook, output_format: outputFormat } }, sink);
+
+    const completedJob: ExcelExportJob = {
+      ...initialJob,
+      status: 'completed',
+      fileSizeBytes: streamed.bytes,
+      updatedAt: nowIso(),
+    };
+    exportJobs.set(jobId, completedJob);
+    return completedJob;
+  } catch (error) {
+    const message = error instanceof Error ? error.message : String(error);
+    exportJobs.set(jobId, {
+      ...initialJob,
+      status: 'failed',
+      error: message,
+      updatedAt: nowIso(),
+    });
+    throw error;
+  }
+}
+
 export function getExcelExportJobForUser(userId: string, tenantId: string, exportId: string): ExcelExportJob | null {
   assertTenantAccess(userId, tenantId);
   const job = exportJobs.get(exportId);
@@ -1,6 +1,8 @@
 export type ExcelExportScope = 'current_view' | 'full_period';
 export type ExcelExportLocations = 'current' | 'all_accessible';
 export type ExcelExportStatus = 'pending' | 'completed' | 'failed';
+export type WorkbookEngine = 'standard' | 'streaming';
+export type ExcelExportFormat = 'xlsx' | 'csv_zip' | 'columnar_json';
 
 export interface WorkbookSheetDefinition {
   name: string;
@@ -12,6 +14,10 @@ export interface WorkbookSheetDefinition {
 
 export interface WorkbookPayload {
   sheets: WorkbookSheetDefinition[];
+  /** `streaming` builds with write-only worksheets for large multi-month exports. */
+  engine?: WorkbookEngine;
+  /** Non-XLSX formats skip workbook styling and are much cheaper to build. */
+  output_format?: ExcelExportFormat;
 }
 
 export interface ExcelExportRequest {
@@ -20,6 +26,7 @@ export interface ExcelExportRequest {
   date_start?: string;
   date_end?: string;
   scenario_id?: string;
+  output_format?: string;
   workbook_data?: WorkbookPayload;
 }
 
@@ -30,6 +37,7 @@ export interface ExcelExportJob {
   status: ExcelExportStatus;
   scope: ExcelExportScope;
   locations: ExcelExportLocations;
+  outputFormat: ExcelExportFormat;
   dateStart?: string;
   dateEnd?: string;
   scenarioId?: string;
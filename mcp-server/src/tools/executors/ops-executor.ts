@@ -56,6 +56,7 @@ export async function executeOpsTool(
     const dateStart = optionalString(input, 'date_start');
     const dateEnd = optionalString(input, 'date_end');
     const scenarioId = optionalString(input, 'scenario_id');
+    const outputFormat = optionalString(input, 'output_format');
 
     const baseUrl = process.env.BASE_URL || 'http://localhost:3000';
 
@@ -69,6 +70,7 @@ export async function executeOpsTool(
         date_start: dateStart,
         date_end: dateEnd,
         scenario_id: scenarioId,
+        output_format: outputFormat,
       },
     });
 
@@ -78,6 +80,7 @@ export async function executeOpsTool(
       status: job.status,
       scope: job.scope,
       locations: job.locations,
+      output_format: job.outputFormat,
       created_at: job.createdAt,
       expires_at: job.downloadExpiresAt,
       file_name: job.fileName,
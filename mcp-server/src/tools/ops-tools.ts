@@ -26,6 +26,12 @@ export const opsTools: ToolDefinition[] = [
         date_start: { type: 'string', description: 'Optional start date in YYYY-MM-DD' },
         date_end: { type: 'string', description: 'Optional end date in YYYY-MM-DD' },
         scenario_id: { type: 'string', description: 'Optional scenario identifier' },
+        output_format: {
+          type: 'string',
+          enum: ['xlsx', 'csv_zip', 'columnar_json'],
+          description:
+            'File format. Defaults to xlsx for people; csv_zip and columnar_json carry the same sheets without styling and are much faster for machine consumers.',
+        },
       },
       required: ['tenant_id'],
     },
@@ -0,0 +1,87 @@
+/**
+ * Unit tests for workbook exporter payload serialization
+ */
+
+import { describe, expect, it } from 'vitest';
+
+import { FrameDecoder, workbookRecords } from '../src/exports/excel-builder.js';
+
+describe('Workbook Exporter Records', () => {
+  describe('workbookRecords', () => {
+    it('should frame sheets between a workbook header and an end marker', () => {
+      const records = [
+        ...workbookRecords('job-1', {
+          outputPath: '/tmp/out.xlsx',
+          workbook: {
+            engine: 'streaming',
+            sheets: [{ name: 'README', headers: ['field', 'value'], rows: [['scope', 'current_view']] }],
+          },
+        }),
+      ].map((line) => JSON.parse(line));
+
+      expect(records).toEqual([
+        { type: 'workbook', id: 'job-1', output_path: '/tmp/out.xlsx', engine: 'streaming' },
+        { type: 'sheet', name: 'README', headers: ['field', 'value'] },
+        { type: 'rows', rows: [['scope', 'current_view']] },
+        { type: 'end' },
+      ]);
+    });
+
+    it('should split large sheets into row batches', () => {
+      const rows = Array.from({ length: 1201 }, (_, idx) => [idx]);
+      const records = [
+        ...workbookRecords(undefined, {
+          outputPath: '/tmp/out.xlsx',
+          workbook: { sheets: [{ name: 'Daily_Raw', headers: ['n'], rows }] },
+        }),
+      ].map((line) => JSON.parse(line));
+
+      const batches = records.filter((record) => record.type === 'rows');
+      expect(batches.map((batch) => batch.rows.length)).toEqual([500, 500, 201]);
+      expect(records[0]).toEqual({ type: 'workbook', output_path: '/tmp/out.xlsx' });
+    });
+
+    it('should request a streamed result when there is no output path', () => {
+      const [header] = [...workbookRecords('job-2', { workbook: { sheets: [] } })].map((line) => JSON.parse(line));
+      expect(header).toEqual({ type: 'workbook', id: 'job-2', stream: true });
+    });
+  });
+
+  describe('FrameDecoder', () => {
+    function frame(type: string, body: Buffer): Buffer {
+      const header = Buffer.alloc(5);
+      header.write(type, 0, 'latin1');
+      header.writeUInt32BE(body.length, 1);
+      return Buffer.concat([header, body]);
+    }
+
+    it('should reassemble data and trailer frames split across chunks', () => {
+      const data: Buffer[] = [];
+      const trailers: unknown[] = [];
+      const decoder = new FrameDecoder(
+        (chunk) => data.push(Buffer.from(chunk)),
+        (result) => trailers.push(result)
+      );
+      const wire = Buffer.concat([
+        frame('D', Buffer.from('PK\u0003\u0004')),
+        frame('D', Buffer.from('rest')),
+        frame('T', Buffer.from(JSON.stringify({ id: 'job-1', ok: true, bytes: 8 }))),
+      ]);
+
+      for (let offset = 0; offset < wire.length; offset += 3) {
+        decoder.push(wire.subarray(offset, offset + 3));
+      }
+
+      expect(Buffer.concat(data).toString()).toBe('PK\u0003\u0004rest');
+      expect(trailers).toEqual([{ id: 'job-1', ok: true, bytes: 8 }]);
+    });
+
+    it('should reject unknown frame types', () => {
+      const decoder = new FrameDecoder(
+        () => undefined,
+        () => undefined
+      );
+      expect(() => decoder.push(frame('X', Buffer.from('?')))).toThrow('unknown frame type');
+    });
+  });
+});
@@ -4,7 +4,13 @@
 
 import { describe, expect, it, vi } from 'vitest';
 
-import { canAccessTenant, normalizeExportLocations, normalizeExportScope } from '../src/exports/service.js';
+import {
+  canAccessTenant,
+  exportContentType,
+  normalizeExportFormat,
+  normalizeExportLocations,
+  normalizeExportScope,
+} from '../src/exports/service.js';
 
 describe('Export Service Helpers', () => {
   describe('normalizeExportScope', () => {
@@ -29,6 +35,19 @@ describe('Export Service Helpers', () => {
     });
   });
 
+  describe('normalizeExportFormat', () => {
+    it('should default to xlsx', () => {
+      expect(normalizeExportFormat(undefined)).toBe('xlsx');
+      expect(normalizeExportFormat('pdf')).toBe('xlsx');
+    });
+
+    it('should accept machine-oriented formats', () => {
+      expect(normalizeExportFormat('csv_zip')).toBe('csv_zip');
+      expect(normalizeExportFormat('columnar_json')).toBe('columnar_json');
+      expect(exportContentType('csv_zip')).toBe('application/zip');
+    });
+  });
+
   describe('canAccessTenant', () => {
     it('should always allow same user and tenant id', () => {
       vi.stubEnv('EXPORT_ALLOW_ANY_TENANT', 'false');